@@ -0,0 +1,113 @@
+"""
+Пули з'єднань Bot API під сплеском розсилки.
+
+    python -m benchmarks.bot_pool_load --burst 2000 --delivery-pool 32
+    python -m benchmarks.bot_pool_load --transport httpx
+
+Поки розсилка шле `--burst` повідомлень у локальну заглушку Bot API (із затримкою
+`--api-latency` на відповідь), прийом апдейтів раз на `--probe-interval` робить
+getUpdates і міряє його затримку. Два прогони: спільний пул на обидва потоки (як один Bot) і
+окремі сесії intake/delivery з create_session. Друкує JSON із затримкою getUpdates,
+тривалістю розсилки та кількістю одночасних запитів і TCP-з'єднань на боці сервера.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from benchmarks.webhook_replay import percentile
+from bot.utils.bot_session import create_session
+
+TOKEN = "42:benchmark"
+
+
+async def burst(bot: Bot, messages: int, concurrency: int) -> float:
+    # Стільки ж одночасних відправок, скільки їх тримають воркери доставки
+    pending = iter(range(messages))
+    started = time.perf_counter()
+
+    async def worker():
+        for n in pending:
+            await bot.send_message(1_000 + n % 100, f"burst {n}")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def probe(bot: Bot, done: asyncio.Event, interval: float) -> list[float]:
+    latencies = []
+    while not done.is_set():
+        # Пауза між запитами: інакше наступний запит одразу забирає щойно звільнене
+        # з'єднання і в черзі пулу не стоїть ніколи
+        await asyncio.sleep(interval)
+        started = time.perf_counter()
+        await bot.get_updates(timeout=0)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run_mode(args, separate: bool) -> dict:
+    api = FakeBotAPI(latency=args.api_latency)
+    runner, port = await serve(api.app())
+    url = f"http://127.0.0.1:{port}"
+
+    def session(pool: str, limit: int):
+        return create_session(pool, limit, transport=args.transport, api_url=url)
+
+    if separate:
+        intake = Bot(TOKEN, session=session("intake", args.intake_pool))
+        delivery = Bot(TOKEN, session=session("delivery", args.delivery_pool))
+    else:
+        intake = delivery = Bot(TOKEN, session=session("shared", args.delivery_pool))
+
+    done = asyncio.Event()
+    probing = asyncio.create_task(probe(intake, done, args.probe_interval))
+    burst_sec = await burst(delivery, args.burst, args.concurrency)
+    done.set()
+    latencies = sorted(await probing)
+
+    await intake.session.close()
+    if separate:
+        await delivery.session.close()
+    await runner.cleanup()
+    return {
+        "burst_sec": round(burst_sec, 3),
+        "sent_per_sec": round(args.burst / burst_sec, 1),
+        "intake_requests": len(latencies),
+        "intake_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "intake_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "server_max_in_flight": api.max_in_flight,
+        "server_connections": len(api.connections),
+    }
+
+
+async def run(args) -> dict:
+    return {
+        "transport": args.transport,
+        "burst": args.burst,
+        "shared_pool": await run_mode(args, separate=False),
+        "separate_pools": await run_mode(args, separate=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=2000, help="повідомлень у розсилці")
+    parser.add_argument("--concurrency", type=int, default=64, help="одночасних відправок")
+    parser.add_argument("--delivery-pool", type=int, default=32, help="з'єднань у пулі розсилки (і спільному)")
+    parser.add_argument("--intake-pool", type=int, default=4)
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="пауза між getUpdates, с")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="затримка відповіді заглушки, с")
+    parser.add_argument("--transport", choices=("aiohttp", "httpx"), default="aiohttp")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
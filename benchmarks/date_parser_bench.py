@@ -0,0 +1,67 @@
+"""
+Мікробенчмарк парсера дат на корпусі реальних фраз.
+
+    python -m benchmarks.date_parser_bench --repeat 20000
+
+Вимірює parse_reminder_text на корпусі (без кешу: текст кожного нагадування
+унікальний) і parse_datetime на фразах кроку "дата і час" — холодний прохід
+(порожній кеш фраз) і теплий (фрази вже в LRU). Друкує результат як JSON.
+"""
+import argparse
+import json
+import pathlib
+import time
+from datetime import datetime
+from bot.utils.date_parser import _tokenize_phrase, parse_datetime, parse_reminder_text
+
+CORPUS = pathlib.Path(__file__).parent / "data" / "phrases_uk.txt"
+# Типові відповіді на кроці діалогу "дата і час"
+DIALOG_PHRASES = [
+    "завтра о 10:00", "Завтра  о 10:00", "сьогодні 19:00", "післязавтра о 12:00", "в понеділок о 9:30",
+    "у п'ятницю о 18:00", "09.04.2025 23:00", "2025-05-01 09:00", "в суботу опівдні", "сьогодні опівночі",
+]
+
+
+def load_corpus() -> list[str]:
+    return [line.strip() for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def run(parse, phrases: list[str], repeat: int, cold: bool = False) -> float:
+    now = datetime.now()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for phrase in phrases:
+            if cold:
+                _tokenize_phrase.cache_clear()
+            parse(phrase, now=now)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+
+    phrases = load_corpus()
+    calls = len(phrases) * args.repeat
+    text = run(parse_reminder_text, phrases, args.repeat)
+
+    dialog_calls = len(DIALOG_PHRASES) * args.repeat
+    # Холодний: кеш фраз скидається перед кожною фразою
+    cold = run(parse_datetime, DIALOG_PHRASES, args.repeat, cold=True)
+    _tokenize_phrase.cache_clear()
+    warm = run(parse_datetime, DIALOG_PHRASES, args.repeat)
+
+    print(json.dumps({
+        "phrases": len(phrases),
+        "calls": calls,
+        "reminder_text_us_per_call": round(text / calls * 1e6, 2),
+        "dialog_phrases": len(DIALOG_PHRASES),
+        "dialog_cold_us_per_call": round(cold / dialog_calls * 1e6, 2),
+        "dialog_warm_us_per_call": round(warm / dialog_calls * 1e6, 2),
+        "dialog_cache": _tokenize_phrase.cache_info()._asdict(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
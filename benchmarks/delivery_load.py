@@ -0,0 +1,140 @@
+"""
+Навантажувальний прогін планувальника і доставки.
+
+    python -m benchmarks.delivery_load --users 200 --reminders 5
+    python -m benchmarks.delivery_load --api-global-rate 30 --api-chat-rate 1
+
+Засіває N користувачів × M нагадувань у справжню SQLite (тимчасовий файл), кладе їх
+в індекс планувальника на fakeredis і відправляє через DeliveryService у локальну
+заглушку Bot API, яка тримає ліміти й відповідає 429 з retry_after.
+Друкує JSON: нагадувань на секунду, розподіл лагу спрацювання, кількість 429 і
+пам'ять індексу на одне очікуюче нагадування.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from benchmarks.webhook_replay import percentile
+from bot.utils.delivery import DeliveryService
+from db.database import init_db, close_db
+from db.models.models import Reminder, User
+from scheduler.scheduler import ReminderScheduler
+
+TOKEN = "42:benchmark"
+TEXT_PREFIX = "load "
+
+
+async def seed(users: int, reminders: int, due_at: int) -> list[Reminder]:
+    await User.bulk_create([User(id=i, telegram_id=100_000 + i) for i in range(1, users + 1)], batch_size=1000)
+    remind_at = datetime.fromtimestamp(due_at, timezone.utc)
+    rows = [
+        Reminder(
+            id=(user_id - 1) * reminders + n,
+            user_id=user_id,
+            chat_id=100_000 + user_id,
+            text=f"{TEXT_PREFIX}{(user_id - 1) * reminders + n}",
+            remind_at=remind_at,
+            fire_at=due_at,
+        )
+        for user_id in range(1, users + 1)
+        for n in range(1, reminders + 1)
+    ]
+    await Reminder.bulk_create(rows, batch_size=1000)
+    return rows
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="reminders-bench-")
+    await init_db(f"sqlite://{workdir}/bench.sqlite3")
+
+    api = FakeBotAPI(global_rate=args.api_global_rate, chat_rate=args.api_chat_rate)
+    api_runner, api_port = await serve(api.app())
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+
+    scheduler = ReminderScheduler(fakeredis.FakeRedis(decode_responses=True), poll_interval=args.poll_interval)
+    delivery = DeliveryService(
+        bot,
+        scheduler,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate,
+    )
+
+    due_at = int(time.time()) + 2
+    seeded = time.perf_counter()
+    reminders = await seed(args.users, args.reminders, due_at)
+    seed_sec = time.perf_counter() - seeded
+    total = len(reminders)
+
+    # fakeredis живе в цьому ж процесі, тож приріст алокацій — це розмір індексу
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await scheduler.schedule_many(reminders)
+    index_bytes = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    del reminders
+
+    await delivery.start()
+    await scheduler.start()
+    deadline = time.time() + args.timeout
+    while len(api.sent) < total and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    await scheduler.shutdown()
+    await delivery.stop()
+
+    lags = sorted(received - due_at for _, _, received in api.sent)
+    first = max(due_at, min((received for _, _, received in api.sent), default=due_at))
+    last = max((received for _, _, received in api.sent), default=first)
+    elapsed = last - first
+
+    await bot.session.close()
+    await api_runner.cleanup()
+    await close_db()
+
+    return {
+        "users": args.users,
+        "reminders": total,
+        "delivered": len(api.sent),
+        "rejected_429": api.rejected,
+        "seed_sec": round(seed_sec, 3),
+        "delivered_per_sec": round(len(api.sent) / elapsed, 1) if elapsed else None,
+        "lag_p50_sec": round(percentile(lags, 50), 3),
+        "lag_p90_sec": round(percentile(lags, 90), 3),
+        "lag_p99_sec": round(percentile(lags, 99), 3),
+        "lag_max_sec": round(lags[-1], 3) if lags else 0.0,
+        "index_bytes_per_reminder": round(index_bytes / total, 1) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--reminders", type=int, default=3, help="нагадувань на користувача")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--global-rate", type=float, default=30.0, help="ліміт DeliveryService, повідомлень/с")
+    parser.add_argument("--chat-rate", type=float, default=1.0)
+    parser.add_argument("--api-global-rate", type=float, default=30.0, help="ліміт заглушки Bot API, 0 — без ліміту")
+    parser.add_argument("--api-chat-rate", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=300.0, help="максимальний час очікування доставки, с")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
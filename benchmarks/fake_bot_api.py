@@ -0,0 +1,102 @@
+"""
+Локальна заміна Telegram Bot API для бенчмарків.
+
+Приймає sendMessage/editMessageText та решту методів, за бажанням тримає ліміти,
+схожі на справжні (глобальний і на чат), і відповідає 429 з `retry_after`, як Telegram.
+`latency` додає затримку до кожної відповіді; лічильники `max_in_flight` і
+`connections` показують, скільки запитів і TCP-з'єднань клієнт тримав одночасно.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from aiohttp import web
+
+
+class FakeBotAPI:
+    def __init__(
+        self,
+        global_rate: float | None = None,
+        chat_rate: float | None = None,
+        retry_after: int = 1,
+        latency: float = 0.0,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.retry_after = retry_after
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Адреси клієнтських сокетів: кожна — окреме TCP-з'єднання з пулу клієнта
+        self.connections: set[tuple] = set()
+        # (chat_id, text, час отримання) для кожного прийнятого sendMessage
+        self.sent: list[tuple[int, str, float]] = []
+        self.rejected = 0
+        self._message_ids = itertools.count(1)
+        self._window: deque[float] = deque()
+        self._chat_last: dict[int, float] = {}
+
+    def _allow(self, chat_id: int, now: float) -> bool:
+        if self.global_rate:
+            while self._window and self._window[0] <= now - 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.global_rate:
+                return False
+        if self.chat_rate and now - self._chat_last.get(chat_id, float("-inf")) < 1.0 / self.chat_rate:
+            return False
+        self._window.append(now)
+        self._chat_last[chat_id] = now
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.connections.add(request.transport.get_extra_info("peername"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return await self._respond(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _respond(self, request: web.Request) -> web.Response:
+        params = await request.post()
+        method = request.match_info["method"].lower()
+        if method == "getupdates":
+            return web.json_response({"ok": True, "result": []})
+        if method not in ("sendmessage", "editmessagetext"):
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = int(params.get("chat_id", 0))
+        now = time.time()
+        if method == "sendmessage":
+            if not self._allow(chat_id, now):
+                self.rejected += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                })
+            self.sent.append((chat_id, params.get("text", ""), now))
+
+        return web.json_response({"ok": True, "result": {
+            "message_id": next(self._message_ids),
+            "date": int(now),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+async def serve(app: web.Application) -> tuple[web.AppRunner, int]:
+    """Запускає застосунок на вільному локальному порту"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
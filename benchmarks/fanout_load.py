@@ -0,0 +1,130 @@
+"""
+Одне нагадування для великої аудиторії: рядок на кожного отримувача проти спільного нагадування.
+
+    python -m benchmarks.fanout_load --audience 1000
+    python -m benchmarks.fanout_load --audience 5000 --global-rate 1000
+
+Два прогони в SQLite (тимчасовий файл) і fakeredis, доставка через DeliveryService у
+локальну заглушку Bot API:
+    per_row — як без підписок: окреме Reminder і запис індексу на кожен чат;
+    shared  — одне Reminder з підписниками, яке розсилається при спрацюванні.
+Друкує JSON: рядків reminders, записів в індексі планувальника, час створення,
+скільки повідомлень доставлено і за який час від спрацювання.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from bot.utils.delivery import DeliveryService
+from db.database import init_db, close_db
+from db.models.models import Reminder, ReminderSubscriber, User
+from scheduler.scheduler import ReminderScheduler
+
+TOKEN = "42:benchmark"
+OWNER_CHAT = 100_000
+
+
+async def create_per_row(scheduler: ReminderScheduler, owner: User, audience: int, due_at: int):
+    remind_at = datetime.fromtimestamp(due_at, timezone.utc)
+    reminders = [
+        Reminder(user=owner, chat_id=OWNER_CHAT + n, text="Стендап о 10:00", remind_at=remind_at, fire_at=due_at)
+        for n in range(audience + 1)
+    ]
+    await Reminder.bulk_create(reminders, batch_size=1000)
+    await scheduler.schedule_many(await Reminder.all())
+
+
+async def create_shared(scheduler: ReminderScheduler, owner: User, audience: int, due_at: int):
+    remind_at = datetime.fromtimestamp(due_at, timezone.utc)
+    reminder = await Reminder.create(
+        user=owner, chat_id=OWNER_CHAT, text="Стендап о 10:00", remind_at=remind_at, fire_at=due_at, shared=True
+    )
+    await ReminderSubscriber.bulk_create(
+        [ReminderSubscriber(reminder=reminder, chat_id=OWNER_CHAT + n) for n in range(1, audience + 1)],
+        batch_size=1000,
+    )
+    await scheduler.schedule_reminder(reminder)
+
+
+async def run_mode(args, shared: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix="reminders-bench-")
+    await init_db(f"sqlite://{workdir}/bench.sqlite3")
+    api = FakeBotAPI(global_rate=args.api_global_rate or None, chat_rate=1.0)
+    api_runner, api_port = await serve(api.app())
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+    scheduler = ReminderScheduler(fakeredis.FakeRedis(decode_responses=True), poll_interval=0.1)
+    delivery = DeliveryService(
+        bot,
+        scheduler,
+        workers=args.workers,
+        global_rate=args.global_rate,
+        fanout_chunk=args.fanout_chunk,
+    )
+
+    owner = await User.create(telegram_id=OWNER_CHAT)
+    due_at = int(time.time()) + 2
+    started = time.perf_counter()
+    await (create_shared if shared else create_per_row)(scheduler, owner, args.audience, due_at)
+    create_sec = time.perf_counter() - started
+    rows = await Reminder.all().count()
+    index_entries = await scheduler.pending_count()
+
+    await delivery.start()
+    await scheduler.start()
+    total = args.audience + 1
+    deadline = time.time() + args.timeout
+    while len(api.sent) < total and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    await scheduler.shutdown()
+    await delivery.stop()
+
+    received = sorted(at for _, _, at in api.sent)
+    await bot.session.close()
+    await api_runner.cleanup()
+    await close_db()
+    return {
+        "reminder_rows": rows,
+        "index_entries": index_entries,
+        "create_sec": round(create_sec, 3),
+        "delivered": len(api.sent),
+        "distinct_chats": len({chat_id for chat_id, _, _ in api.sent}),
+        "last_delivery_after_due_sec": round(received[-1] - due_at, 3) if received else None,
+        "delivered_per_sec": round(len(received) / (received[-1] - max(due_at, received[0])), 1)
+        if len(received) > 1 and received[-1] > max(due_at, received[0]) else None,
+    }
+
+
+async def run(args) -> dict:
+    return {
+        "audience": args.audience,
+        "per_row": await run_mode(args, shared=False),
+        "shared": await run_mode(args, shared=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audience", type=int, default=1000, help="підписників, крім чату власника")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--global-rate", type=float, default=500.0, help="ліміт DeliveryService, повідомлень/с")
+    parser.add_argument("--api-global-rate", type=float, default=0.0, help="ліміт заглушки Bot API, 0 — без ліміту")
+    parser.add_argument("--fanout-chunk", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120.0, help="максимальний час очікування доставки, с")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
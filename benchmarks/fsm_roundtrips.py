@@ -0,0 +1,145 @@
+"""
+Скільки запитів до Redis коштує FSM на один діалог створення нагадування.
+
+    python -m benchmarks.fsm_roundtrips --users 50
+
+Кожен користувач проходить повний діалог: "Додати нагадування" -> текст без дати ->
+дата -> кнопка періодичності. Той самий потік проганяється через RedisStorage з
+aiogram і через CompactRedisStorage (обидва на fakeredis); рахуються лише запити
+сховища. Друкує JSON з round-trips на діалог і часом обробки.
+"""
+import argparse
+import asyncio
+import inspect
+import itertools
+import json
+import os
+import time
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import Update
+from tortoise import Tortoise
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from bot.handlers.handlers import router
+from bot.middlewares.scheduler_middleware import SchedulerMiddleware
+from bot.middlewares.user_middleware import UserCache, UserMiddleware
+from bot.utils.fsm_storage import CompactRedisStorage
+from db.models.models import Reminder
+from scheduler.scheduler import ReminderScheduler
+
+TOKEN = "42:benchmark"
+
+
+class RoundTripCounter:
+    """Проксі клієнта Redis: кожен виклик, що повертає awaitable, — один round-trip"""
+
+    def __init__(self, client):
+        self._client = client
+        self.count = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if inspect.isawaitable(result):
+                self.count += 1
+            return result
+
+        return call
+
+
+def flow(user_id: int, update_ids: itertools.count) -> list[dict]:
+    now = int(time.time())
+    sender = {"id": user_id, "is_bot": False, "first_name": "User"}
+    chat = {"id": user_id, "type": "private"}
+
+    def message(text: str) -> dict:
+        return {
+            "update_id": next(update_ids),
+            "message": {"message_id": next(update_ids), "date": now, "chat": chat, "from": sender, "text": text},
+        }
+
+    def callback(data: str) -> dict:
+        return {
+            "update_id": next(update_ids),
+            "callback_query": {
+                "id": str(next(update_ids)),
+                "chat_instance": str(user_id),
+                "from": sender,
+                "message": {"message_id": 1, "date": now, "chat": chat, "text": "menu"},
+                "data": data,
+            },
+        }
+
+    return [callback("add_reminder"), message("Купити молоко"), message("завтра о 15:00"), callback("repeat_daily")]
+
+
+async def run_flows(dp: Dispatcher, bot: Bot, users: range, storage) -> float:
+    update_ids = itertools.count(1)
+    started = time.perf_counter()
+    for user_id in users:
+        for update in flow(user_id, update_ids):
+            await dp.feed_update(bot, Update.model_validate(update, context={"bot": bot}))
+    # Відкладені записи CompactRedisStorage теж входять у рахунок
+    if isinstance(storage, CompactRedisStorage) and storage._flushing:
+        await asyncio.gather(*storage._flushing.values())
+    return time.perf_counter() - started
+
+
+async def run(users: int) -> dict:
+    await Tortoise.init(db_url="sqlite://:memory:", use_tz=True, modules={"models": ["db.models.models"]})
+    await Tortoise.generate_schemas()
+    api_runner, api_port = await serve(FakeBotAPI().app())
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+
+    scheduler_middleware = SchedulerMiddleware(ReminderScheduler(fakeredis.FakeRedis(decode_responses=True)))
+    router.message.middleware(scheduler_middleware)
+    router.callback_query.middleware(scheduler_middleware)
+    user_middleware = UserMiddleware(UserCache())
+    router.message.middleware(user_middleware)
+    router.callback_query.middleware(user_middleware)
+
+    baseline = RoundTripCounter(fakeredis.FakeRedis(decode_responses=True))
+    compact = RoundTripCounter(fakeredis.FakeRedis())
+    storages = {"redis_storage": RedisStorage(redis=baseline), "compact_storage": CompactRedisStorage(compact)}
+    counters = {"redis_storage": baseline, "compact_storage": compact}
+
+    dp = Dispatcher(storage=storages["redis_storage"])
+    dp.include_router(router)
+
+    result = {"flows": users}
+    # Різні користувачі для кожного сховища, щоб кеш не переносився між прогонами
+    for offset, (name, storage) in enumerate(storages.items()):
+        dp.fsm.storage = storage
+        elapsed = await run_flows(dp, bot, range(offset * users + 1, (offset + 1) * users + 1), storage)
+        result[f"{name}_round_trips_per_flow"] = round(counters[name].count / users, 2)
+        result[f"{name}_ms_per_flow"] = round(elapsed / users * 1000, 2)
+
+    # Діалог має дійти до кінця з обома сховищами
+    result["reminders_created"] = await Reminder.all().count()
+
+    await bot.session.close()
+    await api_runner.cleanup()
+    await Tortoise.close_connections()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
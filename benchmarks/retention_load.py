@@ -0,0 +1,134 @@
+"""
+Архівація неактивних нагадувань під живим навантаженням.
+
+    python -m benchmarks.retention_load --users 200 --active 10 --inactive 200
+    python -m benchmarks.retention_load --batch-size 500
+
+Засіває в SQLite (тимчасовий файл) користувачів з активними і старими неактивними
+нагадуваннями, потім запускає RetentionJob, поки паралельно користувачі гортають
+список нагадувань (fetch_reminders_page). Два прогони: весь обсяг однією транзакцією
+і чанками по `--batch-size`. Друкує JSON: тривалість архівації, затримку сторінки
+списку під час неї та після, розмір таблиці reminders до і після.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from fakeredis import aioredis as fakeredis
+from tortoise import Tortoise
+from benchmarks.webhook_replay import percentile
+from bot.utils.pagination import fetch_reminders_page
+from db.database import init_db, close_db
+from db.models.models import ArchivedReminder, Reminder, User
+from scheduler.retention import RetentionJob
+
+RETENTION_DAYS = 90
+
+
+async def seed(users: int, active: int, inactive: int):
+    await User.bulk_create([User(id=i, telegram_id=100_000 + i) for i in range(1, users + 1)], batch_size=1000)
+    now = int(time.time())
+    old = now - (RETENTION_DAYS + 30) * 86400
+    rows = [
+        Reminder(
+            user_id=user_id,
+            chat_id=100_000 + user_id,
+            text=f"reminder {user_id}:{n}",
+            fire_at=now + 3600 + n if n < active else old + n,
+            is_active=n < active,
+        )
+        for user_id in range(1, users + 1)
+        for n in range(active + inactive)
+    ]
+    await Reminder.bulk_create(rows, batch_size=1000)
+    # auto_now не дає записати старий updated_at через ORM
+    await Tortoise.get_connection("default").execute_query(
+        "UPDATE reminders SET updated_at = ? WHERE is_active = ?",
+        [datetime.fromtimestamp(old, timezone.utc), False],
+    )
+
+
+async def browse(users: int, done: asyncio.Event, interval: float) -> list[float]:
+    latencies = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await fetch_reminders_page(random.randint(1, users))
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def page_latency(users: int, pages: int) -> float:
+    started = time.perf_counter()
+    for _ in range(pages):
+        await fetch_reminders_page(random.randint(1, users))
+    return (time.perf_counter() - started) / pages
+
+
+async def run_mode(args, batch_size: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="reminders-bench-")
+    await init_db(f"sqlite://{workdir}/bench.sqlite3")
+    await seed(args.users, args.active, args.inactive)
+    rows_before = await Reminder.all().count()
+    page_before = await page_latency(args.users, args.pages)
+
+    job = RetentionJob(fakeredis.FakeRedis(decode_responses=True), RETENTION_DAYS, batch_size=batch_size, pause=args.pause)
+    done = asyncio.Event()
+    browsing = asyncio.create_task(browse(args.users, done, args.browse_interval))
+    report = await job.run()
+    done.set()
+    latencies = sorted(await browsing)
+
+    result = {
+        "batch_size": batch_size,
+        "archived": report["archived"],
+        "batches": report["batches"],
+        "archive_sec": report["total_sec"],
+        "pages_during": len(latencies),
+        "page_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "page_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "page_max_ms": round(latencies[-1] * 1000, 2),
+        "page_before_ms": round(page_before * 1000, 3),
+        "page_after_ms": round(await page_latency(args.users, args.pages) * 1000, 3),
+        "reminders_before": rows_before,
+        "reminders_after": await Reminder.all().count(),
+        "archive_rows": await ArchivedReminder.all().count(),
+    }
+    await close_db()
+    return result
+
+
+async def run(args) -> dict:
+    total_inactive = args.users * args.inactive
+    return {
+        "users": args.users,
+        "active_per_user": args.active,
+        "inactive_per_user": args.inactive,
+        "single_transaction": await run_mode(args, total_inactive),
+        "batched": await run_mode(args, args.batch_size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--active", type=int, default=10, help="активних нагадувань на користувача")
+    parser.add_argument("--inactive", type=int, default=200, help="старих неактивних на користувача")
+    parser.add_argument("--batch-size", type=int, default=1000, help="рядків в одній транзакції")
+    parser.add_argument("--pause", type=float, default=0.01, help="пауза між чанками, с")
+    parser.add_argument("--pages", type=int, default=200, help="сторінок для заміру до і після")
+    parser.add_argument("--browse-interval", type=float, default=0.005, help="пауза між сторінками під час архівації, с")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
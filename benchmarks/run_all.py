@@ -0,0 +1,86 @@
+"""
+Запускає всі бенчмарки і зводить результати в один JSON-запис.
+
+    python -m benchmarks.run_all --output results/bench.jsonl
+    python -m benchmarks.run_all --quick
+
+Кожен бенчмарк іде окремим процесом (роутер і метрики — глобальні),
+результат доповнюється комітом і часом запуску; з --output запис дописується в
+JSONL-файл, щоб порівнювати прогони між собою.
+"""
+import argparse
+import json
+import pathlib
+import subprocess
+import sys
+import time
+
+# назва -> (модуль, аргументи повного прогону, аргументи --quick)
+BENCHMARKS = {
+    "date_parser": ("benchmarks.date_parser_bench", ["--repeat", "10000"], ["--repeat", "500"]),
+    "webhook_replay": ("benchmarks.webhook_replay", ["--users", "200"], ["--users", "20"]),
+    "delivery_load": (
+        "benchmarks.delivery_load",
+        ["--users", "100", "--reminders", "3"],
+        ["--users", "20", "--reminders", "2"],
+    ),
+    "fsm_roundtrips": ("benchmarks.fsm_roundtrips", ["--users", "200"], ["--users", "20"]),
+    "bot_pool_load": ("benchmarks.bot_pool_load", ["--burst", "2000"], ["--burst", "500"]),
+    "throttle_flood": ("benchmarks.throttle_flood", ["--spam", "500"], ["--spam", "100", "--users", "10"]),
+    "wakeup_latency": (
+        "benchmarks.wakeup_latency",
+        ["--reminders", "100", "--duration", "10"],
+        ["--reminders", "20", "--duration", "2"],
+    ),
+    "retention_load": (
+        "benchmarks.retention_load",
+        ["--users", "200", "--inactive", "200"],
+        ["--users", "50", "--inactive", "50", "--pages", "50"],
+    ),
+    "fanout_load": ("benchmarks.fanout_load", ["--audience", "1000"], ["--audience", "200"]),
+}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(name: str, quick: bool) -> dict:
+    module, full, short = BENCHMARKS[name]
+    completed = subprocess.run(
+        [sys.executable, "-m", module, *(short if quick else full)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), help="запустити лише вказані")
+    parser.add_argument("--quick", action="store_true", help="зменшені розміри для швидкої перевірки")
+    parser.add_argument("--output", help="JSONL-файл, куди дописати результат")
+    args = parser.parse_args()
+
+    record = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "quick": args.quick,
+        "results": {name: run_benchmark(name, args.quick) for name in args.only or BENCHMARKS},
+    }
+    if args.output:
+        path = pathlib.Path(args.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    print(json.dumps(record, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Флуд створення нагадувань одним користувачем з квотами і без них.
+
+    python -m benchmarks.throttle_flood --spam 500 --users 50
+
+Скрипт-спамер без пауз проходить "Додати нагадування" -> текст з датою і
+періодичністю, поки звичайні користувачі паралельно створюють по одному нагадуванню.
+Прогін без квот і з ThrottlingMiddleware (ліміт апдейтів і квота "create" на
+SlidingWindowLimiter). Друкує JSON: скільки записів у БД зробив спамер, скільки
+апдейтів відкинуто і затримку діалогу звичайних користувачів.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from tortoise import Tortoise
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from benchmarks.webhook_replay import percentile
+from bot.handlers.handlers import router
+from bot.middlewares.scheduler_middleware import SchedulerMiddleware
+from bot.middlewares.throttling_middleware import Quota, ThrottlingMiddleware
+from bot.middlewares.user_middleware import UserCache, UserMiddleware
+from bot.utils.metrics import THROTTLED
+from bot.utils.rate_limiter import SlidingWindowLimiter
+from db.models.models import Reminder
+from scheduler.scheduler import ReminderScheduler
+
+TOKEN = "42:benchmark"
+SPAMMER_ID = 1
+
+
+def dialog(user_id: int, update_ids: itertools.count, text: str) -> list[dict]:
+    now = int(time.time())
+    sender = {"id": user_id, "is_bot": False, "first_name": "User"}
+    chat = {"id": user_id, "type": "private"}
+    return [
+        {
+            "update_id": next(update_ids),
+            "callback_query": {
+                "id": str(next(update_ids)),
+                "chat_instance": str(user_id),
+                "from": sender,
+                "message": {"message_id": 1, "date": now, "chat": chat, "text": "menu"},
+                "data": "add_reminder",
+            },
+        },
+        {
+            "update_id": next(update_ids),
+            "message": {"message_id": next(update_ids), "date": now, "chat": chat, "from": sender, "text": text},
+        },
+    ]
+
+
+async def feed(dp: Dispatcher, bot: Bot, updates: list[dict]):
+    for update in updates:
+        await dp.feed_update(bot, Update.model_validate(update, context={"bot": bot}))
+
+
+def rejected() -> float:
+    return sum(sample.value for metric in THROTTLED.collect() for sample in metric.samples if sample.name.endswith("_total"))
+
+
+async def run_mode(dp: Dispatcher, bot: Bot, args, users: range, update_ids: itertools.count) -> dict:
+    async def spammer():
+        for n in range(args.spam):
+            await feed(dp, bot, dialog(SPAMMER_ID, update_ids, f"спам {n} завтра о 10:00 щодня"))
+
+    async def user(user_id: int) -> float:
+        # Звичайні користувачі приходять протягом флуду
+        await asyncio.sleep(user_id % 10 * 0.01)
+        started = time.perf_counter()
+        await feed(dp, bot, dialog(user_id, update_ids, "Купити молоко завтра о 15:00 щодня"))
+        return time.perf_counter() - started
+
+    rejected_before = rejected()
+    spam_before = await Reminder.filter(user__telegram_id=SPAMMER_ID).count()
+    started = time.perf_counter()
+    _, latencies = await asyncio.gather(spammer(), asyncio.gather(*(user(user_id) for user_id in users)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latencies)
+    return {
+        "elapsed_sec": round(elapsed, 3),
+        "spam_reminders_created": await Reminder.filter(user__telegram_id=SPAMMER_ID).count() - spam_before,
+        "updates_rejected": int(rejected() - rejected_before),
+        "user_reminders_created": await Reminder.filter(user__telegram_id__in=list(users)).count(),
+        "user_dialog_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "user_dialog_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    await Tortoise.init(db_url="sqlite://:memory:", use_tz=True, modules={"models": ["db.models.models"]})
+    await Tortoise.generate_schemas()
+    api_runner, api_port = await serve(FakeBotAPI().app())
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+
+    limiter = SlidingWindowLimiter()
+    updates_throttling = ThrottlingMiddleware(limiter, {})
+    create_throttling = ThrottlingMiddleware(limiter, {}, {})
+    router.message.outer_middleware(updates_throttling)
+    router.callback_query.outer_middleware(updates_throttling)
+    router.message.middleware(create_throttling)
+    router.callback_query.middleware(create_throttling)
+    scheduler_middleware = SchedulerMiddleware(ReminderScheduler(fakeredis.FakeRedis(decode_responses=True)))
+    router.message.middleware(scheduler_middleware)
+    router.callback_query.middleware(scheduler_middleware)
+    user_middleware = UserMiddleware(UserCache())
+    router.message.middleware(user_middleware)
+    router.callback_query.middleware(user_middleware)
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+
+    update_ids = itertools.count(1)
+    result = {"spam_dialogs": args.spam, "users": args.users}
+    result["unthrottled"] = await run_mode(dp, bot, args, range(2, args.users + 2), update_ids)
+
+    updates_throttling.quotas = {"updates": Quota(args.updates_limit, 60.0)}
+    create_throttling.quotas = {"create": Quota(args.create_limit, 60.0)}
+    create_throttling.global_quotas = {"create": Quota(args.global_create_limit, 1.0)}
+    users = range(args.users + 2, 2 * args.users + 2)
+    result["throttled"] = await run_mode(dp, bot, args, users, update_ids)
+
+    await bot.session.close()
+    await api_runner.cleanup()
+    await Tortoise.close_connections()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spam", type=int, default=500, help="діалогів створення від спамера")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--updates-limit", type=int, default=30, help="апдейтів на користувача за хвилину")
+    parser.add_argument("--create-limit", type=int, default=10, help="створень на користувача за хвилину")
+    parser.add_argument("--global-create-limit", type=int, default=200, help="створень на всіх за секунду")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Точність спрацювання і кількість опитувань індексу з опитуванням і з pub/sub-пробудженням.
+
+    python -m benchmarks.wakeup_latency --reminders 100 --duration 10
+
+Один ReminderScheduler грає роль процесу бота: протягом `--duration` секунд ставить
+нагадування (schedule_at) на 1-3 секунди вперед. Інший, запущений як воркер, забирає
+їх з індексу на fakeredis. Прогони: опитування раз на секунду (за замовчуванням),
+агресивне опитування і wakeup="pubsub" з найдовшим сном 30 с. Друкує JSON із лагом
+"забрано з індексу мінус час спрацювання" і кількістю викликів claim_due на секунду.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from fakeredis import aioredis as fakeredis
+from benchmarks.webhook_replay import percentile
+from scheduler.scheduler import ReminderScheduler
+
+MODES = {
+    "poll_1s": ("poll", 1.0),
+    "poll_50ms": ("poll", 0.05),
+    "pubsub": ("pubsub", 30.0),
+}
+
+
+async def run_mode(args, wakeup: str, poll_interval: float) -> dict:
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    worker = ReminderScheduler(redis_client, poll_interval=poll_interval, partitions=args.partitions, wakeup=wakeup)
+    bot = ReminderScheduler(redis_client, partitions=args.partitions, wakeup=wakeup)
+
+    lags: list[float] = []
+    claims = 0
+    claim_due = worker.claim_due
+
+    async def timed_claim_due(now: float | None = None):
+        nonlocal claims
+        claims += 1
+        claimed = await claim_due(now)
+        claimed_at = time.time()
+        lags.extend(claimed_at - due_at for _, due_at in claimed)
+        return claimed
+
+    worker.claim_due = timed_claim_due
+    await worker.start()
+    started = time.perf_counter()
+    for reminder_id in range(1, args.reminders + 1):
+        await asyncio.sleep(random.uniform(0, 2 * args.duration / args.reminders))
+        fire_at = int(time.time()) + random.randint(1, 3)
+        await bot.schedule_at(reminder_id, random.randint(1, 1000), fire_at)
+    # Чекаємо, поки заберуть останні
+    while len(lags) < args.reminders and time.perf_counter() - started < args.duration + 10:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await worker.shutdown()
+    await redis_client.aclose()
+
+    lags.sort()
+    return {
+        "claimed": len(lags),
+        "lag_p50_ms": round(percentile(lags, 50) * 1000, 1),
+        "lag_p99_ms": round(percentile(lags, 99) * 1000, 1),
+        "lag_max_ms": round(lags[-1] * 1000, 1) if lags else None,
+        "claim_calls_per_sec": round(claims / elapsed, 1),
+        "wakeups": worker.wakeups.wakeups if worker.wakeups else 0,
+    }
+
+
+async def run(args) -> dict:
+    result = {"reminders": args.reminders, "duration_sec": args.duration}
+    for name, (wakeup, poll_interval) in MODES.items():
+        result[name] = await run_mode(args, wakeup, poll_interval)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="за скільки секунд поставити всі, с")
+    parser.add_argument("--partitions", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
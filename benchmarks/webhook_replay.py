@@ -0,0 +1,191 @@
+"""
+Прогін записаного потоку апдейтів через вебхук-ендпоінт.
+
+    python -m benchmarks.webhook_replay --updates updates.jsonl
+    python -m benchmarks.webhook_replay --users 200 --concurrency 100
+
+Без --updates генерується синтетичний потік (/start, створення нагадування, список).
+Bot API підміняється локальною заглушкою, БД — SQLite у пам'яті, Redis — fakeredis.
+Результат (updates/sec, p50/p99 обробки та підтвердження) друкується як JSON.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+
+# Налаштування читаються з оточення при імпорті; для прогону вистачає заглушок
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from aiohttp import ClientSession
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from tortoise import Tortoise
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from bot.handlers.handlers import router
+from bot.middlewares.metrics_middleware import MetricsMiddleware
+from bot.middlewares.scheduler_middleware import SchedulerMiddleware
+from bot.middlewares.user_middleware import UserCache, UserMiddleware
+from bot.utils.update_pool import UpdatePool
+from bot.utils.webhook import build_webhook_app
+from scheduler.scheduler import ReminderScheduler
+
+TOKEN = "42:benchmark"
+WEBHOOK_PATH = "/webhook"
+
+
+def generate_updates(users: int) -> list[dict]:
+    update_ids = itertools.count(1)
+    now = int(time.time())
+    updates = []
+
+    def message(user_id: int, text: str) -> dict:
+        return {
+            "update_id": next(update_ids),
+            "message": {
+                "message_id": next(update_ids),
+                "date": now,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+                "text": text,
+                **({"entities": [{"type": "bot_command", "offset": 0, "length": len(text)}]} if text.startswith("/") else {}),
+            },
+        }
+
+    def callback(user_id: int, data: str) -> dict:
+        return {
+            "update_id": next(update_ids),
+            "callback_query": {
+                "id": str(next(update_ids)),
+                "chat_instance": str(user_id),
+                "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+                "message": {
+                    "message_id": 1,
+                    "date": now,
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "menu",
+                },
+                "data": data,
+            },
+        }
+
+    for user_id in range(1, users + 1):
+        updates.append(message(user_id, "/start"))
+    for user_id in range(1, users + 1):
+        updates.append(callback(user_id, "add_reminder"))
+    for user_id in range(1, users + 1):
+        updates.append(message(user_id, "Купити молоко завтра о 15:00"))
+    for user_id in range(1, users + 1):
+        updates.append(callback(user_id, "repeat_daily"))
+    for user_id in range(1, users + 1):
+        updates.append(callback(user_id, "list_reminders"))
+    return updates
+
+
+def raw_owner_id(update: dict) -> int:
+    for key, event in update.items():
+        if isinstance(event, dict) and "from" in event:
+            return event["from"]["id"]
+    return update["update_id"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def replay(updates: list[dict], concurrency: int, workers: int) -> dict:
+    await Tortoise.init(db_url="sqlite://:memory:", use_tz=True, modules={"models": ["db.models.models"]})
+    await Tortoise.generate_schemas()
+
+    api_runner, api_port = await serve(FakeBotAPI().app())
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+
+    scheduler = ReminderScheduler(fakeredis.FakeRedis(decode_responses=True))
+    metrics_middleware = MetricsMiddleware()
+    router.message.middleware(metrics_middleware)
+    router.callback_query.middleware(metrics_middleware)
+    scheduler_middleware = SchedulerMiddleware(scheduler)
+    router.message.middleware(scheduler_middleware)
+    router.callback_query.middleware(scheduler_middleware)
+    user_middleware = UserMiddleware(UserCache())
+    router.message.middleware(user_middleware)
+    router.callback_query.middleware(user_middleware)
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+
+    # Кожна з черг пулу вміщає всі апдейти: заміряємо обробку, а не відмови 503
+    pool = UpdatePool(dp, bot, workers=workers, queue_size=(len(updates) or 1) * workers)
+    webhook_runner, webhook_port = await serve(build_webhook_app(bot, pool, WEBHOOK_PATH))
+    url = f"http://127.0.0.1:{webhook_port}{WEBHOOK_PATH}"
+
+    ack_latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with ClientSession() as client:
+
+        async def post(update: dict):
+            async with semaphore:
+                started = time.perf_counter()
+                async with client.post(url, json=update) as response:
+                    response.raise_for_status()
+                ack_latencies.append(time.perf_counter() - started)
+
+        async def post_stream(stream: list[dict]):
+            for update in stream:
+                await post(update)
+
+        # Порядок зберігається в межах користувача, різні користувачі йдуть паралельно
+        streams: dict[int, list[dict]] = {}
+        for update in updates:
+            streams.setdefault(raw_owner_id(update), []).append(update)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post_stream(stream) for stream in streams.values()))
+        await pool.join()
+        elapsed = time.perf_counter() - started
+
+    handler_latencies = list(pool.latencies)
+    await webhook_runner.cleanup()
+    await api_runner.cleanup()
+    await bot.session.close()
+    await Tortoise.close_connections()
+
+    return {
+        "updates": len(updates),
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+        "updates_per_sec": round(len(updates) / elapsed, 1) if elapsed else None,
+        "handler_p50_ms": round(percentile(handler_latencies, 50) * 1000, 2),
+        "handler_p99_ms": round(percentile(handler_latencies, 99) * 1000, 2),
+        "ack_p50_ms": round(percentile(ack_latencies, 50) * 1000, 2),
+        "ack_p99_ms": round(percentile(ack_latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", help="JSONL-файл із записаними апдейтами")
+    parser.add_argument("--users", type=int, default=100, help="кількість користувачів у синтетичному потоці")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.updates:
+        with open(args.updates, encoding="utf-8") as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = generate_updates(args.users)
+
+    print(json.dumps(asyncio.run(replay(updates, args.concurrency, args.workers)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
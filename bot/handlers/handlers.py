@@ -1,10 +1,14 @@
-from datetime import datetime
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+import io
+import tempfile
+from datetime import datetime, timedelta
+from aiogram import Bot, Router, F
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from db.models.models import User, Reminder, RepeatType
+from aiogram.utils.deep_linking import create_start_link, create_startgroup_link
+from db.config import get_settings
+from db.models.models import User, Reminder, ReminderSubscriber, RepeatType
 from bot.keyboards.keyboards import (
     get_main_keyboard,
     get_repeat_keyboard,
@@ -12,10 +16,19 @@ from bot.keyboards.keyboards import (
     get_reminders_list_keyboard
 )
 from bot.utils.date_parser import parse_datetime, parse_reminder_text
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from bot.utils.job_functions import send_reminder
+from bot.utils.pagination import fetch_reminders_page
+from bot.utils.reminder_io import CalendarExport, ImportReport, import_reminders, is_utf8, iter_rows
+from bot.utils.signing import sign_callback, verify_callback
+from bot.utils.timezones import get_zone, is_valid_zone, local_now, localize, now_epoch, to_epoch, format_epoch
+from bot.middlewares.user_middleware import UserCache
+from scheduler.scheduler import ReminderScheduler, first_occurrence, next_occurrence
 router = Router()
 
+SNOOZE_DELAYS = {
+    "10m": timedelta(minutes=10),
+    "1h": timedelta(hours=1),
+}
+
 
 
 MSG_TXT = """
@@ -35,7 +48,36 @@ date#09.04.2025 time#23:00 repeat#daily
 Також можна вказати періодичність:
 - щоденно
 - щотижня
+- щомісяця
+- щороку
+- по буднях
+- кожні 3 дні
 - без повторення
+
+Або правило RRULE: repeat#FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10
+"""
+
+
+IMPORT_TXT = """
+Надішліть файл CSV або iCalendar (.ics).
+
+CSV — з рядком заголовка, колонки text і date обов'язкові, time і repeat — за бажанням:
+text,date,repeat
+Купити молоко,09.04.2025 23:00,
+Зарядка,2025-04-10 07:30,щодня
+Звіт,завтра о 15:00,FREQ=WEEKLY;BYDAY=MO
+
+Дата розпізнається так само, як у повідомленнях, у вашому часовому поясі.
+"""
+
+
+EDIT_TXT = """
+Надішліть новий текст нагадування — з датою, часом і періодичністю або без них.
+Те, чого не вказано, не зміниться.
+
+Щоб змінити лише час чи періодичність, не чіпаючи текст, використайте маркери:
+date#09.04.2025 time#23:00
+repeat#weekly
 """
 
 
@@ -45,9 +87,45 @@ class ReminderStates(StatesGroup):
     waiting_for_repeat = State()
 
 
+class ImportStates(StatesGroup):
+    waiting_for_file = State()
+
+
+class EditStates(StatesGroup):
+    waiting_for_changes = State()
+
+
+@router.message(CommandStart(deep_link=True, magic=F.args.startswith("sub_")), flags={"throttle": "create"})
+async def cmd_subscribe(message: Message, command: CommandObject, user: User):
+    # /start sub_<id>_<підпис>: посилання з кнопки "Поділитися", особисто або в групі
+    parts = command.args.split("_")
+    if len(parts) != 3 or not parts[1].isdigit() or not verify_callback(parts[2], "sub", int(parts[1])):
+        await message.answer("Недійсне посилання.")
+        return
+    reminder = await Reminder.get_or_none(id=int(parts[1]), is_active=True)
+    if not reminder:
+        await message.answer("Нагадування не знайдено.")
+        return
+    if message.chat.id == reminder.chat_id:
+        await message.answer("Цей чат уже отримує це нагадування.")
+        return
+
+    limit = get_settings().throttle.MAX_SUBSCRIBERS
+    if limit and await ReminderSubscriber.filter(reminder_id=reminder.id).count() >= limit:
+        await message.answer(f"У нагадування вже максимум підписників ({limit}).")
+        return
+    await ReminderSubscriber.get_or_create(reminder_id=reminder.id, chat_id=message.chat.id)
+    if not reminder.shared:
+        await Reminder.filter(id=reminder.id).update(shared=True)
+    await message.answer(
+        f"🔔 Цей чат отримуватиме нагадування: {reminder.text}\n"
+        f"Наступне: {format_epoch(reminder.fire_at or to_epoch(reminder.remind_at), get_zone(user.timezone))}"
+    )
+
+
 @router.message(Command("start"))
 async def cmd_start(message: Message):
-    user, _ = await User.get_or_create(telegram_id=message.from_user.id)
+    # Користувача створює UserMiddleware при першому зверненні
     await message.answer(     
         "👋 Вітаю в боті нагадувань!\n\n"
         "Використовуйте клавіатуру нижче для керування нагадуваннями:",
@@ -61,37 +139,91 @@ async def add_reminder(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(MSG_TXT)
 
 
-@router.message(ReminderStates.waiting_for_text)
-async def process_reminder_text(message: Message, state: FSMContext, scheduler: AsyncIOScheduler):
+async def _save_reminder(
+    user: User,
+    chat_id: int,
+    text: str,
+    remind_at: datetime,
+    repeat: RepeatType,
+    scheduler: ReminderScheduler,
+    rule: str | None = None
+) -> Reminder:
+    reminder = Reminder(
+        user=user,
+        chat_id=chat_id,
+        text=text,
+        remind_at=remind_at,
+        repeat=repeat,
+        recurrence=rule
+    )
+    # Матеріалізуємо лише перше спрацювання; наступні рахуються після кожної відправки
+    reminder.fire_at = first_occurrence(reminder, get_zone(user.timezone)) or to_epoch(remind_at)
+    await reminder.save()
+    await scheduler.schedule_reminder(reminder)
+    await scheduler.forget_counts([user.id])
+    return reminder
+
+
+async def _active_quota_left(user: User, scheduler: ReminderScheduler) -> int | None:
+    """Скільки ще активних нагадувань можна створити; None — без ліміту"""
+    limit = get_settings().throttle.MAX_ACTIVE_REMINDERS
+    if not limit:
+        return None
+    return max(0, limit - await scheduler.active_count(user.id))
+
+
+def _quota_text() -> str:
+    return (
+        f"Досягнуто ліміту активних нагадувань ({get_settings().throttle.MAX_ACTIVE_REMINDERS}). "
+        "Видаліть непотрібні й спробуйте знову."
+    )
+
+
+def _repeat_label(repeat: RepeatType, rule: str | None = None) -> str:
+    return rule if repeat == RepeatType.CUSTOM and rule else repeat.value
+
+
+def _created_text(reminder: Reminder, user: User, title: str = "✅ Нагадування створено успішно!") -> str:
+    return (
+        f"{title}\n\n"
+        f"Текст: {reminder.text}\n"
+        f"Час: {format_epoch(reminder.fire_at or to_epoch(reminder.remind_at), get_zone(user.timezone))}\n"
+        f"Періодичність: {_repeat_label(reminder.repeat, reminder.recurrence)}"
+    )
+
+
+@router.message(ReminderStates.waiting_for_text, flags={"throttle": "create"})
+async def process_reminder_text(message: Message, state: FSMContext, scheduler: ReminderScheduler, user: User):
     if not message.text:
         await message.answer("Будь ласка, введіть текст нагадування.")
         return
+    # Квота перевіряється до розбору тексту: лічильник активних кешований у Redis
+    if await _active_quota_left(user, scheduler) == 0:
+        await message.answer(_quota_text())
+        await state.clear()
+        return
     
-    # Парсимо текст нагадування
-    parsed = parse_reminder_text(message.text)
-    
+    # Парсимо текст нагадування в часовому поясі користувача
+    tz = get_zone(user.timezone)
+    parsed = parse_reminder_text(message.text, now=local_now(tz))
     
     # Якщо знайдено дату та час
     if parsed["remind_at"]:
-        if parsed["remind_at"] < datetime.now():
+        remind_at = localize(parsed["remind_at"], tz)
+        if to_epoch(remind_at) < now_epoch():
             await message.answer("Будь ласка, введіть майбутню дату та час!")
             return
-            
-        user = await User.get(telegram_id=message.from_user.id)
-        reminder = await Reminder.create(
-            user=user,
-            **parsed
-        )
-            
-        job = scheduler.add_job(send_reminder, name=f"user:{user.telegram_id}:task_id:{reminder.id}", trigger='date', run_date=parsed["remind_at"], args=[reminder.id])
-        await message.answer(
-            f"✅ Нагадування створено успішно!\n\n"
-            f"Текст: {parsed['text']}\n"
-            f"Час: {parsed['remind_at'].strftime('%d.%m.%Y %H:%M')}\n"
-            f"Періодичність: {parsed['repeat'].value}"
-        )
+
+        if parsed["repeat"] is not None:
+            reminder = await _save_reminder(
+                user, message.chat.id, parsed["text"], remind_at, parsed["repeat"], scheduler, parsed["rule"]
+            )
+            await message.answer(_created_text(reminder, user))
+            await state.clear()
+            return
             
         # Якщо періодичність не вказана, запитуємо її
+        await state.update_data(text=parsed["text"], remind_at=to_epoch(remind_at))
         await state.set_state(ReminderStates.waiting_for_repeat)
         await message.answer(
             "Виберіть періодичність нагадування:",
@@ -100,6 +232,7 @@ async def process_reminder_text(message: Message, state: FSMContext, scheduler:
         return
     
     # Якщо дата не знайдена, запитуємо її
+    await state.update_data(text=parsed["text"])
     await state.set_state(ReminderStates.waiting_for_time)
     await message.answer(
         "Введіть дату та час нагадування.\n\n"
@@ -113,12 +246,13 @@ async def process_reminder_text(message: Message, state: FSMContext, scheduler:
 
 
 @router.message(ReminderStates.waiting_for_time)
-async def process_reminder_time(message: Message, state: FSMContext, scheduler: AsyncIOScheduler):
+async def process_reminder_time(message: Message, state: FSMContext, scheduler: ReminderScheduler, user: User):
     if not message.text:
         await message.answer("Будь ласка, введіть дату та час.")
         return
         
-    remind_at = parse_datetime(message.text)
+    tz = get_zone(user.timezone)
+    remind_at = parse_datetime(message.text, now=local_now(tz))
     if not remind_at:
         await message.answer(
             "Не вдалося розпізнати дату та час. Спробуйте ще раз.\n\n"
@@ -131,12 +265,13 @@ async def process_reminder_time(message: Message, state: FSMContext, scheduler:
         )
         return
 
-    if remind_at < datetime.now():
+    remind_at = localize(remind_at, tz)
+    if to_epoch(remind_at) < now_epoch():
         await message.answer("Будь ласка, введіть майбутню дату та час!")
         return
 
-    # Зберігаємо дату як рядок ISO формату
-    await state.update_data(remind_at=remind_at.isoformat())
+    # Зберігаємо дату як epoch: компактно в FSM і без повторного розбору рядка
+    await state.update_data(remind_at=to_epoch(remind_at))
     await state.set_state(ReminderStates.waiting_for_repeat)
     await message.answer(
         "Виберіть періодичність нагадування:",
@@ -144,101 +279,448 @@ async def process_reminder_time(message: Message, state: FSMContext, scheduler:
     )
 
 
-@router.callback_query(F.data.startswith("repeat_"))
-async def process_repeat_option(callback: CallbackQuery, state: FSMContext, scheduler: AsyncIOScheduler):
-    repeat_type = callback.data.split("_")[1]
+@router.callback_query(F.data.startswith("repeat_"), flags={"throttle": "create"})
+async def process_repeat_option(callback: CallbackQuery, state: FSMContext, scheduler: ReminderScheduler, user: User):
+    if await _active_quota_left(user, scheduler) == 0:
+        await callback.message.edit_text(_quota_text())
+        await state.clear()
+        return
+    repeat = RepeatType(callback.data.split("_")[1])
     data = await state.get_data()
+    remind_at = datetime.fromtimestamp(data["remind_at"], get_zone(user.timezone))
     
-    user = await User.get(telegram_id=callback.from_user.id)
-    reminder = await Reminder.create(
-        user=user,
-        text=data["text"],
-        remind_at=datetime.fromisoformat(data["remind_at"]),
-        repeat=RepeatType(repeat_type)
-    )
+    reminder = await _save_reminder(user, callback.message.chat.id, data["text"], remind_at, repeat, scheduler)
+    await callback.message.edit_text(_created_text(reminder, user))
+    await state.clear()
+
+
+@router.message(Command("timezone"))
+async def cmd_timezone(message: Message, command: CommandObject, user: User, user_cache: UserCache):
+    if not command.args:
+        await message.answer(
+            f"Ваш часовий пояс: {get_zone(user.timezone).key}\n\n"
+            "Щоб змінити, надішліть, наприклад:\n"
+            "/timezone Europe/Kyiv"
+        )
+        return
+
+    name = command.args.strip()
+    if not is_valid_zone(name):
+        await message.answer("Невідомий часовий пояс. Приклад: Europe/Kyiv")
+        return
+
+    user.timezone = name
+    await user.save(update_fields=["timezone"])
+    await user_cache.store(user)
+    await message.answer(f"✅ Часовий пояс змінено на {name}")
+
+
+@router.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext):
+    await state.set_state(ImportStates.waiting_for_file)
+    await message.answer(IMPORT_TXT)
+
+
+def _import_report_text(report: ImportReport, max_rows: int) -> str:
+    lines = [f"✅ Імпортовано нагадувань: {report.imported}"]
+    if report.past:
+        lines.append(f"Пропущено (час уже минув): {report.past}")
+    if report.truncated:
+        lines.append(f"Імпорт зупинено на ліміті {max_rows} рядків")
+    if report.error_count:
+        lines.append(f"\nПомилок: {report.error_count}")
+        lines.extend(f"- рядок {line}: {error}" for line, error in report.errors)
+    return "\n".join(lines)
+
+
+@router.message(ImportStates.waiting_for_file, F.document, flags={"throttle": "create"})
+async def process_import_file(message: Message, state: FSMContext, bot: Bot, scheduler: ReminderScheduler, user: User):
+    document = message.document
+    limits = get_settings().imports
+    if (document.file_size or 0) > limits.IMPORT_MAX_BYTES:
+        await message.answer(f"Файл завеликий, максимум {limits.IMPORT_MAX_BYTES // 1024} КБ.")
+        return
+    # Імпорт не виводить користувача за ліміт активних нагадувань
+    max_rows = limits.IMPORT_MAX_ROWS
+    quota_left = await _active_quota_left(user, scheduler)
+    if quota_left == 0:
+        await message.answer(_quota_text())
+        await state.clear()
+        return
+    if quota_left is not None:
+        max_rows = min(max_rows, quota_left)
+
+    # Файл не тримаємо в пам'яті цілком: великий скидається на диск, рядки читаються по одному
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as raw:
+        await bot.download(document, destination=raw)
+        if not is_utf8(raw):
+            await state.clear()
+            await message.answer("Файл має бути в кодуванні UTF-8.")
+            return
+        stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        try:
+            report = await import_reminders(
+                iter_rows(stream, document.file_name or "", get_zone(user.timezone)),
+                user,
+                message.chat.id,
+                scheduler,
+                chunk_size=limits.IMPORT_CHUNK_SIZE,
+                max_rows=max_rows,
+            )
+        finally:
+            stream.detach()
 
-    await scheduler.schedule_reminder(reminder)
-    await callback.message.edit_text(
-        f"✅ Нагадування створено успішно!\n\n"
-        f"Текст: {data['text']}\n"
-        f"Час: {datetime.fromisoformat(data['remind_at']).strftime('%d.%m.%Y %H:%M')}\n"
-        f"Періодичність: {repeat_type}"
-    )
     await state.clear()
+    await message.answer(_import_report_text(report, max_rows))
 
 
-@router.callback_query(F.data == "list_reminders")
-async def list_reminders(callback: CallbackQuery):
-    user = await User.get(telegram_id=callback.from_user.id)
-    reminders = await Reminder.filter(user=user, is_active=True)
+@router.message(ImportStates.waiting_for_file)
+async def process_import_not_file(message: Message):
+    await message.answer("Надішліть файл .csv або .ics документом.")
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, user: User, scheduler: ReminderScheduler):
+    if not await scheduler.active_count(user.id):
+        await message.answer("У вас немає активних нагадувань.")
+        return
+    await message.answer_document(CalendarExport(user), caption="📅 Ваші активні нагадування")
+
+
+@router.message(Command("digest"))
+async def cmd_digest(message: Message, command: CommandObject, user: User, user_cache: UserCache):
+    value = (command.args or "").strip().lower()
+    if value not in ("on", "off"):
+        await message.answer(
+            f"Дайджест: {'увімкнено' if user.digest else 'вимкнено'}\n\n"
+            "Нагадування, що настають майже одночасно, приходитимуть одним повідомленням.\n"
+            "/digest on — увімкнути, /digest off — вимкнути"
+        )
+        return
+
+    user.digest = value == "on"
+    await user.save(update_fields=["digest"])
+    await user_cache.store(user)
+    await message.answer("✅ Дайджест увімкнено" if user.digest else "✅ Дайджест вимкнено")
+
+
+async def _show_reminders_page(
+    callback: CallbackQuery,
+    user: User,
+    scheduler: ReminderScheduler,
+    cursor: tuple[int, int] | None = None,
+    backward: bool = False
+):
+    reminders, has_prev, has_next = await fetch_reminders_page(user.id, cursor, backward)
     
     if not reminders:
         await callback.message.edit_text("У вас немає активних нагадувань.")
         return
 
+    total = await scheduler.active_count(user.id)
     await callback.message.edit_text(
-        "Ваші активні нагадування:",
-        reply_markup=get_reminders_list_keyboard(reminders)
+        f"Ваші активні нагадування ({total}):",
+        reply_markup=get_reminders_list_keyboard(reminders, get_zone(user.timezone), has_prev, has_next)
+    )
+
+
+@router.callback_query(F.data == "list_reminders")
+async def list_reminders(callback: CallbackQuery, user: User, scheduler: ReminderScheduler):
+    await _show_reminders_page(callback, user, scheduler)
+
+
+@router.callback_query(F.data.startswith("page_"))
+async def paginate_reminders(callback: CallbackQuery, user: User, scheduler: ReminderScheduler):
+    # page_<next|prev>_<fire_at>_<id>: курсор — крайній елемент поточної сторінки
+    _, direction, fire_at, reminder_id = callback.data.split("_")
+    await _show_reminders_page(
+        callback, user, scheduler,
+        cursor=(int(fire_at), int(reminder_id)),
+        backward=direction == "prev"
     )
 
 
 @router.callback_query(F.data.startswith("reminder_"))
-async def show_reminder_details(callback: CallbackQuery):
+async def show_reminder_details(callback: CallbackQuery, user: User):
     reminder_id = int(callback.data.split("_")[1])
-    reminder = await Reminder.get_or_none(id=reminder_id)
+    reminder = await Reminder.get_or_none(id=reminder_id, user=user)
     
     if not reminder:
         await callback.message.edit_text("Нагадування не знайдено.")
         return
 
+    subscribers = await ReminderSubscriber.filter(reminder_id=reminder.id).count() if reminder.shared else 0
     await callback.message.edit_text(
         f"Деталі нагадування:\n\n"
         f"Текст: {reminder.text}\n"
-        f"Час: {reminder.remind_at.strftime('%d.%m.%Y %H:%M')}\n"
-        f"Періодичність: {reminder.repeat.value}",
+        f"Час: {format_epoch(reminder.fire_at or to_epoch(reminder.remind_at), get_zone(user.timezone))}\n"
+        f"Періодичність: {_repeat_label(reminder.repeat, reminder.recurrence)}"
+        + (f"\nПідписників: {subscribers}" if subscribers else ""),
         reply_markup=get_reminder_actions_keyboard(reminder.id)
     )
 
 
+@router.callback_query(F.data.startswith("share_"))
+async def share_reminder(callback: CallbackQuery, bot: Bot, user: User):
+    reminder_id = int(callback.data.split("_")[1])
+    reminder = await Reminder.get_or_none(id=reminder_id, user=user, is_active=True)
+    if not reminder:
+        await callback.message.edit_text("Нагадування не знайдено.")
+        return
+
+    # Нагадування зберігається і планується один раз, скільки б чатів не підписалось
+    payload = f"sub_{reminder.id}_{sign_callback('sub', reminder.id)}"
+    await callback.message.edit_text(
+        f"Нагадування «{reminder.text}» отримуватиме кожен, хто відкриє посилання:\n\n"
+        f"Особисто: {await create_start_link(bot, payload)}\n"
+        f"У групу: {await create_startgroup_link(bot, payload)}"
+    )
+
+
+async def _append_status(callback: CallbackQuery, status: str):
+    """
+    Дописує статус під текстом повідомлення з кнопкою. Старіше за 48 годин повідомлення
+    приходить як InaccessibleMessage і не редагується — тоді статус лише у сповіщенні.
+    """
+    message = callback.message
+    if isinstance(message, Message) and message.text is not None:
+        await message.edit_text(f"{message.text}\n\n{status}")
+    else:
+        await callback.answer(status)
+
+
+@router.callback_query(F.data.startswith("unsub_"))
+async def unsubscribe(callback: CallbackQuery):
+    # unsub_<id>: лише з повідомлення, яке нагадування надіслало в цей чат
+    reminder_id = int(callback.data.split("_")[1])
+    deleted = await ReminderSubscriber.filter(reminder_id=reminder_id, chat_id=callback.message.chat.id).delete()
+    await _append_status(callback, "🔕 Ви відписалися" if deleted else "Підписку не знайдено.")
+
+
 @router.callback_query(F.data.startswith("delete_"))
-async def delete_reminder(callback: CallbackQuery, scheduler: AsyncIOScheduler):
+async def delete_reminder(callback: CallbackQuery, scheduler: ReminderScheduler, user: User):
     reminder_id = int(callback.data.split("_")[1])
-    reminder = await Reminder.get_or_none(id=reminder_id)
+    reminder = await Reminder.get_or_none(id=reminder_id, user=user)
     
     if not reminder:
         await callback.message.edit_text("Нагадування не знайдено.")
         return
 
-    await scheduler.remove_reminder(reminder.id)
+    await scheduler.remove_reminder(reminder)
     reminder.is_active = False
-    await reminder.save()
+    # Без fire_at кнопки відкладення під уже надісланими повідомленнями його не відновлять
+    reminder.fire_at = None
+    # updated_at — час видалення, від нього рахується термін зберігання (scheduler.retention)
+    await reminder.save(update_fields=["is_active", "fire_at", "updated_at"])
+    await scheduler.forget_counts([user.id])
     
     await callback.message.edit_text("✅ Нагадування видалено успішно!")
 
 
+def _snooze_until(action: str, occurrence: int, user: User) -> int:
+    if action in SNOOZE_DELAYS:
+        return now_epoch() + int(SNOOZE_DELAYS[action].total_seconds())
+    # Завтра о тій самій годині, що й це спрацювання
+    tz = get_zone(user.timezone)
+    at = datetime.fromtimestamp(occurrence, tz).replace(tzinfo=None).time()
+    return to_epoch(localize(datetime.combine(local_now(tz).date() + timedelta(days=1), at), tz))
+
+
+async def _snooze(
+    action: str, reminder_id: int, occurrence: int, user: User, scheduler: ReminderScheduler
+) -> tuple[int | None, bool]:
+    """
+    Переносить спрацювання. Повертає (новий час, False); (None, False) — нагадування вже
+    видалене, (None, True) — його довелося б знову активувати, а ліміт активних вичерпано.
+    """
+    fire_at = _snooze_until(action, occurrence, user)
+    # Один UPDATE за первинним ключем для активного (повторюваного чи ще не доставленого)
+    if await Reminder.filter(id=reminder_id, user_id=user.id, is_active=True).update(fire_at=fire_at):
+        await scheduler.schedule_at(reminder_id, user.id, fire_at)
+        return fire_at, False
+
+    # One-time після доставки зберігає fire_at спрацювання (видалене — ні, див. delete_reminder);
+    # відкладення знову робить його активним, тож воно рахується в ліміт
+    inactive = Reminder.filter(id=reminder_id, user_id=user.id, is_active=False, fire_at=occurrence)
+    if not await inactive.exists():
+        return None, False
+    if await _active_quota_left(user, scheduler) == 0:
+        return None, True
+    if not await inactive.update(fire_at=fire_at, is_active=True):
+        return None, False
+    await scheduler.schedule_at(reminder_id, user.id, fire_at)
+    await scheduler.forget_counts([user.id])
+    return fire_at, False
+
+
+@router.callback_query(F.data.startswith("ack_"))
+async def acknowledge_reminder(callback: CallbackQuery, scheduler: ReminderScheduler, user: User):
+    # ack_<done|10m|1h|tmrw>_<id>_<спрацювання>_<підпис>
+    _, action, reminder_id, occurrence, signature = callback.data.split("_")
+    reminder_id, occurrence = int(reminder_id), int(occurrence)
+    if not verify_callback(signature, reminder_id, occurrence, callback.message.chat.id):
+        await callback.answer("Недійсна кнопка.")
+        return
+
+    if action == "done":
+        await _append_status(callback, "✅ Виконано")
+        return
+
+    fire_at, over_quota = await _snooze(action, reminder_id, occurrence, user, scheduler)
+    if over_quota:
+        await callback.answer(_quota_text(), show_alert=True)
+        return
+    if fire_at is None:
+        await _append_status(callback, "Нагадування не знайдено.")
+        return
+    await _append_status(callback, f"⏰ Відкладено до {format_epoch(fire_at, get_zone(user.timezone))}")
+
+
+@router.callback_query(F.data.startswith("dg_"))
+async def acknowledge_digest_item(callback: CallbackQuery, scheduler: ReminderScheduler, user: User):
+    # dg_<done|10m|1h|tmrw>_<id>_<спрацювання>_<номер пункту>_<підпис>
+    _, action, reminder_id, occurrence, number, signature = callback.data.split("_")
+    reminder_id, occurrence = int(reminder_id), int(occurrence)
+    if not verify_callback(signature, reminder_id, occurrence, callback.message.chat.id):
+        await callback.answer("Недійсна кнопка.")
+        return
+
+    if action == "done":
+        mark = "✅"
+    else:
+        fire_at, over_quota = await _snooze(action, reminder_id, occurrence, user, scheduler)
+        if over_quota:
+            # Пункт лишається з кнопками: після звільнення ліміту його можна відкласти знову
+            await callback.answer(_quota_text(), show_alert=True)
+            return
+        mark = f"⏰ {format_epoch(fire_at, get_zone(user.timezone))}" if fire_at else "❔"
+
+    message = callback.message
+    if not isinstance(message, Message) or message.text is None:
+        # Дайджест старіший за 48 годин уже не редагується
+        await callback.answer(f"{number}. {mark}")
+        return
+
+    # Позначаємо лише свій пункт і прибираємо його кнопки, решта дайджесту лишається
+    lines = message.text.split("\n")
+    prefix = f"{number}. "
+    lines = [f"{prefix}{mark} {line[len(prefix):]}" if line.startswith(prefix) else line for line in lines]
+    rows = [
+        row for row in (message.reply_markup.inline_keyboard if message.reply_markup else [])
+        if not row[0].callback_data.endswith(f"_{reminder_id}_{occurrence}_{number}_{signature}")
+    ]
+    await message.edit_text(
+        "\n".join(lines),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+    )
+
+
+async def _update_reminder(
+    reminder: Reminder,
+    user: User,
+    scheduler: ReminderScheduler,
+    text: str,
+    remind_at: datetime | None,
+    repeat: RepeatType | None,
+    rule: str | None = None
+) -> list[str] | None:
+    """
+    Зберігає лише поля, що відрізняються від рядка, одним UPDATE; індекс планувальника
+    оновлюється (ZADD міняє час на місці), лише якщо змінився час спрацювання.
+    Повертає змінені поля; None — зміна знову зробила б неактивне нагадування активним,
+    а ліміт активних вичерпано (нічого не збережено).
+    """
+    changed = []
+    if text and text != reminder.text:
+        reminder.text = text
+        changed.append("text")
+    if remind_at and to_epoch(remind_at) != to_epoch(reminder.remind_at):
+        reminder.remind_at = remind_at
+        changed.append("remind_at")
+    if repeat is not None and (repeat, rule) != (reminder.repeat, reminder.recurrence):
+        reminder.repeat, reminder.recurrence = repeat, rule
+        changed += ["repeat", "recurrence"]
+    if "remind_at" not in changed and "repeat" not in changed:
+        if changed:
+            await reminder.save(update_fields=[*changed, "updated_at"])
+        return changed
+
+    tz = get_zone(user.timezone)
+    now = now_epoch()
+    if "remind_at" in changed:
+        # Новий час — нова точка відліку серії
+        fire_at = first_occurrence(reminder, tz)
+    elif reminder.repeat == RepeatType.NONE:
+        # Серія стала одноразовою: лишається найближче заплановане спрацювання
+        fire_at = reminder.fire_at if reminder.is_active and (reminder.fire_at or 0) > now else None
+        if fire_at and fire_at != to_epoch(reminder.remind_at):
+            reminder.remind_at = datetime.fromtimestamp(fire_at, tz)
+            changed.append("remind_at")
+    else:
+        fire_at = next_occurrence(reminder, now, tz)
+
+    if not reminder.is_active and fire_at is not None and await _active_quota_left(user, scheduler) == 0:
+        return None
+    if fire_at != reminder.fire_at:
+        reminder.fire_at = fire_at
+        changed.append("fire_at")
+    if reminder.is_active != (fire_at is not None):
+        reminder.is_active = fire_at is not None
+        changed.append("is_active")
+    # updated_at входить явно: частковий save сам його не оновлює, а від нього рахується архівація
+    await reminder.save(update_fields=[*changed, "updated_at"])
+    if "fire_at" in changed:
+        if fire_at:
+            await scheduler.schedule_at(reminder.id, user.id, fire_at)
+        else:
+            await scheduler.remove_reminder(reminder)
+    if "is_active" in changed:
+        await scheduler.forget_counts([user.id])
+    return changed
+
+
 @router.callback_query(F.data.startswith("edit_"))
-async def edit_reminder(callback: CallbackQuery, state: FSMContext, scheduler: AsyncIOScheduler):
+async def edit_reminder(callback: CallbackQuery, state: FSMContext, user: User):
     reminder_id = int(callback.data.split("_")[1])
-    reminder = await Reminder.get_or_none(id=reminder_id)
+    reminder = await Reminder.get_or_none(id=reminder_id, user=user)
     
     if not reminder:
         await callback.message.edit_text("Нагадування не знайдено.")
         return
 
-    await state.update_data(reminder_id=reminder_id)
-    await state.set_state(ReminderStates.waiting_for_text)
-    await callback.message.edit_text(
-        "Введіть новий текст нагадування.\n\n"
-        "Ви можете вказати дату та час прямо в тексті:\n"
-        "- завтра о 15:00\n"
-        "- післязавтра о 12:00\n"
-        "- в понеділок о 18:30\n"
-        "- сьогодні о півночі\n"
-        "- 09.04.2025 23:00\n\n"
-        "Або використайте спеціальний формат:\n"
-        "date#09.04.2025 time#23:00 repeat#daily\n\n"
-        "Також можна вказати періодичність:\n"
-        "- щоденно\n"
-        "- щотижня\n"
-        "- без повторення"
-    ) 
\ No newline at end of file
+    await state.set_state(EditStates.waiting_for_changes)
+    await state.set_data({"reminder_id": reminder_id})
+    await callback.message.edit_text(EDIT_TXT)
+
+
+@router.message(EditStates.waiting_for_changes, flags={"throttle": "create"})
+async def process_edit_text(message: Message, state: FSMContext, scheduler: ReminderScheduler, user: User):
+    if not message.text:
+        await message.answer("Будь ласка, введіть новий текст, дату чи періодичність нагадування.")
+        return
+
+    data = await state.get_data()
+    reminder = await Reminder.get_or_none(id=data.get("reminder_id"), user=user)
+    if not reminder:
+        await state.clear()
+        await message.answer("Нагадування не знайдено.")
+        return
+
+    tz = get_zone(user.timezone)
+    parsed = parse_reminder_text(message.text, now=local_now(tz))
+    remind_at = localize(parsed["remind_at"], tz) if parsed["remind_at"] else None
+    if remind_at and to_epoch(remind_at) < now_epoch():
+        await message.answer("Будь ласка, введіть майбутню дату та час!")
+        return
+
+    changed = await _update_reminder(
+        reminder, user, scheduler, parsed["text"], remind_at, parsed["repeat"], parsed["rule"]
+    )
+    await state.clear()
+    if changed is None:
+        await message.answer(_quota_text())
+        return
+    if not changed:
+        await message.answer("Нічого не змінено.")
+        return
+    await message.answer(_created_text(reminder, user, "✅ Нагадування оновлено!"))
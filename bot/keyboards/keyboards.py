@@ -1,6 +1,9 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from zoneinfo import ZoneInfo
 from db.models.models import RepeatType
+from bot.utils.signing import sign_callback
+from bot.utils.timezones import format_epoch
 
 
 def get_main_keyboard() -> InlineKeyboardMarkup:
@@ -17,11 +20,14 @@ def get_main_keyboard() -> InlineKeyboardMarkup:
 def get_repeat_keyboard() -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     keyboard.add(
-        InlineKeyboardButton(text="Немає", callback_data=f"repeat_{RepeatType.NONE}"),
-        InlineKeyboardButton(text="Щоденно", callback_data=f"repeat_{RepeatType.DAILY}"),
-        InlineKeyboardButton(text="Щотижня", callback_data=f"repeat_{RepeatType.WEEKLY}")
+        InlineKeyboardButton(text="Немає", callback_data=f"repeat_{RepeatType.NONE.value}"),
+        InlineKeyboardButton(text="Щоденно", callback_data=f"repeat_{RepeatType.DAILY.value}"),
+        InlineKeyboardButton(text="Щотижня", callback_data=f"repeat_{RepeatType.WEEKLY.value}"),
+        InlineKeyboardButton(text="По буднях", callback_data=f"repeat_{RepeatType.WEEKDAYS.value}"),
+        InlineKeyboardButton(text="Щомісяця", callback_data=f"repeat_{RepeatType.MONTHLY.value}"),
+        InlineKeyboardButton(text="Щороку", callback_data=f"repeat_{RepeatType.YEARLY.value}")
     )
-    keyboard.adjust(1, 1, 1)
+    keyboard.adjust(1, 2, 1, 2)
     return keyboard.as_markup()
 
 
@@ -29,20 +35,66 @@ def get_reminder_actions_keyboard(reminder_id: int) -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     keyboard.add(
         InlineKeyboardButton(text="❌ Видалити", callback_data=f"delete_{reminder_id}"),
-        InlineKeyboardButton(text="🔄 Редагувати", callback_data=f"edit_{reminder_id}")
+        InlineKeyboardButton(text="🔄 Редагувати", callback_data=f"edit_{reminder_id}"),
+        InlineKeyboardButton(text="👥 Поділитися", callback_data=f"share_{reminder_id}")
     )
-    keyboard.adjust(2)
+    keyboard.adjust(2, 1)
     return keyboard.as_markup()
 
 
-def get_reminders_list_keyboard(reminders: list) -> InlineKeyboardMarkup:
+def get_reminders_list_keyboard(reminders: list[dict], tz: ZoneInfo, has_prev: bool = False, has_next: bool = False) -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     for reminder in reminders:
-        keyboard.add(
+        keyboard.row(
             InlineKeyboardButton(
-                text=f"{reminder.text[:30]}... ({reminder.remind_at.strftime('%d.%m.%Y %H:%M')})",
-                callback_data=f"reminder_{reminder.id}"
+                text=f"{reminder['label']}... ({format_epoch(reminder['fire_at'], tz)})",
+                callback_data=f"reminder_{reminder['id']}"
             )
         )
-    keyboard.adjust(1)
-    return keyboard.as_markup() 
\ No newline at end of file
+
+    # Курсор сторінки — (fire_at, id) першого або останнього елемента
+    navigation = []
+    if has_prev:
+        first = reminders[0]
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"page_prev_{first['fire_at']}_{first['id']}"))
+    if has_next:
+        last = reminders[-1]
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"page_next_{last['fire_at']}_{last['id']}"))
+    if navigation:
+        keyboard.row(*navigation)
+    return keyboard.as_markup()
+
+
+def get_delivered_keyboard(reminder_id: int, occurrence: int, chat_id: int) -> InlineKeyboardMarkup:
+    # ack_<дія>_<id>_<спрацювання>_<підпис>: підпис перевіряється без звернення до БД
+    signature = sign_callback(reminder_id, occurrence, chat_id)
+    keyboard = InlineKeyboardBuilder()
+    keyboard.add(
+        InlineKeyboardButton(text="✅ Готово", callback_data=f"ack_done_{reminder_id}_{occurrence}_{signature}"),
+        InlineKeyboardButton(text="⏰ 10 хв", callback_data=f"ack_10m_{reminder_id}_{occurrence}_{signature}"),
+        InlineKeyboardButton(text="⏰ 1 год", callback_data=f"ack_1h_{reminder_id}_{occurrence}_{signature}"),
+        InlineKeyboardButton(text="⏰ Завтра", callback_data=f"ack_tmrw_{reminder_id}_{occurrence}_{signature}")
+    )
+    keyboard.adjust(1, 3)
+    return keyboard.as_markup()
+
+
+def get_digest_keyboard(items: list[tuple[int, int]], chat_id: int) -> InlineKeyboardMarkup:
+    # Рядок кнопок на кожен пункт: dg_<дія>_<id>_<спрацювання>_<номер>_<підпис>
+    keyboard = InlineKeyboardBuilder()
+    for number, (reminder_id, occurrence) in enumerate(items, 1):
+        suffix = f"{reminder_id}_{occurrence}_{number}_{sign_callback(reminder_id, occurrence, chat_id)}"
+        keyboard.row(
+            InlineKeyboardButton(text=f"{number}. ✅", callback_data=f"dg_done_{suffix}"),
+            InlineKeyboardButton(text="10 хв", callback_data=f"dg_10m_{suffix}"),
+            InlineKeyboardButton(text="1 год", callback_data=f"dg_1h_{suffix}"),
+            InlineKeyboardButton(text="Завтра", callback_data=f"dg_tmrw_{suffix}")
+        )
+    return keyboard.as_markup()
+
+
+def get_subscriber_keyboard(reminder_id: int) -> InlineKeyboardMarkup:
+    # Відписка стосується лише чату, в якому натиснули кнопку, тож підпис не потрібен
+    keyboard = InlineKeyboardBuilder()
+    keyboard.add(InlineKeyboardButton(text="🔕 Відписатися", callback_data=f"unsub_{reminder_id}"))
+    return keyboard.as_markup()
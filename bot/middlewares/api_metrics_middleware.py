@@ -0,0 +1,28 @@
+import time
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from bot.utils.metrics import BOT_API_ERRORS, BOT_API_LATENCY
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Час кожного запиту до Bot API за методом і пулом з'єднань (intake чи delivery)"""
+
+    def __init__(self, pool: str):
+        self.pool = pool
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            BOT_API_ERRORS.labels(self.pool, name, type(e).__name__).inc()
+            raise
+        finally:
+            BOT_API_LATENCY.labels(self.pool, name).observe(time.perf_counter() - started)
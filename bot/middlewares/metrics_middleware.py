@@ -0,0 +1,20 @@
+
+import time
+from typing import Any, Callable
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+from bot.utils.metrics import HANDLER_ERRORS, HANDLER_LATENCY
+
+class MetricsMiddleware(BaseMiddleware):
+    async def __call__(self, handler: Callable, event: Message | CallbackQuery, data: dict[str, Any]):
+        # aiogram кладе HandlerObject обраного хендлера в data["handler"]
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.perf_counter() - started)
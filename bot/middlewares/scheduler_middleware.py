@@ -2,15 +2,13 @@
 from typing import Any, Callable
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
-from aiogram.fsm.context import FSMContext
-from bot.utils.get_bot import get_scheduler
+from scheduler.scheduler import ReminderScheduler
 
 class SchedulerMiddleware(BaseMiddleware):
-    def __init__(self):    
-        self.scheduler = get_scheduler()
+    def __init__(self, scheduler: ReminderScheduler):
+        self.scheduler = scheduler
 
 
     async def __call__(self, handler: Callable, event: Message | CallbackQuery, data: dict[str, Any]):
         data["scheduler"] = self.scheduler
         return await handler(event, data)
-
@@ -0,0 +1,79 @@
+import math
+import time
+from typing import Any, Callable, NamedTuple, Protocol
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message, CallbackQuery
+from bot.utils.metrics import THROTTLED
+
+
+class Quota(NamedTuple):
+    limit: int
+    window: float
+
+
+class Limiter(Protocol):
+    async def hit(self, key: str, limit: int, window: float) -> float: ...
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Відкидає апдейти понад квоти до будь-якої роботи з БД.
+
+    Квота обирається прапорцем хендлера `flags={"throttle": "create"}`; без прапорця —
+    квота "updates". Зовнішнім (outer) middleware хендлер ще не відомий, тож там діє лише
+    "updates" — дешевий ліміт ще до FSM і фільтрів; внутрішнім — квоти прапорців.
+    `global_quotas` обмежують ту саму дію для всіх користувачів разом.
+    """
+
+    def __init__(
+        self,
+        limiter: Limiter,
+        quotas: dict[str, Quota],
+        global_quotas: dict[str, Quota] | None = None,
+        max_warned: int = 10_000,
+    ):
+        self.limiter = limiter
+        self.quotas = {name: quota for name, quota in quotas.items() if quota.limit > 0}
+        self.global_quotas = {name: quota for name, quota in (global_quotas or {}).items() if quota.limit > 0}
+        self.max_warned = max_warned
+        # Кому вже відповіли про ліміт: на кожне зайве повідомлення не відповідаємо
+        self._warned: dict[int, float] = {}
+
+    async def _retry_after(self, name: str, user_id: int) -> tuple[str, float]:
+        quota = self.quotas.get(name)
+        if quota:
+            retry_after = await self.limiter.hit(f"{name}:{user_id}", quota.limit, quota.window)
+            if retry_after:
+                return "user", retry_after
+        quota = self.global_quotas.get(name)
+        if quota:
+            retry_after = await self.limiter.hit(f"{name}:all", quota.limit, quota.window)
+            if retry_after:
+                return "global", retry_after
+        return "", 0.0
+
+    def _should_warn(self, user_id: int, retry_after: float) -> bool:
+        now = time.monotonic()
+        if self._warned.get(user_id, 0.0) > now:
+            return False
+        if len(self._warned) > self.max_warned:
+            self._warned = {key: until for key, until in self._warned.items() if until > now}
+        self._warned[user_id] = now + retry_after
+        return True
+
+    async def __call__(self, handler: Callable, event: Message | CallbackQuery, data: dict[str, Any]):
+        name = get_flag(data, "throttle") or "updates"
+        if not event.from_user or (name not in self.quotas and name not in self.global_quotas):
+            return await handler(event, data)
+
+        scope, retry_after = await self._retry_after(name, event.from_user.id)
+        if not retry_after:
+            return await handler(event, data)
+
+        THROTTLED.labels(name, scope).inc()
+        text = f"⏳ Забагато запитів. Спробуйте через {math.ceil(retry_after)} с."
+        if isinstance(event, CallbackQuery):
+            await event.answer(text)
+        elif self._should_warn(event.from_user.id, retry_after):
+            await event.answer(text)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable
+import redis.asyncio as redis
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+from db.models.models import User
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = "users:tg:{}"
+# "<процес> <telegram_id>": користувача змінено, локальні копії в інших процесах застаріли
+INVALIDATE_CHANNEL = "users:invalidate"
+RESUBSCRIBE_DELAY = 1.0
+
+
+class UserCache:
+    """
+    telegram_id -> User: локальний LRU з TTL, опційно з Redis другим рівнем (`shared`),
+    щоб воркери не ходили в БД за тим самим користувачем.
+
+    З `redis_client` зміна користувача (store) публікується в INVALIDATE_CHANNEL, і
+    інші процеси одразу скидають свою локальну копію, а не чекають кінця TTL.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: float = 300.0,
+        redis_client: redis.Redis | None = None,
+        shared: bool = False,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis = redis_client
+        self.shared = shared and redis_client is not None
+        self.origin = uuid.uuid4().hex
+        self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def start(self):
+        if self.redis:
+            self._task = asyncio.create_task(self._listen())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _remember(self, user: User):
+        self._users[user.telegram_id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user.telegram_id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+
+    async def get(self, telegram_id: int) -> User:
+        cached = self._users.get(telegram_id)
+        if cached and cached[0] > time.monotonic():
+            self._users.move_to_end(telegram_id)
+            self.hits += 1
+            return cached[1]
+
+        if self.shared:
+            raw = await self.redis.get(USER_KEY.format(telegram_id))
+            if raw:
+                # Записи, збережені до появи нових полів, доповнюються значеннями за замовчуванням
+                user = User._init_from_db(**{"digest": False, **json.loads(raw)})
+                self._remember(user)
+                self.redis_hits += 1
+                return user
+
+        self.misses += 1
+        user, _ = await User.get_or_create(telegram_id=telegram_id)
+        await self.store(user, changed=False)
+        return user
+
+    async def store(self, user: User, changed: bool = True):
+        """
+        Кладе користувача в кеш; викликати після збереження змінених полів User.
+        `changed=False` — щойно прочитаний з БД, іншим процесам нічого скидати.
+        """
+        self._remember(user)
+        if self.shared:
+            payload = {"id": user.id, "telegram_id": user.telegram_id, "timezone": user.timezone, "digest": user.digest}
+            await self.redis.set(USER_KEY.format(user.telegram_id), json.dumps(payload), ex=int(self.ttl))
+        if self.redis and changed:
+            await self.redis.publish(INVALIDATE_CHANNEL, f"{self.origin} {user.telegram_id}")
+
+    def _on_message(self, data: str):
+        origin, _, telegram_id = data.partition(" ")
+        if origin != self.origin:
+            self._users.pop(int(telegram_id), None)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                # Поки підписки не було, повідомлення могли загубитися
+                self._users.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("User cache invalidation subscription failed, resubscribing")
+                await asyncio.sleep(RESUBSCRIBE_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "redis_hits": self.redis_hits, "misses": self.misses, "size": len(self._users)}
+
+
+class UserMiddleware(BaseMiddleware):
+    def __init__(self, user_cache: UserCache):
+        self.user_cache = user_cache
+
+
+    async def __call__(self, handler: Callable, event: Message | CallbackQuery, data: dict[str, Any]):
+        if event.from_user:
+            data["user"] = await self.user_cache.get(event.from_user.id)
+        data["user_cache"] = self.user_cache
+        return await handler(event, data)
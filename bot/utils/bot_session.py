@@ -0,0 +1,132 @@
+"""
+HTTP-транспорт для Bot API.
+
+Прийом апдейтів (polling, відповіді хендлерів) і розсилка нагадувань ходять через
+окремі сесії з власними пулами з'єднань, тож сплеск доставки не забирає з'єднання
+в getUpdates. Обидві тримають keep-alive і кешують DNS; транспорт httpx дає HTTP/2
+(потрібен `pip install httpx[http2]`).
+"""
+from typing import Any, AsyncGenerator, cast
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import InputFile
+from bot.middlewares.api_metrics_middleware import ApiMetricsMiddleware
+
+TRANSPORTS = ("aiohttp", "httpx")
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """AiohttpSession з явними лімітами пулу, keep-alive і TTL кешу DNS"""
+
+    def __init__(self, limit: int = 100, keepalive_timeout: float = 60.0, dns_ttl: int = 300, **kwargs: Any):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            # Усі запити йдуть на один хост, тож ліміт на хост — це весь пул
+            limit_per_host=limit,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_ttl,
+        )
+
+
+class HttpxSession(BaseSession):
+    """Сесія на httpx з HTTP/2: багато запитів мультиплексуються в кількох з'єднаннях"""
+
+    def __init__(self, limit: int = 100, keepalive_timeout: float = 60.0, http2: bool = True, **kwargs: Any):
+        super().__init__(**kwargs)
+        try:
+            import httpx
+        except ImportError as e:
+            raise RuntimeError("BOT_HTTP_TRANSPORT=httpx requires `pip install httpx[http2]`") from e
+        self._httpx = httpx
+        self._limits = httpx.Limits(
+            max_connections=limit, max_keepalive_connections=limit, keepalive_expiry=keepalive_timeout
+        )
+        self._http2 = http2
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = self._httpx.AsyncClient(http2=self._http2, limits=self._limits)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    async def _build_request(self, bot: Bot, method: TelegramMethod[TelegramType]) -> tuple[dict, dict]:
+        files: dict[str, InputFile] = {}
+        data = {}
+        for key, value in method.model_dump(warnings=False).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if value is not None:
+                data[key] = value
+        # httpx не вміє multipart з асинхронного генератора, тож файл читається в пам'ять
+        uploads = {}
+        for key, value in files.items():
+            content = b"".join([chunk async for chunk in value.read(bot)])
+            uploads[key] = (value.filename or key, content)
+        return data, uploads
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        url = self.api.api_url(token=bot.token, method=method.__api_method__)
+        data, files = await self._build_request(bot, method)
+        try:
+            response = await self._get_client().post(
+                url, data=data, files=files or None, timeout=self.timeout if timeout is None else timeout
+            )
+        except self._httpx.TimeoutException as e:
+            raise TelegramNetworkError(method=method, message="Request timeout error") from e
+        except self._httpx.HTTPError as e:
+            raise TelegramNetworkError(method=method, message=f"{type(e).__name__}: {e}") from e
+        result = self.check_response(bot=bot, method=method, status_code=response.status_code, content=response.text)
+        return cast(TelegramType, result.result)
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        async with self._get_client().stream("GET", url, headers=headers, timeout=timeout) as response:
+            if raise_for_status:
+                response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+
+def create_session(
+    pool: str,
+    limit: int,
+    transport: str = "aiohttp",
+    keepalive_timeout: float = 60.0,
+    dns_ttl: int = 300,
+    timeout: float = 60.0,
+    api_url: str | None = None,
+) -> BaseSession:
+    """
+    Сесія для пулу `pool` (intake чи delivery): метрики затримки Bot API за методом
+    пишуться з цією міткою. `api_url` — власний Bot API сервер або локальна заглушка.
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown Bot API transport: {transport}")
+    api = TelegramAPIServer.from_base(api_url) if api_url else PRODUCTION
+    if transport == "httpx":
+        session = HttpxSession(limit=limit, keepalive_timeout=keepalive_timeout, api=api, timeout=timeout)
+    else:
+        session = TunedAiohttpSession(
+            limit=limit, keepalive_timeout=keepalive_timeout, dns_ttl=dns_ttl, api=api, timeout=timeout
+        )
+    session.middleware(ApiMetricsMiddleware(pool))
+    return session
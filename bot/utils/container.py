@@ -0,0 +1,145 @@
+"""
+Контейнер застосунку: боти, Redis, планувальник, доставка, FSM-сховище і кеш користувачів.
+
+Кожна частина будується при першому зверненні з одного набору налаштувань, тож
+воркер, CLI чи бенчмарк платять лише за те, чим користуються (сам імпорт aiogram
+коштує секунди, тому частини з ботом імпортують його лише при створенні), а кілька
+інстансів можуть працювати в одному процесі. Частину можна підмінити до першого
+звернення: `app.redis = FakeRedis(decode_responses=True)`.
+
+Ізольовані лише частини, які будує контейнер. Обробники (ліміти нагадувань, підписників
+та імпорту), підпис callback_data, зона за замовчуванням і підключення до БД (Tortoise
+глобальний) читають get_settings() — ці налаштування спільні для всього процесу.
+"""
+from functools import cached_property
+from typing import TYPE_CHECKING
+import redis.asyncio as redis
+from bot.utils.rate_limiter import RedisSlidingWindowLimiter, SlidingWindowLimiter
+from db.config import Settings, get_settings
+from scheduler.scheduler import ReminderScheduler
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.base import BaseSession
+    from bot.middlewares.user_middleware import UserCache
+    from bot.utils.delivery import DeliveryService
+    from bot.utils.fsm_storage import CompactRedisStorage
+
+
+class App:
+    def __init__(self, settings: Settings | None = None):
+        self.settings = settings or get_settings()
+
+    def _redis(self, **kwargs) -> redis.Redis:
+        settings = self.settings.redis
+        return redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, **kwargs)
+
+    def _session(self, pool: str, limit: int) -> "BaseSession":
+        from bot.utils.bot_session import create_session
+
+        settings = self.settings.bot_session
+        return create_session(
+            pool,
+            limit,
+            transport=settings.BOT_HTTP_TRANSPORT,
+            keepalive_timeout=settings.BOT_KEEPALIVE_TIMEOUT,
+            dns_ttl=settings.BOT_DNS_CACHE_TTL,
+            timeout=settings.BOT_REQUEST_TIMEOUT,
+            api_url=settings.BOT_API_URL,
+        )
+
+    def _bot(self, pool: str, limit: int) -> "Bot":
+        from aiogram import Bot
+
+        if not self.settings.redis.BOT_TOKEN:
+            raise RuntimeError("BOT_TOKEN is not set")
+        return Bot(token=self.settings.redis.BOT_TOKEN, session=self._session(pool, limit))
+
+    @cached_property
+    def redis(self) -> redis.Redis:
+        return self._redis(decode_responses=True)
+
+    # Прийом апдейтів і розсилка мають окремі пули з'єднань: сплеск доставки не блокує getUpdates
+    @cached_property
+    def bot(self) -> "Bot":
+        return self._bot("intake", self.settings.bot_session.BOT_POOL_SIZE)
+
+    @cached_property
+    def delivery_bot(self) -> "Bot":
+        return self._bot(
+            "delivery",
+            self.settings.bot_session.BOT_DELIVERY_POOL_SIZE or self.settings.delivery.DELIVERY_WORKERS * 4,
+        )
+
+    @cached_property
+    def scheduler(self) -> ReminderScheduler:
+        settings = self.settings.scheduler
+        return ReminderScheduler(
+            self.redis,
+            poll_interval=settings.SCHEDULER_POLL_INTERVAL,
+            batch_size=settings.SCHEDULER_BATCH_SIZE,
+            partitions=settings.SCHEDULER_PARTITIONS,
+            lease_ttl=settings.SCHEDULER_LEASE_TTL,
+            worker_id=settings.WORKER_ID,
+            wakeup=settings.SCHEDULER_WAKEUP,
+        )
+
+    @cached_property
+    def delivery(self) -> "DeliveryService":
+        from bot.utils.delivery import DeliveryService
+
+        settings = self.settings.delivery
+        return DeliveryService(
+            self.delivery_bot,
+            self.scheduler,
+            workers=settings.DELIVERY_WORKERS,
+            batch_size=settings.DELIVERY_BATCH_SIZE,
+            global_rate=settings.DELIVERY_GLOBAL_RATE,
+            chat_rate=settings.DELIVERY_CHAT_RATE,
+            max_retries=settings.DELIVERY_MAX_RETRIES,
+            visibility_timeout=settings.DELIVERY_VISIBILITY_TIMEOUT,
+            digest_window=settings.DELIVERY_DIGEST_WINDOW,
+            fanout_chunk=settings.DELIVERY_FANOUT_CHUNK,
+        )
+
+    @cached_property
+    def fsm_storage(self) -> "CompactRedisStorage":
+        from bot.utils.fsm_storage import CompactRedisStorage
+
+        settings = self.settings.fsm
+        # Окремий клієнт без decode_responses: FSM зберігається бінарним msgpack
+        return CompactRedisStorage(
+            self._redis(),
+            ttl=settings.FSM_TTL,
+            cache_size=settings.FSM_CACHE_SIZE,
+            cache_ttl=settings.FSM_CACHE_TTL,
+        )
+
+    @cached_property
+    def user_cache(self) -> "UserCache":
+        from bot.middlewares.user_middleware import UserCache
+
+        settings = self.settings.user_cache
+        return UserCache(
+            maxsize=settings.USER_CACHE_SIZE,
+            ttl=settings.USER_CACHE_TTL,
+            redis_client=self.redis,
+            shared=settings.USER_CACHE_REDIS,
+        )
+
+    @cached_property
+    def limiter(self) -> SlidingWindowLimiter | RedisSlidingWindowLimiter:
+        if self.settings.throttle.THROTTLE_BACKEND == "redis":
+            return RedisSlidingWindowLimiter(self.redis)
+        return SlidingWindowLimiter()
+
+    async def close(self):
+        """Закриває з'єднання лише тих частин, які було створено; планувальник і доставку зупиняє власник"""
+        built = vars(self)
+        for name in ("bot", "delivery_bot"):
+            if name in built:
+                await built[name].session.close()
+        if "fsm_storage" in built:
+            await self.fsm_storage.close()
+        if "redis" in built:
+            await self.redis.aclose()
@@ -1,7 +1,10 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import re
-from typing import Optional, Tuple, Dict
+from typing import NamedTuple, Optional, Tuple, Dict
 from db.models.models import RepeatType
+from bot.utils.metrics import PARSE_LATENCY
+from scheduler.recurrence import parse_rule
 
 # Ключові слова для розпізнавання відносних дат
 RELATIVE_DAYS = {
@@ -12,15 +15,27 @@ RELATIVE_DAYS = {
     "позавчора": -2,
 }
 
-# Ключові слова для розпізнавання днів тижня
+# Назви днів тижня з відмінками, в яких вони стоять у фразах ("понеділок", "в середу",
+# "до п'ятниці"). Саме слова, а не основи: "серед" — це ще й прийменник ("серед друзів"),
+# а "четвер" — початок "четверта"
 WEEKDAYS = {
-    "понеділок": 0,
-    "вівторок": 1,
-    "середа": 2,
-    "четвер": 3,
-    "п'ятниця": 4,
-    "субота": 5,
-    "неділя": 6,
+    **dict.fromkeys(("понеділок", "понеділка"), 0),
+    **dict.fromkeys(("вівторок", "вівторка"), 1),
+    **dict.fromkeys(("середа", "середу", "середи"), 2),
+    **dict.fromkeys(("четвер", "четверга"), 3),
+    **dict.fromkeys(("п'ятниця", "п'ятницю", "п'ятниці"), 4),
+    **dict.fromkeys(("субота", "суботу", "суботи"), 5),
+    **dict.fromkeys(("неділя", "неділю", "неділі"), 6),
+}
+
+# Час, заданий словами
+TIME_WORDS = {
+    "полудень": (12, 0),
+    "південь": (12, 0),
+    "північ": (0, 0),
+    "півночі": (0, 0),
+    "опівночі": (0, 0),
+    "опівдні": (12, 0),
 }
 
 # Ключові слова для розпізнавання періодичності
@@ -29,135 +44,231 @@ REPEAT_KEYWORDS = {
     "щодня": RepeatType.DAILY,
     "щотижня": RepeatType.WEEKLY,
     "щотижнево": RepeatType.WEEKLY,
-    "щомісяця": None,  # Буде додано пізніше
-    "щорічно": None,  # Буде додано пізніше
+    "щомісяця": RepeatType.MONTHLY,
+    "щомісячно": RepeatType.MONTHLY,
+    "щорічно": RepeatType.YEARLY,
+    "щороку": RepeatType.YEARLY,
+    "щобудня": RepeatType.WEEKDAYS,
+    "по буднях": RepeatType.WEEKDAYS,
     "немає": RepeatType.NONE,
     "без повторення": RepeatType.NONE,
 }
 
+# "кожні 3 дні", "кожні 2 тижні" -> FREQ з INTERVAL
+EVERY_UNITS = {
+    "дн": "DAILY",
+    "тижн": "WEEKLY",
+    "місяц": "MONTHLY",
+    "рок": "YEARLY",
+    "рік": "YEARLY",
+}
+
+KEYWORDS = {
+    **{word: ("relative", days) for word, days in RELATIVE_DAYS.items()},
+    **{word: ("weekday", day) for word, day in WEEKDAYS.items()},
+    **{word: ("time", time) for word, time in TIME_WORDS.items()},
+    **{word: ("repeat", repeat) for word, repeat in REPEAT_KEYWORDS.items()},
+}
+
+APOSTROPHES = "'’ʼ`"
+
+# Довші слова йдуть першими; межі (?<!\w) і (?!\w) не дають ключовому слову спрацювати
+# всередині іншого ("завтра" у "післязавтра", "четвер" у "четвертій")
+_KEYWORDS_PATTERN = "|".join(
+    re.escape(word).replace(r"\ ", r"\s+").replace("'", f"[{APOSTROPHES}]")
+    for word in sorted(KEYWORDS, key=len, reverse=True)
+)
+
+# Один прохід по тексту знаходить усі маркери, дати, час і ключові слова;
+# тип токена визначається за назвою зовнішньої групи (match.lastgroup)
+TOKEN_RE = re.compile(
+    r"(?:date#(?P<sdate>\d{2}\.\d{2}\.\d{4})|time#(?P<stime>\d{2}:\d{2})|repeat#(?P<srepeat>[\w=;,]+))\s*"
+    r"|(?P<iso>(?P<iso_y>\d{4})-(?P<iso_m>\d{2})-(?P<iso_d>\d{2}))"
+    r"|(?P<dotted>(?P<dot_d>\d{2})\.(?P<dot_m>\d{2})\.(?P<dot_y>\d{4}))"
+    r"|(?P<clock>(?P<hours>\d{1,2}):(?P<minutes>\d{2}))"
+    rf"|(?<!\w)(?P<every>кожн\w*\s+(?P<every_n>\d+)\s+(?P<every_unit>{'|'.join(EVERY_UNITS)})\w*)"
+    rf"|(?<!\w)(?P<word>{_KEYWORDS_PATTERN})(?!\w)",
+    re.IGNORECASE,
+)
+
+_DATE_PRIORITY = ("special", "absolute", "relative", "weekday")
+_TIME_PRIORITY = ("special", "clock", "time")
+
+
+class ParsedPhrase(NamedTuple):
+    """Результат токенізації, що не залежить від поточного часу"""
+
+    date: Optional[Tuple[str, object]]
+    time: Optional[Tuple[int, int]]
+    repeat: Optional[RepeatType]
+    text: str
+    # RRULE для RepeatType.CUSTOM
+    rule: Optional[str] = None
+
+
+def _to_date(year: str, month: str, day: str) -> Optional[date]:
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _to_time(hours: str, minutes: str) -> Optional[Tuple[int, int]]:
+    h, m = int(hours), int(minutes)
+    if 0 <= h <= 23 and 0 <= m <= 59:
+        return h, m
+    return None
+
+
+def _repeat_marker(value: str) -> Tuple[Optional[RepeatType], Optional[str]]:
+    """repeat#daily або repeat#FREQ=MONTHLY;INTERVAL=2 — готовий варіант чи власне правило"""
+    if value.lower() in RepeatType._value2member_map_:
+        return RepeatType(value.lower()), None
+    try:
+        parse_rule(value)
+    except ValueError:
+        return None, None
+    return RepeatType.CUSTOM, value.upper()
+
+
+def _keyword(word: str) -> str:
+    word = " ".join(word.lower().split())
+    for apostrophe in APOSTROPHES[1:]:
+        word = word.replace(apostrophe, "'")
+    return word
+
+
+def tokenize(text: str) -> ParsedPhrase:
+    """Розбирає текст за один прохід: дата, час, періодичність і текст без маркерів"""
+    dates: Dict[str, object] = {}
+    times: Dict[str, Tuple[int, int]] = {}
+    repeat = special_repeat = rule = special_rule = None
+    has_repeat = False
+    cleaned = []
+    last_end = 0
+
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind in ("sdate", "stime", "srepeat"):
+            cleaned.append(text[last_end:match.start()])
+            last_end = match.end()
+            value = match.group(kind)
+            if kind == "sdate":
+                found = _to_date(*reversed(value.split(".")))
+                if found:
+                    dates.setdefault("special", found)
+            elif kind == "stime":
+                found = _to_time(*value.split(":"))
+                if found:
+                    times.setdefault("special", found)
+            elif special_repeat is None:
+                special_repeat, special_rule = _repeat_marker(value)
+        elif kind == "iso":
+            found = _to_date(*match.group("iso_y", "iso_m", "iso_d"))
+            if found:
+                dates.setdefault("absolute", found)
+        elif kind == "dotted":
+            found = _to_date(*match.group("dot_y", "dot_m", "dot_d"))
+            if found:
+                dates.setdefault("absolute", found)
+        elif kind == "clock":
+            found = _to_time(*match.group("hours", "minutes"))
+            if found:
+                times.setdefault("clock", found)
+        elif kind == "every":
+            interval = int(match.group("every_n"))
+            if not has_repeat and interval > 0:
+                rule = f"FREQ={EVERY_UNITS[match.group('every_unit').lower()]};INTERVAL={interval}"
+                repeat, has_repeat = RepeatType.CUSTOM, True
+        else:
+            kind, value = KEYWORDS[_keyword(match.group("word"))]
+            if kind == "repeat":
+                if not has_repeat:
+                    repeat, has_repeat = value, True
+            elif kind == "time":
+                times.setdefault("time", value)
+            else:
+                dates.setdefault(kind, value)
+
+    cleaned.append(text[last_end:])
+    date_spec = next(((kind, dates[kind]) for kind in _DATE_PRIORITY if kind in dates), None)
+    time = next((times[kind] for kind in _TIME_PRIORITY if kind in times), None)
+    if special_repeat:
+        repeat, rule = special_repeat, special_rule
+    return ParsedPhrase(date_spec, time, repeat, "".join(cleaned).strip(), rule)
+
+
+@lru_cache(maxsize=4096)
+def _tokenize_phrase(phrase: str) -> ParsedPhrase:
+    return tokenize(phrase)
+
+
+def tokenize_phrase(value: str) -> ParsedPhrase:
+    """
+    Токенізація окремої фрази дати, часу чи періодичності (крок діалогу, поле CSV).
+    Такі фрази повторюються, тож кешуються за нормалізованим рядком; текст нагадування
+    унікальний, тому parse_reminder_text кеш не використовує.
+    """
+    return _tokenize_phrase(" ".join(value.lower().split()))
+
+
+def _resolve_date(spec: Tuple[str, object], now: datetime) -> date:
+    kind, value = spec
+    if kind == "relative":
+        return now.date() + timedelta(days=value)
+    if kind == "weekday":
+        days_ahead = value - now.weekday()
+        if days_ahead <= 0:  # Якщо день вже минув цього тижня
+            days_ahead += 7
+        return now.date() + timedelta(days=days_ahead)
+    return value
+
+
+def _combine(phrase: ParsedPhrase, now: datetime) -> Optional[datetime]:
+    if not phrase.date:
+        return None
+    # Якщо час не вказано, встановлюємо поточний час
+    hours, minutes = phrase.time or (now.hour, now.minute)
+    return datetime.combine(_resolve_date(phrase.date, now), datetime.min.time().replace(hour=hours, minute=minutes))
+
+
 def parse_time(time_str: str) -> Optional[Tuple[int, int]]:
     """Парсить час з рядка у форматі HH:MM або природної мови"""
-    # Спроба знайти час у форматі HH:MM
-    time_pattern = r"(\d{1,2}):(\d{2})"
-    match = re.search(time_pattern, time_str)
-    if match:
-        hours, minutes = map(int, match.groups())
-        if 0 <= hours <= 23 and 0 <= minutes <= 59:
-            return hours, minutes
-    
-    # Спроба знайти час у природній мові
-    time_words = {
-        "полудень": (12, 0),
-        "південь": (12, 0),
-        "півноч": (0, 0),
-        "опівночі": (0, 0),
-    }
-    
-    for word, time in time_words.items():
-        if word in time_str.lower():
-            return time
-    
-    return None
+    return tokenize_phrase(time_str).time
 
-def parse_date(date_str: str) -> Optional[datetime]:
-    """Парсить дату з рядка у форматі YYYY-MM-DD або природної мови"""
-    now = datetime.now()
-    
-    # Спроба знайти дату у форматі YYYY-MM-DD або DD.MM.YYYY
-    date_patterns = [
-        r"(\d{4})-(\d{2})-(\d{2})",  # YYYY-MM-DD
-        r"(\d{2})\.(\d{2})\.(\d{4})",  # DD.MM.YYYY
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, date_str)
-        if match:
-            try:
-                if pattern == date_patterns[0]:
-                    year, month, day = map(int, match.groups())
-                else:
-                    day, month, year = map(int, match.groups())
-                return datetime(year, month, day)
-            except ValueError:
-                continue
-    
-    # Перевірка на відносні дати
-    for word, days in RELATIVE_DAYS.items():
-        if word in date_str.lower():
-            return now.date() + timedelta(days=days)
-    
-    # Перевірка на дні тижня
-    for weekday, day_num in WEEKDAYS.items():
-        if weekday in date_str.lower():
-            current_weekday = now.weekday()
-            days_ahead = day_num - current_weekday
-            if days_ahead <= 0:  # Якщо день вже минув цього тижня
-                days_ahead += 7
-            return now.date() + timedelta(days=days_ahead)
-    
-    return None
 
-def parse_datetime(text: str) -> Optional[datetime]:
-    """Парсить дату та час з тексту"""
-    # Видаляємо зайві пробіли
-    text = text.strip().lower()
-    
-    # Парсимо дату
-    date = parse_date(text)
-    if not date:
+def parse_date(date_str: str, now: Optional[datetime] = None) -> Optional[date]:
+    """Парсить дату з рядка у форматі YYYY-MM-DD, DD.MM.YYYY або природної мови"""
+    phrase = tokenize_phrase(date_str)
+    if not phrase.date:
         return None
-    
-    # Парсимо час
-    time = parse_time(text)
-    if not time:
-        # Якщо час не вказано, встановлюємо поточний час
-        time = (datetime.now().hour, datetime.now().minute)
-    
-    # Об'єднуємо дату та час
-    return datetime.combine(date, datetime.min.time().replace(hour=time[0], minute=time[1]))
-
-def parse_reminder_text(text: str) -> Dict:
+    return _resolve_date(phrase.date, now or datetime.now())
+
+
+def parse_datetime(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Парсить дату та час з тексту"""
+    return _combine(tokenize_phrase(text), now or datetime.now())
+
+
+def parse_repeat(value: str) -> Tuple[Optional[RepeatType], Optional[str]]:
+    """Періодичність окремим значенням (daily, щотижня, кожні 2 дні, RRULE); (None, None) — не розпізнано"""
+    value = value.strip()
+    if not value:
+        return RepeatType.NONE, None
+    repeat, rule = _repeat_marker(value.removeprefix("RRULE:"))
+    if repeat is None:
+        phrase = tokenize_phrase(value)
+        repeat, rule = phrase.repeat, phrase.rule
+    return repeat, rule
+
+
+@PARSE_LATENCY.time()
+def parse_reminder_text(text: str, now: Optional[datetime] = None) -> Dict:
     """Парсить текст нагадування на пошук дати, часу та періодичності"""
-    result = {
-        "text": text,
-        "remind_at": None,
-        "repeat": None
+    phrase = tokenize(text)
+    return {
+        "text": phrase.text,
+        "remind_at": _combine(phrase, now or datetime.now()),
+        "repeat": phrase.repeat,
+        "rule": phrase.rule,
     }
-    
-    # Шукаємо спеціальний формат date#DD.MM.YYYY time#HH:MM repeat#TYPE
-    date_match = re.search(r"date#(\d{2}\.\d{2}\.\d{4})", text)
-    time_match = re.search(r"time#(\d{2}:\d{2})", text)
-    repeat_match = re.search(r"repeat#(\w+)", text)
-    
-    if date_match and time_match:
-        try:
-            date_str = date_match.group(1)
-            time_str = time_match.group(1)
-            day, month, year = map(int, date_str.split('.'))
-            hours, minutes = map(int, time_str.split(':'))
-            result["remind_at"] = datetime(year, month, day, hours, minutes)
-        except ValueError:
-            pass
-    
-    if repeat_match:
-        repeat_type = repeat_match.group(1).lower()
-        if repeat_type in [rt.value for rt in RepeatType]:
-            result["repeat"] = RepeatType(repeat_type)
-    
-    # Якщо не знайдено спеціальний формат, шукаємо в природній мові
-    if not result["remind_at"]:
-        result["remind_at"] = parse_datetime(text)
-    
-    if not result["repeat"]:
-        for keyword, repeat_type in REPEAT_KEYWORDS.items():
-            if keyword in text.lower():
-                result["repeat"] = repeat_type
-                break
-    
-    # Видаляємо спеціальні маркери з тексту
-    result["text"] = re.sub(r"date#\d{2}\.\d{2}\.\d{4}\s*", "", result["text"])
-    result["text"] = re.sub(r"time#\d{2}:\d{2}\s*", "", result["text"])
-    result["text"] = re.sub(r"repeat#\w+\s*", "", result["text"])
-    result["text"] = result["text"].strip()
-    
-    return result 
\ No newline at end of file
@@ -0,0 +1,412 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from tortoise.expressions import Q
+from db.models.models import Reminder, ReminderSubscriber, RepeatType, User
+from bot.keyboards.keyboards import get_delivered_keyboard, get_digest_keyboard, get_subscriber_keyboard
+from bot.utils.metrics import (
+    DB_QUERY_LATENCY,
+    DEAD_LETTERS,
+    DIGESTS_SENT,
+    FANOUT_QUEUED,
+    SCHEDULER_LAG,
+    SEND_LATENCY,
+    SENT_TOTAL,
+    TELEGRAM_ERRORS,
+)
+from bot.utils.rate_limiter import TokenBucket, ChatRateLimiter
+from bot.utils.timezones import now_epoch
+from scheduler.outbox import OutboxEntry, retry_delay
+
+logger = logging.getLogger(__name__)
+
+# Результати однієї спроби відправки
+SENT = "sent"
+THROTTLED = "throttled"  # 429: повтор після retry_after, спроба не рахується
+RETRY = "retry"  # мережа або 5xx: повтор з експоненційною затримкою
+BLOCKED = "blocked"  # бот заблокований / чат не існує: dead-letter і деактивація нагадувань чату
+FAILED = "failed"  # інша помилка Bot API: dead-letter
+
+PERMANENT_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was kicked")
+READ_BLOCK_MS = 1000
+IDLE_SLEEP = 0.05
+# Рядок з 4 кнопок на пункт, а Telegram приймає до 100 кнопок на повідомлення
+DIGEST_MAX_ITEMS = 20
+DIGEST_ITEM_CHARS = 200
+# Верхня межа нагадувань, які дайджест забирає наперед за один батч
+DIGEST_PULL_LIMIT = 1000
+
+Item = tuple[OutboxEntry, Reminder]
+
+
+def digest_text(reminders: list[Reminder]) -> str:
+    """Пункти нумеруються з 1; за номером обробник кнопок знаходить рядок пункту"""
+    lines = [f"⏰ Нагадування ({len(reminders)}):", ""]
+    for number, reminder in enumerate(reminders, 1):
+        text = " ".join(reminder.text.split())
+        if len(text) > DIGEST_ITEM_CHARS:
+            text = text[:DIGEST_ITEM_CHARS - 1] + "…"
+        lines.append(f"{number}. {text}")
+    return "\n".join(lines)
+
+
+class DeliveryService:
+    """
+    Воркери доставки: читають outbox батчами, відправляють з лімітами Telegram,
+    підтверджують оброблені записи пачкою. Запис підтверджується лише після того,
+    як результат збережено (відправлено, відкладено на повтор або в dead-letter).
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        scheduler,
+        workers: int = 8,
+        batch_size: int = 100,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        max_retries: int = 5,
+        visibility_timeout: float = 60.0,
+        digest_window: float = 60.0,
+        fanout_chunk: int = 1000,
+    ):
+        self.bot = bot
+        self.scheduler = scheduler
+        self.outbox = scheduler.outbox
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.visibility_timeout = visibility_timeout
+        self.digest_window = digest_window
+        self.fanout_chunk = fanout_chunk
+        self.bucket = TokenBucket(global_rate)
+        self.chat_limiter = ChatRateLimiter(chat_rate)
+        self.in_flight = 0
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    def _consumer(self, index: int) -> str:
+        return f"{self.scheduler.leases.worker_id}:{index}"
+
+    async def start(self):
+        await self.outbox.ensure_group()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(self._consumer(i))) for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0):
+        # Воркери доробляють поточні батчі; непідтверджене лишається в outbox до наступного старту
+        self._stopping = True
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout) if self._tasks else (set(), set())
+        if pending:
+            logger.warning("Delivery workers not drained, %d reminders in flight", self.in_flight)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for i in range(self.workers):
+            await self.outbox.forget_consumer(self._consumer(i))
+
+    async def _worker(self, consumer: str):
+        reclaimed = 0.0
+        while not self._stopping:
+            try:
+                entries = []
+                # Періодично підбираємо записи, які завис інший воркер
+                if time.monotonic() - reclaimed >= self.visibility_timeout / 2:
+                    entries = await self.outbox.reclaim(consumer, self.visibility_timeout, self.batch_size)
+                    reclaimed = time.monotonic()
+                if not entries:
+                    started = time.monotonic()
+                    entries = await self.outbox.read(consumer, self.batch_size, block_ms=READ_BLOCK_MS)
+                    # Сервер без блокуючого XREADGROUP (fakeredis) відповідає одразу — не крутимо цикл впусту
+                    if not entries and time.monotonic() - started < READ_BLOCK_MS / 2000:
+                        await asyncio.sleep(IDLE_SLEEP)
+            except Exception:
+                logger.exception("Failed to read delivery outbox")
+                await asyncio.sleep(1)
+                continue
+            if not entries:
+                continue
+
+            self.in_flight += len(entries)
+            try:
+                await self._deliver_batch(entries)
+            except Exception:
+                # Записи лишаються непідтвердженими і повернуться через reclaim
+                logger.exception("Failed to deliver batch of %d reminders", len(entries))
+            finally:
+                self.in_flight -= len(entries)
+
+    async def _deliver_batch(self, entries: list[OutboxEntry]):
+        # Відкидаємо спрацювання, які вже відправлено (повторна видача після падіння)
+        fired = await self.scheduler.already_fired([(entry.reminder_id, entry.due_at, entry.chat_id) for entry in entries])
+        fresh = [entry for entry, is_fired in zip(entries, fired) if not is_fired]
+        stale = [entry for entry, is_fired in zip(entries, fired) if is_fired and entry.chat_id is None]
+        if stale:
+            await self._reschedule_fired(stale)
+        own = [entry for entry in fresh if entry.chat_id is None]
+        if own:
+            await self._deliver(own)
+        subscribers = [entry for entry in fresh if entry.chat_id is not None]
+        if subscribers:
+            await self._deliver_subscribers(subscribers)
+        await self.outbox.ack(entries)
+
+    async def _deliver(self, entries: list[OutboxEntry]):
+        # Один запит на весь батч; chat_id лежить у самому нагадуванні, тож без join
+        reminder_ids = list({entry.reminder_id for entry in entries})
+        with DB_QUERY_LATENCY.labels("delivery_fetch").time():
+            reminders = await Reminder.filter(id__in=reminder_ids, is_active=True)
+        by_id = {reminder.id: reminder for reminder in reminders}
+
+        # Власники: режим дайджесту, часовий пояс повторюваних, чат старих рядків без chat_id
+        users = {}
+        if reminders:
+            with DB_QUERY_LATENCY.labels("delivery_users").time():
+                rows = await User.filter(id__in={r.user_id for r in reminders}).values(
+                    "id", "telegram_id", "timezone", "digest"
+                )
+            users = {row["id"]: row for row in rows}
+
+        def chat_of(reminder: Reminder) -> int:
+            return reminder.chat_id or users[reminder.user_id]["telegram_id"]
+
+        # Одне нагадування може прийти кількома спрацюваннями (пропущені за час простою)
+        items: list[Item] = [(entry, by_id[entry.reminder_id]) for entry in entries if entry.reminder_id in by_id]
+        if self.digest_window:
+            pulled = await self._pull_window(items, users)
+            items += pulled
+            reminders += [reminder for _, reminder in pulled]
+
+        # Спільні нагадування розходяться підписникам окремими записами outbox, ще до відправки власнику
+        await self._fan_out([(entry, reminder) for entry, reminder in items if reminder.shared], chat_of)
+
+        # Дайджест-чати отримують одне повідомлення на DIGEST_MAX_ITEMS пунктів, решта — по одному
+        messages: list[tuple[int, list[Item]]] = []
+        digests: dict[int, list[Item]] = {}
+        for entry, reminder in items:
+            if users[reminder.user_id]["digest"]:
+                digests.setdefault(chat_of(reminder), []).append((entry, reminder))
+            else:
+                messages.append((chat_of(reminder), [(entry, reminder)]))
+        for chat_id, chat_items in digests.items():
+            chat_items.sort(key=lambda item: (item[0].due_at, item[1].id))
+            for i in range(0, len(chat_items), DIGEST_MAX_ITEMS):
+                messages.append((chat_id, chat_items[i:i + DIGEST_MAX_ITEMS]))
+
+        results = await asyncio.gather(*(self._send(chat_id, message_items) for chat_id, message_items in messages))
+        sent, blocked_chats, finished = await self._settle(messages, results)
+
+        # One-time нагадування, доставлені або остаточно недоставлені, деактивуємо одним UPDATE
+        if finished:
+            with DB_QUERY_LATENCY.labels("delivery_deactivate").time():
+                await Reminder.filter(id__in=[reminder.id for reminder in finished]).update(is_active=False)
+            await self.scheduler.forget_counts(reminder.user_id for reminder in finished)
+
+        if blocked_chats:
+            await self._deactivate_chats(blocked_chats, reminders)
+
+        # Повторювані нагадування переносимо на спрацювання після доставленого: забране дайджестом
+        # наперед ще в майбутньому, і пошук "після now" повернув би його ж
+        now = now_epoch()
+        after: dict[int, int] = {}
+        for entry, reminder in items:
+            after[reminder.id] = max(after.get(reminder.id, now), int(entry.due_at))
+        repeating = [
+            reminder
+            for reminder in reminders
+            if reminder.repeat != RepeatType.NONE and chat_of(reminder) not in blocked_chats
+        ]
+        timezones = {user_id: user["timezone"] for user_id, user in users.items()}
+        await self.scheduler.reschedule_repeats(repeating, after, timezones)
+        # Ключі fired — останніми: повторно видане після падіння спрацювання інакше
+        # відкинулося б ще до перенесення, і нагадування випало б з індексу
+        await self.scheduler.mark_fired([(entry.reminder_id, entry.due_at, entry.chat_id) for entry in sent])
+
+    async def _reschedule_fired(self, entries: list[OutboxEntry]):
+        """
+        Спрацювання вже відправлене, а повторюване нагадування досі вказує на нього чи раніше:
+        процес упав між відправкою і перенесенням. Переносимо, бо з індексу воно вже забране.
+        """
+        due: dict[int, int] = {}
+        for entry in entries:
+            due[entry.reminder_id] = max(due.get(entry.reminder_id, now_epoch()), int(entry.due_at))
+        with DB_QUERY_LATENCY.labels("delivery_fetch").time():
+            reminders = await Reminder.filter(id__in=list(due), is_active=True).exclude(repeat=RepeatType.NONE)
+        stale = [reminder for reminder in reminders if reminder.fire_at is None or reminder.fire_at <= due[reminder.id]]
+        if not stale:
+            return
+        timezones = dict(await User.filter(id__in={r.user_id for r in stale}).values_list("id", "timezone"))
+        await self.scheduler.reschedule_repeats(stale, due, timezones)
+
+    async def _settle(
+        self, messages: list[tuple[int, list[Item]]], results: list[tuple[str, object]]
+    ) -> tuple[list[OutboxEntry], set[int], list[Reminder]]:
+        """
+        Зберігає повтори і dead-letter. Повертає відправлені записи (ключі fired ставить
+        викликач, коли все інше збережено), недосяжні чати та one-time нагадування,
+        з якими більше нічого не робитимемо.
+        """
+        sent, retries, dead, finished = [], [], [], []
+        blocked_chats: set[int] = set()
+        for (chat_id, message_items), (status, detail) in zip(messages, results):
+            if status == BLOCKED:
+                blocked_chats.add(chat_id)
+            for entry, reminder in message_items:
+                if status == SENT:
+                    sent.append(entry)
+                elif status == THROTTLED:
+                    retries.append((entry, entry.attempt, detail))
+                elif status == RETRY and entry.attempt + 1 < self.max_retries:
+                    retries.append((entry, entry.attempt + 1, retry_delay(entry.attempt)))
+                else:
+                    dead.append((entry, chat_id, str(detail)))
+                    DEAD_LETTERS.labels(status).inc()
+                if status in (SENT, BLOCKED, FAILED) and reminder.repeat == RepeatType.NONE:
+                    finished.append(reminder)
+
+        await self.outbox.retry_later(retries)
+        await self.outbox.dead_letter(dead)
+        return sent, blocked_chats, finished
+
+    async def _fan_out(self, items: list[Item], chat_of: Callable[[Reminder], int]):
+        """
+        Ставить у outbox по запису на кожного підписника спрацювання. Підписники читаються
+        keyset-чанками за chat_id, тож пам'ять не залежить від розміру аудиторії. Повтор
+        спрацювання власнику розсилку не повторює; якщо процес впав посеред розсилки, вона
+        починається знову, а вже відправленим підписникам повтор відсіюють ключі fired.
+        """
+        for entry, reminder in items:
+            if await self.outbox.fanned_out(reminder.id, entry.due_at):
+                continue
+            last_chat = None
+            while True:
+                query = ReminderSubscriber.filter(reminder_id=reminder.id)
+                if last_chat is not None:
+                    query = query.filter(chat_id__gt=last_chat)
+                with DB_QUERY_LATENCY.labels("delivery_subscribers").time():
+                    chat_ids = await query.order_by("chat_id").limit(self.fanout_chunk).values_list("chat_id", flat=True)
+                if not chat_ids:
+                    break
+                targets = [chat_id for chat_id in chat_ids if chat_id != chat_of(reminder)]
+                await self.outbox.publish_fanout(reminder.id, entry.due_at, targets)
+                FANOUT_QUEUED.inc(len(targets))
+                if len(chat_ids) < self.fanout_chunk:
+                    break
+                last_chat = chat_ids[-1]
+            await self.outbox.mark_fanned_out(reminder.id, entry.due_at)
+
+    async def _deliver_subscribers(self, entries: list[OutboxEntry]):
+        """Записи розсилки спільних нагадувань: по повідомленню в чат підписника, без дайджестів"""
+        reminder_ids = list({entry.reminder_id for entry in entries})
+        with DB_QUERY_LATENCY.labels("delivery_fetch").time():
+            reminders = await Reminder.filter(id__in=reminder_ids)
+        by_id = {reminder.id: reminder for reminder in reminders}
+
+        # Доставлене власнику one-time вже неактивне, але зберігає fire_at цього спрацювання;
+        # видалене (fire_at=None) підписникам більше не йде
+        messages: list[tuple[int, list[Item]]] = []
+        for entry in entries:
+            reminder = by_id.get(entry.reminder_id)
+            if reminder and (reminder.is_active or reminder.fire_at == int(entry.due_at)):
+                messages.append((entry.chat_id, [(entry, reminder)]))
+
+        results = await asyncio.gather(*(self._send(chat_id, message_items) for chat_id, message_items in messages))
+        sent, blocked_chats, _ = await self._settle(messages, results)
+        await self.scheduler.mark_fired([(entry.reminder_id, entry.due_at, entry.chat_id) for entry in sent])
+        if blocked_chats:
+            # Чат підписника недосяжний — прибираємо лише його підписки, нагадування лишаються
+            await ReminderSubscriber.filter(chat_id__in=list(blocked_chats)).delete()
+            logger.warning("Removed subscriptions of %d unreachable chats", len(blocked_chats))
+
+    async def _pull_window(self, items: list[Item], users: dict[int, dict]) -> list[Item]:
+        """
+        Для користувачів з дайджестом достроково забирає з індексу спрацювання, що настануть
+        протягом digest_window, щоб вони прийшли тим самим повідомленням. Таких записів
+        немає в outbox: якщо процес впаде до відправки, їх поверне звірка при старті.
+        """
+        digest_users = {reminder.user_id for _, reminder in items if users[reminder.user_id]["digest"]}
+        if not digest_users:
+            return []
+        until = time.time() + self.digest_window
+        with DB_QUERY_LATENCY.labels("delivery_digest_window").time():
+            candidates = await (
+                Reminder.filter(user_id__in=list(digest_users), is_active=True, fire_at__lte=int(until))
+                .exclude(id__in=[reminder.id for _, reminder in items])
+                .limit(DIGEST_PULL_LIMIT)
+            )
+        by_user: dict[int, dict[int, Reminder]] = {}
+        for reminder in candidates:
+            by_user.setdefault(reminder.user_id, {})[reminder.id] = reminder
+
+        pulled: list[Item] = []
+        for user_id, user_reminders in by_user.items():
+            for reminder_id, due_at in await self.scheduler.pull_due(user_id, list(user_reminders), until):
+                pulled.append((OutboxEntry(None, reminder_id, due_at, 0), user_reminders[reminder_id]))
+        return pulled
+
+    async def _deactivate_chats(self, chat_ids: set[int], reminders: list[Reminder]):
+        """Бот заблокований або чату немає: вимикаємо всі нагадування в ці чати"""
+        # Старі рядки без chat_id шлються власнику, тож їх знаходимо за user_id
+        legacy_users = {reminder.user_id for reminder in reminders if reminder.chat_id is None}
+        query = Reminder.filter(Q(chat_id__in=list(chat_ids)) | Q(chat_id=None, user_id__in=list(legacy_users)), is_active=True)
+        user_ids = await query.values_list("user_id", flat=True)
+        await query.update(is_active=False)
+        await self.scheduler.forget_counts(user_ids)
+        logger.warning("Deactivated reminders for %d unreachable chats", len(chat_ids))
+
+    async def _send(self, chat_id: int, items: list[Item]) -> tuple[str, object]:
+        """Одна спроба для одного нагадування чи дайджесту; повтори планує _deliver через outbox"""
+        if len(items) == 1:
+            entry, reminder = items[0]
+            text = f"⏰ Reminder: {reminder.text}"
+            # Відкласти спільне нагадування може лише власник, підписник може відписатися
+            reply_markup = (
+                get_subscriber_keyboard(reminder.id) if entry.chat_id
+                else get_delivered_keyboard(reminder.id, int(entry.due_at), chat_id)
+            )
+        else:
+            text = digest_text([reminder for _, reminder in items])
+            reply_markup = get_digest_keyboard([(reminder.id, int(entry.due_at)) for entry, reminder in items], chat_id)
+        label = ",".join(str(reminder.id) for _, reminder in items)
+
+        await self.chat_limiter.acquire(chat_id)
+        await self.bucket.acquire()
+        started = time.perf_counter()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+            SEND_LATENCY.observe(time.perf_counter() - started)
+            # Лаг — те, що відчуває користувач: від запланованого часу до фактичної відправки
+            now = time.time()
+            for entry, _ in items:
+                SCHEDULER_LAG.observe(max(now - entry.due_at, 0.0))
+            SENT_TOTAL.inc(len(items))
+            if len(items) > 1:
+                DIGESTS_SENT.inc()
+            return SENT, None
+        except TelegramAPIError as e:
+            TELEGRAM_ERRORS.labels(type(e).__name__).inc()
+            if isinstance(e, TelegramRetryAfter):
+                logger.warning("Flood control, retry after %ss (reminder %s)", e.retry_after, label)
+                self.bucket.pause(e.retry_after)
+                self.chat_limiter.pause(chat_id, e.retry_after)
+                return THROTTLED, e.retry_after
+            if isinstance(e, (TelegramNetworkError, TelegramServerError)):
+                logger.warning("Transient error for reminder %s: %s", label, e)
+                return RETRY, e
+            logger.warning("Reminder %s not delivered: %s", label, e)
+            if isinstance(e, TelegramForbiddenError) or (
+                isinstance(e, TelegramBadRequest) and any(text in e.message.lower() for text in PERMANENT_CHAT_ERRORS)
+            ):
+                return BLOCKED, e
+            return FAILED, e
@@ -0,0 +1,139 @@
+"""
+FSM-сховище: стан і дані розмови одним компактним значенням у Redis.
+
+RedisStorage з aiogram тримає стан і дані окремими ключами в JSON, тож кожен крок
+діалогу — кілька запитів (get_state, get_data, set_data, set_state, clear). Тут
+[версія, стан, дані] пакуються msgpack в один ключ з TTL, а перед Redis стоїть
+локальний кеш на час розмови:
+
+- читання: з кешу, інакше один GET;
+- запис: оновлює кеш одразу, а в Redis іде один раз після того, як обробник віддав
+  керування (set_state + update_data + clear за один апдейт — один SET чи DEL).
+
+Кеш валідний, поки апдейти одного користувача обробляє один процес (режим `bot`
+або `all`); з кількома процесами, що приймають апдейти, його треба вимкнути (cache_size=0).
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Mapping
+import msgpack
+import redis.asyncio as redis
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+# Версія формату значення; значення іншої версії вважаються порожніми
+FORMAT_VERSION = 1
+FSM_PREFIX = "fsm2"
+
+Entry = tuple[str | None, dict[str, Any]]
+EMPTY: Entry = (None, {})
+
+
+def pack(state: str | None, data: Mapping[str, Any]) -> bytes:
+    return msgpack.packb([FORMAT_VERSION, state, dict(data)], use_bin_type=True)
+
+
+def unpack(raw: bytes | None) -> Entry:
+    if not raw:
+        return EMPTY
+    try:
+        version, state, data = msgpack.unpackb(raw, raw=False)
+    except (ValueError, msgpack.UnpackException):
+        logger.warning("Unreadable FSM value, starting over")
+        return EMPTY
+    if version != FORMAT_VERSION:
+        return EMPTY
+    return state, data
+
+
+class CompactRedisStorage(BaseStorage):
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl: int = 24 * 3600,
+        cache_size: int = 10_000,
+        cache_ttl: float = 600.0,
+        key_builder: KeyBuilder | None = None,
+    ):
+        """redis_client — без decode_responses: значення бінарні"""
+        self.redis = redis_client
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(prefix=FSM_PREFIX, with_bot_id=True)
+        self._cache: OrderedDict[str, tuple[float, Entry]] = OrderedDict()
+        # Записи, ще не збережені в Redis, і задачі, що їх зберігають (одна на ключ)
+        self._pending: dict[str, Entry] = {}
+        self._flushing: dict[str, asyncio.Task] = {}
+
+    def _remember(self, redis_key: str, entry: Entry):
+        if not self.cache_size:
+            return
+        self._cache[redis_key] = (time.monotonic() + self.cache_ttl, entry)
+        self._cache.move_to_end(redis_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: StorageKey) -> Entry:
+        redis_key = self.key_builder.build(key)
+        cached = self._cache.get(redis_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        if redis_key in self._pending:
+            return self._pending[redis_key]
+        entry = unpack(await self.redis.get(redis_key))
+        self._remember(redis_key, entry)
+        return entry
+
+    def _store(self, key: StorageKey, entry: Entry):
+        redis_key = self.key_builder.build(key)
+        self._remember(redis_key, entry)
+        self._pending[redis_key] = entry
+        if redis_key not in self._flushing:
+            self._flushing[redis_key] = asyncio.create_task(self._flush(redis_key))
+
+    async def _flush(self, redis_key: str):
+        # Задача стартує, коли обробник віддасть керування, тож усі його зміни йдуть одним записом;
+        # зміни, що прийшли під час запису, зберігаються наступним колом у тому ж порядку
+        try:
+            while redis_key in self._pending:
+                entry = self._pending[redis_key]
+                state, data = entry
+                if state is None and not data:
+                    await self.redis.delete(redis_key)
+                else:
+                    await self.redis.set(redis_key, pack(state, data), ex=self.ttl)
+                # Поки запис іде, читання бачать його тут, а не старе значення з Redis
+                if self._pending.get(redis_key) is entry:
+                    del self._pending[redis_key]
+        except Exception:
+            logger.exception("Failed to save FSM state %s", redis_key)
+        finally:
+            self._flushing.pop(redis_key, None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = await self._load(key)
+        self._store(key, (state.state if isinstance(state, State) else state, data))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _ = await self._load(key)
+        self._store(key, (state, dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(key)
+        # update_data змінює повернутий словник — віддаємо копію
+        return dict(data)
+
+    async def close(self) -> None:
+        # Дочікуємось незбережених записів, щоб рестарт не губив розмови
+        if self._flushing:
+            await asyncio.gather(*self._flushing.values(), return_exceptions=True)
+        await self.redis.aclose()
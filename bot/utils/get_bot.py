@@ -1,26 +1,32 @@
-from aiogram import Bot
-import os
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.redis import RedisJobStore
+from bot.utils.container import App
 
+# Контейнер процесу створюється при першому зверненні, а не під час імпорту
+_app: App | None = None
 
 
-
-default_jobstores = {
-    'default': RedisJobStore(
-            host=os.getenv("REDIS_HOST"),
-            port=os.getenv("REDIS_PORT"),
-            db=int(os.getenv("REDIS_DB") or 0)
-        )
-}
-bot = Bot(token=os.getenv("BOT_TOKEN"))  # type: ignore
-scheduler = AsyncIOScheduler(jobstores=default_jobstores)
+def get_app() -> App:
+    global _app
+    if _app is None:
+        _app = App()
+    return _app
 
 def get_bot():
-    return bot
+    return get_app().bot
+
+def get_delivery_bot():
+    return get_app().delivery_bot
+
+def get_redis():
+    return get_app().redis
 
 def get_scheduler():
-    return scheduler
+    return get_app().scheduler
 
+def get_delivery():
+    return get_app().delivery
 
+def get_user_cache():
+    return get_app().user_cache
 
+def get_fsm_storage():
+    return get_app().fsm_storage
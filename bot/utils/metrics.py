@@ -0,0 +1,82 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Бакети під Telegram-бота: від мілісекунд (парсер, Redis) до хвилин (лаг планувальника)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_seconds", "Час обробки апдейта хендлером", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Винятки в хендлерах", ["handler"]
+)
+PARSE_LATENCY = Histogram(
+    "bot_parse_seconds", "Час parse_reminder_text", buckets=FAST_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "bot_db_query_seconds", "Час запитів до БД на гарячому шляху", ["query"], buckets=FAST_BUCKETS
+)
+SCHEDULER_LAG = Histogram(
+    "bot_scheduler_lag_seconds", "Фактична відправка мінус запланований час спрацювання", buckets=LAG_BUCKETS
+)
+SEND_LATENCY = Histogram(
+    "bot_send_seconds", "Час одного виклику send_message", buckets=FAST_BUCKETS
+)
+SENT_TOTAL = Counter(
+    "bot_sent_total", "Відправлені нагадування"
+)
+FANOUT_QUEUED = Counter(
+    "bot_fanout_queued_total", "Доставки підписникам спільних нагадувань, поставлені в outbox"
+)
+DIGESTS_SENT = Counter(
+    "bot_digests_sent_total", "Відправлені дайджести (кілька нагадувань одним повідомленням)"
+)
+BOT_API_LATENCY = Histogram(
+    "bot_api_seconds", "Час запиту до Bot API", ["pool", "method"], buckets=FAST_BUCKETS + (2.5, 5.0, 10.0, 30.0, 60.0)
+)
+BOT_API_ERRORS = Counter(
+    "bot_api_errors_total", "Запити до Bot API, що завершились винятком", ["pool", "method", "error"]
+)
+TELEGRAM_ERRORS = Counter(
+    "bot_telegram_errors_total", "Помилки Bot API при відправці", ["error"]
+)
+THROTTLED = Counter(
+    "bot_throttled_total", "Апдейти, відкинуті через квоти", ["quota", "scope"]
+)
+WEBHOOK_REJECTED = Counter(
+    "bot_webhook_rejected_total", "Апдейти вебхука, відхилені з 503 через повну чергу"
+)
+QUEUE_DEPTH = Gauge(
+    "bot_queue_depth", "Кількість елементів у чергах", ["queue"]
+)
+OUTBOX_BACKLOG = Gauge(
+    "bot_outbox_backlog", "Спрацювання в outbox, які ще не підтверджено"
+)
+DEAD_LETTERS = Counter(
+    "bot_dead_letters_total", "Спрацювання, перенесені в dead-letter", ["reason"]
+)
+ARCHIVED_REMINDERS = Counter(
+    "bot_archived_reminders_total", "Неактивні нагадування, перенесені в архівну таблицю"
+)
+PENDING_REMINDERS = Gauge(
+    "bot_pending_reminders", "Кількість нагадувань в індексі планувальника"
+)
+USER_CACHE = Gauge(
+    "bot_user_cache", "Лічильники кешу користувачів", ["stat"]
+)
+
+
+def track_queue(name: str, qsize):
+    """Глибина черги рахується в момент збору метрик"""
+    QUEUE_DEPTH.labels(name).set_function(qsize)
+
+
+def track_user_cache(user_cache):
+    for stat in ("hits", "redis_hits", "misses", "size"):
+        USER_CACHE.labels(stat).set_function(lambda stat=stat: user_cache.stats()[stat])
+
+
+def start_metrics_server(host: str, port: int):
+    """Окремий HTTP-сервер у фоновому потоці віддає /metrics"""
+    if port:
+        start_http_server(port, addr=host)
@@ -0,0 +1,46 @@
+from pypika_tortoise import functions
+from tortoise.expressions import Q
+from tortoise.functions import Function
+from db.models.models import Reminder
+
+PAGE_SIZE = 10
+LABEL_LENGTH = 30
+
+
+class Substring(Function):
+    database_func = functions.Substring
+
+
+async def fetch_reminders_page(
+    user_id: int,
+    cursor: tuple[int, int] | None = None,
+    backward: bool = False,
+    limit: int = PAGE_SIZE,
+) -> tuple[list[dict], bool, bool]:
+    """
+    Keyset-пагінація активних нагадувань за (fire_at, id) без OFFSET.
+    `cursor` — перший (для backward) або останній елемент поточної сторінки.
+    Повертає рядки сторінки та ознаки наявності попередньої і наступної сторінок.
+    """
+    query = Reminder.filter(user_id=user_id, is_active=True, fire_at__not_isnull=True)
+    if cursor:
+        fire_at, reminder_id = cursor
+        if backward:
+            query = query.filter(Q(fire_at__lt=fire_at) | Q(fire_at=fire_at, id__lt=reminder_id))
+        else:
+            query = query.filter(Q(fire_at__gt=fire_at) | Q(fire_at=fire_at, id__gt=reminder_id))
+
+    order = ("-fire_at", "-id") if backward else ("fire_at", "id")
+    # Лише потрібні для кнопки колонки, текст обрізається в самій БД
+    rows = await (
+        query.order_by(*order)
+        .limit(limit + 1)
+        .annotate(label=Substring("text", 1, LABEL_LENGTH))
+        .values("id", "label", "fire_at")
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+        return rows, has_more, True
+    return rows, cursor is not None, has_more
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import redis.asyncio as redis
+
+THROTTLE_KEY = "throttle:{}:{}"
+
+# Ковзне вікно в Redis: лічильники поточного (KEYS[1]) і попереднього (KEYS[2]) вікна.
+# Спроба рахується лише якщо вкладається в ліміт; повертає {дозволено, попереднє, поточне}
+SLIDING_WINDOW_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if previous * (1 - tonumber(ARGV[3])) + current + 1 > tonumber(ARGV[1]) then
+    return {0, previous, current}
+end
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return {1, previous, current + 1}
+"""
+
+
+class TokenBucket:
+    """Глобальний ліміт відправки: `rate` токенів на секунду, не більше `capacity` підряд"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # Лок гарантує, що очікувачі отримують токени по черзі (FIFO)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Зупиняє видачу токенів, напр. після TelegramRetryAfter"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class ChatRateLimiter:
+    """Ліміт відправки в один чат: не частіше ніж `rate` повідомлень на секунду"""
+
+    def __init__(self, rate: float, max_chats: int = 100_000):
+        self.interval = 1 / rate
+        self.max_chats = max_chats
+        self._next_slot: dict[int, float] = {}
+
+    def _prune(self, now: float):
+        self._next_slot = {chat_id: slot for chat_id, slot in self._next_slot.items() if slot > now}
+
+    async def acquire(self, chat_id: int):
+        # Резервуємо слот одразу, щоб паралельні відправки в той самий чат вишикувались у чергу
+        now = time.monotonic()
+        if len(self._next_slot) > self.max_chats:
+            self._prune(now)
+        slot = max(now, self._next_slot.get(chat_id, now))
+        self._next_slot[chat_id] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, chat_id: int, seconds: float):
+        self._next_slot[chat_id] = max(self._next_slot.get(chat_id, 0.0), time.monotonic() + seconds)
+
+
+def sliding_retry_after(previous: int, current: int, elapsed: float, limit: int, window: float) -> float:
+    """
+    Через скільки секунд оцінка `previous * (1 - elapsed) + current` звільнить місце під
+    ще одну спробу; `elapsed` — пройдена частка поточного вікна.
+    """
+    if current + 1 > limit:
+        # Місце з'явиться лише в наступному вікні, де поточний лічильник стане попереднім
+        return (1 - elapsed) * window + max(0.0, 1 - (limit - 1) / current) * window
+    # previous > 0, інакше спроба вклалася б у ліміт
+    return max(0.0, (1 - (limit - 1 - current) / previous - elapsed) * window)
+
+
+class SlidingWindowLimiter:
+    """
+    Квоти «не більше limit спроб за window секунд» ковзним вікном: лічильник поточного
+    вікна плюс зважений лічильник попереднього, O(1) пам'яті на ключ. Для одного процесу.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # ключ -> (номер поточного вікна, лічильник попереднього, лічильник поточного)
+        self._windows: dict[str, tuple[int, int, int]] = {}
+
+    def _prune(self, now: float, window: float):
+        index = int(now // window)
+        self._windows = {key: value for key, value in self._windows.items() if value[0] >= index - 1}
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Рахує спробу; 0 — дозволено, інакше через скільки секунд можна повторити"""
+        now = time.time()
+        index, elapsed = divmod(now / window, 1)
+        index = int(index)
+        last, previous, current = self._windows.get(key, (index, 0, 0))
+        if last != index:
+            previous, current = (current if last == index - 1 else 0), 0
+        if previous * (1 - elapsed) + current + 1 > limit:
+            self._windows[key] = (index, previous, current)
+            return sliding_retry_after(previous, current, elapsed, limit, window)
+        if len(self._windows) > self.max_keys:
+            self._prune(now, window)
+        self._windows[key] = (index, previous, current + 1)
+        return 0.0
+
+
+class RedisSlidingWindowLimiter:
+    """Те саме ковзне вікно в Redis (один Lua-виклик на спробу): квоти спільні для всіх воркерів"""
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._hit = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        index, elapsed = divmod(now / window, 1)
+        index = int(index)
+        allowed, previous, current = await self._hit(
+            keys=[THROTTLE_KEY.format(key, index), THROTTLE_KEY.format(key, index - 1)],
+            # Лічильник потрібен ще одне вікно після свого — як попередній
+            args=[limit, int(window * 2000), elapsed],
+        )
+        if allowed:
+            return 0.0
+        return sliding_retry_after(int(previous), int(current), elapsed, limit, window)
@@ -0,0 +1,423 @@
+"""
+Масовий імпорт нагадувань з CSV / iCalendar і експорт в iCalendar.
+
+Файл читається потоково рядок за рядком (без завантаження в пам'ять цілком),
+кожен запис перевіряється тим самим date_parser, що й повідомлення, і вставляється
+пачками через bulk_create. Усі створені нагадування потрапляють в індекс
+планувальника одним конвеєром наприкінці.
+
+Експорт віддається як InputFile, що генерує ICS сторінками з БД просто під час
+завантаження в Telegram.
+"""
+import calendar
+import codecs
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from typing import AsyncGenerator, BinaryIO, Iterable, Iterator, NamedTuple, Optional, TextIO
+from zoneinfo import ZoneInfo
+from aiogram import Bot
+from aiogram.types import InputFile
+from db.models.models import Reminder, RepeatType, User
+from bot.utils.date_parser import parse_datetime, parse_repeat
+from bot.utils.metrics import DB_QUERY_LATENCY
+from bot.utils.timezones import get_zone, is_valid_zone, local_now, localize, now_epoch
+from scheduler.recurrence import PRESET_RULES, WEEKDAY_CODES
+from scheduler.scheduler import ReminderScheduler, first_occurrence, next_occurrence
+
+# Подія на весь день (DTSTART;VALUE=DATE) нагадує о цій годині
+ALL_DAY_TIME = time(9, 0)
+# Скільки помилок показати користувачу у звіті
+MAX_REPORTED_ERRORS = 10
+EXPORT_PAGE_SIZE = 500
+ENCODING_CHECK_BLOCK = 64 * 1024
+ICS_PRODID = "-//reminder-tgbot//UK"
+
+_PRESET_BY_RULE = {rule: repeat for repeat, rule in PRESET_RULES.items()}
+
+
+class ImportRow(NamedTuple):
+    line: int
+    text: str = ""
+    remind_at: Optional[datetime] = None
+    repeat: RepeatType = RepeatType.NONE
+    rule: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    past: int = 0
+    truncated: bool = False
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, error))
+
+
+def _normalize_repeat(repeat: RepeatType, rule: Optional[str]) -> tuple[RepeatType, Optional[str]]:
+    # FREQ=DAILY з файлу — той самий готовий варіант, що й кнопка "Щоденно"
+    if repeat == RepeatType.CUSTOM and rule in _PRESET_BY_RULE:
+        return _PRESET_BY_RULE[rule], None
+    return repeat, rule
+
+
+def iter_csv(stream: TextIO, tz: ZoneInfo) -> Iterator[ImportRow]:
+    """
+    Колонки (заголовок обов'язковий): text, date[, time][, repeat].
+    date — будь-що, що розуміє date_parser: 09.04.2025 23:00, 2025-04-09 23:00, завтра о 15:00;
+    repeat — daily / щотижня / кожні 2 дні / FREQ=...; роздільник , ; або табуляція.
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+    header = [name.strip().lower() for name in next(reader, [])]
+    if "text" not in header or "date" not in header:
+        yield ImportRow(1, error="потрібні колонки text і date")
+        return
+    columns = {name: header.index(name) for name in ("text", "date", "time", "repeat") if name in header}
+
+    now = local_now(tz)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        line = reader.line_num
+        row = {name: values[index].strip() if index < len(values) else "" for name, index in columns.items()}
+        if not row["text"]:
+            yield ImportRow(line, error="порожній текст")
+            continue
+        remind_at = parse_datetime(f"{row['date']} {row.get('time', '')}", now=now)
+        if not remind_at:
+            yield ImportRow(line, error=f"не вдалося розпізнати дату: {row['date']}")
+            continue
+        repeat, rule = parse_repeat(row.get("repeat", ""))
+        if repeat is None:
+            yield ImportRow(line, error=f"невідома періодичність: {row['repeat']}")
+            continue
+        yield ImportRow(line, row["text"], localize(remind_at, tz), *_normalize_repeat(repeat, rule))
+
+
+def _unfold(stream: TextIO) -> Iterator[tuple[int, str]]:
+    """Логічні рядки ICS: продовження (рядок з пробілу чи табуляції) склеюються з попереднім"""
+    current, start = None, 0
+    for number, raw in enumerate(stream, 1):
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t") and current is not None:
+            current += raw[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = raw, number
+    if current is not None:
+        yield start, current
+
+
+def _unescape(value: str) -> str:
+    result, chars = [], iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            char = "\n" if char in ("n", "N") else char
+        result.append(char)
+    return "".join(result)
+
+
+def _ics_datetime(value: str, params: dict[str, str], tz: ZoneInfo) -> Optional[datetime]:
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return localize(datetime.combine(datetime.strptime(value, "%Y%m%d").date(), ALL_DAY_TIME), tz)
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).astimezone(tz)
+        # Нестандартні TZID (Outlook) і "плаваючий" час — у часовому поясі користувача
+        tzid = params.get("TZID", "").strip('"')
+        zone = get_zone(tzid) if tzid and is_valid_zone(tzid) else tz
+        return localize(datetime.strptime(value, "%Y%m%dT%H%M%S"), zone)
+    except ValueError:
+        return None
+
+
+def _event_row(line: int, props: dict[str, tuple[dict[str, str], str]], tz: ZoneInfo) -> ImportRow:
+    text = _unescape(props.get("SUMMARY", ({}, ""))[1]).strip()
+    if not text:
+        return ImportRow(line, error="подія без SUMMARY")
+    if "DTSTART" not in props:
+        return ImportRow(line, error="подія без DTSTART")
+    params, value = props["DTSTART"]
+    remind_at = _ics_datetime(value, params, tz)
+    if not remind_at:
+        return ImportRow(line, error=f"не вдалося розпізнати DTSTART: {value}")
+    repeat, rule = RepeatType.NONE, None
+    if "RRULE" in props:
+        repeat, rule = parse_repeat(f"RRULE:{props['RRULE'][1]}")
+        if repeat is None:
+            return ImportRow(line, error=f"непідтримуване правило: {props['RRULE'][1]}")
+    return ImportRow(line, text, remind_at, *_normalize_repeat(repeat, rule))
+
+
+def iter_ics(stream: TextIO, tz: ZoneInfo) -> Iterator[ImportRow]:
+    """Події VEVENT: SUMMARY — текст, DTSTART — час, RRULE — періодичність; решта ігнорується"""
+    components: list[str] = []
+    props: dict[str, tuple[dict[str, str], str]] = {}
+    event_line = 0
+    for line, content in _unfold(stream):
+        name_params, sep, value = content.partition(":")
+        if not sep:
+            continue
+        name, *raw_params = name_params.split(";")
+        name = name.upper()
+        if name == "BEGIN":
+            components.append(value.upper())
+            if value.upper() == "VEVENT":
+                props, event_line = {}, line
+        elif name == "END":
+            if components and components.pop() == "VEVENT":
+                yield _event_row(event_line, props, tz)
+        elif components and components[-1] == "VEVENT":
+            params = {}
+            for param in raw_params:
+                key, _, param_value = param.partition("=")
+                params[key.upper()] = param_value
+            props.setdefault(name, (params, value))
+
+
+def is_utf8(raw: BinaryIO) -> bool:
+    """
+    Перевіряє кодування всього файлу до імпорту, блоками, і повертає позицію на початок:
+    помилка посеред файлу інакше спливла б, коли частина рядків уже вставлена
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        while block := raw.read(ENCODING_CHECK_BLOCK):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    finally:
+        raw.seek(0)
+    return True
+
+
+def iter_rows(stream: TextIO, filename: str, tz: ZoneInfo) -> Iterator[ImportRow]:
+    if filename.lower().endswith((".ics", ".ical", ".ifb", ".icalendar")):
+        return iter_ics(stream, tz)
+    return iter_csv(stream, tz)
+
+
+async def import_reminders(
+    rows: Iterable[ImportRow],
+    user: User,
+    chat_id: int,
+    scheduler: ReminderScheduler,
+    chunk_size: int = 500,
+    max_rows: int = 10000,
+) -> ImportReport:
+    tz = get_zone(user.timezone)
+    now = now_epoch()
+    report = ImportReport()
+    # bulk_create не повертає id, тож створене знаходимо як id, більші за поточний максимум
+    last_id = await Reminder.filter(user_id=user.id).order_by("-id").first().values_list("id", flat=True) or 0
+
+    batch: list[Reminder] = []
+
+    async def flush():
+        with DB_QUERY_LATENCY.labels("import_bulk_create").time():
+            await Reminder.bulk_create(batch)
+        report.imported += len(batch)
+        batch.clear()
+
+    try:
+        for row in rows:
+            if report.imported + len(batch) + report.past >= max_rows:
+                report.truncated = True
+                break
+            if row.error:
+                report.add_error(row.line, row.error)
+                continue
+            reminder = Reminder(
+                user_id=user.id,
+                chat_id=chat_id,
+                text=row.text,
+                remind_at=row.remind_at,
+                repeat=row.repeat,
+                recurrence=row.rule,
+            )
+            fire_at = first_occurrence(reminder, tz)
+            # Серія, що почалась у минулому, продовжується з найближчого спрацювання
+            if fire_at is not None and fire_at < now:
+                fire_at = next_occurrence(reminder, now, tz)
+            if not fire_at:
+                report.past += 1
+                continue
+            reminder.fire_at = fire_at
+            batch.append(reminder)
+            if len(batch) >= chunk_size:
+                await flush()
+        if batch:
+            await flush()
+    finally:
+        # Навіть після помилки посеред файлу вставлене має потрапити в індекс
+        if report.imported:
+            created = await Reminder.filter(user_id=user.id, id__gt=last_id, is_active=True).only(
+                "id", "user_id", "fire_at"
+            )
+            await scheduler.schedule_many(created)
+            await scheduler.forget_counts([user.id])
+    return report
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """Рядки ICS не довші за 75 октетів, продовження починаються з пробілу"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Не розрізаємо багатобайтовий символ UTF-8
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_offset(offset: timedelta) -> str:
+    sign, seconds = ("-", -offset.total_seconds()) if offset < timedelta(0) else ("+", offset.total_seconds())
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{sign}{hours:02}{minutes:02}{f'{seconds:02}' if seconds else ''}"
+
+
+def _transitions(tz: ZoneInfo, year: int) -> list[datetime]:
+    """Моменти (UTC) зміни зміщення зони протягом року: крок у день, далі уточнення до хвилини"""
+    found = []
+    moment = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    while moment < end:
+        step = moment + timedelta(days=1)
+        if moment.astimezone(tz).utcoffset() != step.astimezone(tz).utcoffset():
+            low, high = moment, step
+            while high - low > timedelta(minutes=1):
+                middle = low + (high - low) / 2
+                if low.astimezone(tz).utcoffset() == middle.astimezone(tz).utcoffset():
+                    low = middle
+                else:
+                    high = middle
+            found.append(high.replace(second=0, microsecond=0))
+        moment = step
+    return found
+
+
+def _vtimezone(tz: ZoneInfo, year: int) -> list[str]:
+    """
+    VTIMEZONE для TZID подій (RFC 5545 вимагає його для кожного TZID). Поточні правила
+    переходів записуються щорічними RRULE ("остання неділя березня"), тож клієнт
+    рахує зміщення для будь-якого спрацювання серії, а не лише цього року.
+    """
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tz.key}"]
+    transitions = _transitions(tz, year)
+    # Правила літнього часу — рівно пара переходів; разова зміна зміщення не повторюється щороку
+    if len(transitions) != 2:
+        transitions = []
+        moment = datetime(year, 12, 31, tzinfo=timezone.utc).astimezone(tz)
+        offset = _ics_offset(moment.utcoffset())
+        lines += [
+            "BEGIN:STANDARD",
+            "DTSTART:19700101T000000",
+            f"TZOFFSETFROM:{offset}",
+            f"TZOFFSETTO:{offset}",
+            f"TZNAME:{moment.tzname()}",
+            "END:STANDARD",
+        ]
+    for moment in transitions:
+        before, after = (moment - timedelta(minutes=1)).astimezone(tz), moment.astimezone(tz)
+        # Час переходу в настінному часі до нього, напр. 03:00 за зимовим
+        onset = (moment + before.utcoffset()).replace(tzinfo=None)
+        days_in_month = calendar.monthrange(onset.year, onset.month)[1]
+        week = -1 if onset.day + 7 > days_in_month else (onset.day - 1) // 7 + 1
+        # DTSTART — той самий день правила в 1970 році
+        first_weekday, days_1970 = calendar.monthrange(1970, onset.month)
+        day = 1 + (onset.weekday() - first_weekday) % 7
+        day = day + 7 * (week - 1) if week > 0 else day + 7 * ((days_1970 - day) // 7)
+        kind = "DAYLIGHT" if after.dst() else "STANDARD"
+        lines += [
+            f"BEGIN:{kind}",
+            f"DTSTART:{onset.replace(year=1970, day=day):%Y%m%dT%H%M%S}",
+            f"RRULE:FREQ=YEARLY;BYMONTH={onset.month};BYDAY={week}{WEEKDAY_CODES[onset.weekday()]}",
+            f"TZOFFSETFROM:{_ics_offset(before.utcoffset())}",
+            f"TZOFFSETTO:{_ics_offset(after.utcoffset())}",
+            f"TZNAME:{after.tzname()}",
+            f"END:{kind}",
+        ]
+    lines.append("END:VTIMEZONE")
+    return lines
+
+
+def _ics_event(row: dict, tz: ZoneInfo, stamp: str) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:reminder-{row['id']}@reminder-tgbot",
+        f"DTSTAMP:{stamp}",
+        f"SUMMARY:{_escape(row['text'])}",
+    ]
+    rule = row["recurrence"] if row["repeat"] == RepeatType.CUSTOM else PRESET_RULES.get(row["repeat"])
+    if rule and row["remind_at"]:
+        # Серія рахується від якоря в настінному часі, як і в планувальнику
+        start = row["remind_at"].astimezone(tz)
+        lines += [f"DTSTART;TZID={tz.key}:{start:%Y%m%dT%H%M%S}", f"RRULE:{rule}"]
+    else:
+        fire_at = row["fire_at"] or int(row["remind_at"].timestamp())
+        lines.append(f"DTSTART:{datetime.fromtimestamp(fire_at, timezone.utc):%Y%m%dT%H%M%SZ}")
+    lines += [
+        "BEGIN:VALARM",
+        "ACTION:DISPLAY",
+        "TRIGGER:PT0S",
+        f"DESCRIPTION:{_escape(row['text'])}",
+        "END:VALARM",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+class CalendarExport(InputFile):
+    """Активні нагадування користувача як .ics; сторінки з БД читаються під час відправки"""
+
+    def __init__(self, user: User, filename: str = "reminders.ics", page_size: int = EXPORT_PAGE_SIZE):
+        super().__init__(filename=filename)
+        self.user_id = user.id
+        self.tz = get_zone(user.timezone)
+        self.page_size = page_size
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        now = datetime.now(timezone.utc)
+        stamp = f"{now:%Y%m%dT%H%M%SZ}"
+        yield f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{ICS_PRODID}\r\nCALSCALE:GREGORIAN\r\n".encode()
+        # Повторювані події мають DTSTART;TZID зони користувача
+        yield "".join(_fold(line) for line in _vtimezone(self.tz, now.year)).encode()
+        last_id = 0
+        while True:
+            rows = await (
+                Reminder.filter(user_id=self.user_id, is_active=True, id__gt=last_id)
+                .order_by("id")
+                .limit(self.page_size)
+                .values("id", "text", "remind_at", "fire_at", "repeat", "recurrence")
+            )
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            yield "".join(
+                _ics_event(row, self.tz, stamp) for row in rows if row["fire_at"] or row["remind_at"]
+            ).encode()
+        yield b"END:VCALENDAR\r\n"
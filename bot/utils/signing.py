@@ -0,0 +1,24 @@
+import hashlib
+import hmac
+from db.config import get_settings
+
+SIGNATURE_BYTES = 6
+
+
+def _secret() -> bytes:
+    # Без окремого секрету ключ виводиться з токена бота
+    settings = get_settings().redis
+    if not settings.CALLBACK_SECRET and not settings.BOT_TOKEN:
+        raise RuntimeError("CALLBACK_SECRET or BOT_TOKEN must be set to sign callback data")
+    secret = settings.CALLBACK_SECRET or f"callback:{settings.BOT_TOKEN}"
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def sign_callback(*parts: object) -> str:
+    """Короткий HMAC для callback_data: hex без '_' і вкладається в ліміт Telegram у 64 байти"""
+    message = ":".join(str(part) for part in parts).encode()
+    return hmac.new(_secret(), message, hashlib.sha256).digest()[:SIGNATURE_BYTES].hex()
+
+
+def verify_callback(signature: str, *parts: object) -> bool:
+    return hmac.compare_digest(signature, sign_callback(*parts))
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from db.config import get_settings
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str | None) -> ZoneInfo:
+    """ZoneInfo за назвою; якщо зона не задана або невідома — зона сервера з налаштувань"""
+    default = get_settings().redis.TIMEZONE
+    try:
+        return ZoneInfo(name or default)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(default)
+
+
+def is_valid_zone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def local_now(tz: ZoneInfo) -> datetime:
+    """Поточний настінний час користувача без tzinfo — саме так його розуміє date_parser"""
+    return datetime.now(tz).replace(tzinfo=None)
+
+
+def localize(naive: datetime, tz: ZoneInfo) -> datetime:
+    # fold=0: неоднозначний час при переході з літнього часу береться першим,
+    # неіснуючий (перехід на літній) зсувається вперед на величину переходу
+    return naive.replace(tzinfo=tz, fold=0).astimezone(timezone.utc).astimezone(tz)
+
+
+def to_epoch(moment: datetime) -> int:
+    return int(moment.timestamp())
+
+
+def now_epoch() -> int:
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def format_epoch(epoch: int, tz: ZoneInfo) -> str:
+    return datetime.fromtimestamp(epoch, tz).strftime('%d.%m.%Y %H:%M')
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+def update_owner_id(update: Update) -> int:
+    """Ключ впорядкування: користувач (або чат), від якого прийшов апдейт"""
+    event = update.event
+    user = getattr(event, "from_user", None)
+    if user:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat:
+        return chat.id
+    return update.update_id
+
+
+class UpdatePool:
+    """
+    Обмежений пул обробки апдейтів. Апдейти одного користувача завжди потрапляють
+    в одну чергу й обробляються послідовно, тож переходи ReminderStates не змагаються.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = 32, queue_size: int = 1000):
+        self.dp = dp
+        self.bot = bot
+        self.queues: list[asyncio.Queue[tuple[Update, float]]] = [
+            asyncio.Queue(maxsize=max(queue_size // workers, 1)) for _ in range(workers)
+        ]
+        self.latencies: deque[float] = deque(maxlen=10_000)
+        self.processed = 0
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self.queues]
+
+    async def stop(self, timeout: float = 10.0):
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Update pool not drained, %d updates left", self.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        await asyncio.gather(*(queue.join() for queue in self.queues))
+
+    def qsize(self) -> int:
+        return sum(queue.qsize() for queue in self.queues)
+
+    def submit(self, update: Update) -> bool:
+        """Кладе апдейт у чергу без очікування; False, якщо черга його власника повна"""
+        queue = self.queues[update_owner_id(update) % len(self.queues)]
+        try:
+            queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue[tuple[Update, float]]):
+        while True:
+            update, received_at = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                logger.exception("Failed to process update %s", update.update_id)
+            finally:
+                self.latencies.append(time.perf_counter() - received_at)
+                self.processed += 1
+                queue.task_done()
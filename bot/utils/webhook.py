@@ -0,0 +1,40 @@
+import logging
+from aiohttp import web
+from aiogram import Bot
+from aiogram.types import Update
+from bot.utils.metrics import WEBHOOK_REJECTED
+from bot.utils.update_pool import UpdatePool
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def build_webhook_app(bot: Bot, pool: UpdatePool, path: str, secret: str | None = None) -> web.Application:
+    """
+    aiohttp-застосунок, що приймає апдейт, кладе його в пул і одразу відповідає 200.
+    Якщо черга пулу повна, одразу відповідає 503: Telegram надішле апдейт повторно
+    пізніше, а відповідь не чекає, поки в черзі звільниться місце.
+    """
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        if not pool.submit(update):
+            WEBHOOK_REJECTED.inc()
+            logger.warning("Update queue is full, rejecting update %s", update.update_id)
+            return web.Response(status=503)
+        return web.Response()
+
+    async def on_startup(app: web.Application):
+        await pool.start()
+
+    async def on_shutdown(app: web.Application):
+        await pool.stop()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
@@ -0,0 +1,49 @@
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+from db.config import get_settings
+from db.upgrade import backfill_fire_at, upgrade_schema
+
+MODELS = ["db.models.models"]
+
+
+def get_db_connection(db_url: str | None = None) -> dict:
+    """Опис з'єднання для Tortoise: пул asyncpg для PostgreSQL, WAL-режим для SQLite"""
+    db_settings = get_settings().db
+    connection = expand_db_url(db_url or db_settings.DB_URL)
+    credentials = connection["credentials"]
+    if connection["engine"] == "tortoise.backends.asyncpg":
+        credentials.update(
+            minsize=db_settings.DB_POOL_MIN_SIZE,
+            maxsize=db_settings.DB_POOL_MAX_SIZE,
+            statement_cache_size=db_settings.DB_STATEMENT_CACHE_SIZE,
+            command_timeout=db_settings.DB_COMMAND_TIMEOUT,
+        )
+    elif connection["engine"] == "tortoise.backends.sqlite":
+        # Параметри SQLite-клієнта застосовуються як PRAGMA при підключенні
+        credentials.update(
+            journal_mode="WAL" if db_settings.SQLITE_WAL else "DELETE",
+            synchronous="NORMAL" if db_settings.SQLITE_WAL else "FULL",
+            busy_timeout=5000,
+        )
+    return connection
+
+
+def get_tortoise_config(db_url: str | None = None) -> dict:
+    return {
+        "connections": {"default": get_db_connection(db_url)},
+        "apps": {"models": {"models": MODELS, "default_connection": "default"}},
+        "use_tz": True,
+        "timezone": get_settings().redis.TIMEZONE,
+    }
+
+
+async def init_db(db_url: str | None = None):
+    await Tortoise.init(config=get_tortoise_config(db_url), _create_db=True)
+    # Колонки додаються до generate_schemas: нові індекси посилаються на них
+    await upgrade_schema()
+    await Tortoise.generate_schemas(safe=True)
+    await backfill_fire_at()
+
+
+async def close_db():
+    await Tortoise.close_connections()
@@ -1,18 +1,25 @@
 from enum import Enum
 from tortoise import fields, models
-from tortoise.contrib.pydantic import pydantic_model_creator
+from tortoise.indexes import PartialIndex
 
 
 class RepeatType(str, Enum):
     NONE = "none"
     DAILY = "daily"
     WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+    WEEKDAYS = "weekdays"
+    # Довільне правило RRULE у Reminder.recurrence
+    CUSTOM = "custom"
 
 
 class User(models.Model):
     id = fields.IntField(pk=True)
     telegram_id = fields.BigIntField(unique=True)
     timezone = fields.CharField(max_length=50, null=True)
+    # Спрацювання, що настали в межах вікна, приходять одним повідомленням-дайджестом
+    digest = fields.BooleanField(default=False)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
@@ -23,17 +30,69 @@ class User(models.Model):
 class Reminder(models.Model):
     id = fields.IntField(pk=True)
     user = fields.ForeignKeyField("models.User", related_name="reminders")
+    # Копія user.telegram_id (або id групи), щоб доставка обходилась без join
+    chat_id = fields.BigIntField(null=True)
     text = fields.TextField()
-    remind_at = fields.DatetimeField(null=True, default=None)
-    repeat = fields.CharEnumField(RepeatType, default=RepeatType.NONE)
+    remind_at = fields.DatetimeField(null=True, default=None, db_index=True)
+    # UTC epoch наступного спрацювання, рахується один раз при створенні/перенесенні
+    fire_at = fields.BigIntField(null=True, default=None)
+    repeat = fields.CharEnumField(RepeatType, max_length=16, default=RepeatType.NONE)
+    # RRULE для repeat=custom, напр. FREQ=DAILY;INTERVAL=3;UNTIL=20251231
+    recurrence = fields.CharField(max_length=255, null=True, default=None)
     is_active = fields.BooleanField(default=True)
+    # Має підписників (ReminderSubscriber): кожне спрацювання розсилається і їм
+    shared = fields.BooleanField(default=False)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "reminders"
+        # Часткові індекси: гарячі запити йдуть лише по активних рядках, тож неактивні,
+        # яких з часом більшість, не роздувають індекси до переносу в архів
+        indexes = (
+            # list_reminders: Reminder.filter(user=..., is_active=True) з keyset-пагінацією за fire_at
+            PartialIndex(fields=("user_id", "fire_at"), name="reminders_active_user_fire", condition={"is_active": True}),
+            # вибірка активних нагадувань за часом спрацювання
+            PartialIndex(fields=("fire_at",), name="reminders_active_fire", condition={"is_active": True}),
+            # кандидати на архівацію (scheduler.retention)
+            PartialIndex(fields=("updated_at",), name="reminders_inactive_updated", condition={"is_active": False}),
+        )
 
 
-# Create Pydantic models for API
-User_Pydantic = pydantic_model_creator(User, name="User")
-Reminder_Pydantic = pydantic_model_creator(Reminder, name="Reminder") 
\ No newline at end of file
+class ReminderSubscriber(models.Model):
+    """
+    Чат, який отримує спільне нагадування. Саме нагадування зберігається і планується
+    один раз, а підписники — лише рядок (нагадування, чат) кожен.
+    """
+    id = fields.IntField(pk=True)
+    reminder = fields.ForeignKeyField("models.Reminder", related_name="subscribers")
+    chat_id = fields.BigIntField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "reminder_subscribers"
+        # Індекс (reminder_id, chat_id) водночас дає keyset-обхід підписників при розсилці
+        unique_together = (("reminder", "chat_id"),)
+
+
+class ArchivedReminder(models.Model):
+    """
+    Неактивне нагадування, перенесене з reminders задачею зберігання.
+
+    Лише дані для історії: id зберігається з оригіналу, без зовнішнього ключа й індексів,
+    щоб вставка чанками лишалась дешевою.
+    """
+    id = fields.IntField(pk=True, generated=False)
+    user_id = fields.IntField()
+    chat_id = fields.BigIntField(null=True)
+    text = fields.TextField()
+    remind_at = fields.DatetimeField(null=True)
+    # Останнє спрацювання
+    fire_at = fields.BigIntField(null=True)
+    repeat = fields.CharEnumField(RepeatType, max_length=16, default=RepeatType.NONE)
+    recurrence = fields.CharField(max_length=255, null=True)
+    created_at = fields.DatetimeField()
+    archived_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "reminders_archive"
@@ -0,0 +1,101 @@
+"""
+Оновлення схеми наявної БД до поточних моделей.
+
+generate_schemas(safe=True) створює лише відсутні таблиці й індекси, а в наявні таблиці
+колонок не додає. Тому init_db перед ним додає колонки, що з'явились після першої версії
+схеми (нові індекси посилаються на них), і прибирає індекси, які замінили часткові, а після
+нього рахує fire_at для рядків, у яких його ще немає.
+"""
+import logging
+from tortoise import Tortoise
+from db.models.models import Reminder
+from bot.utils.timezones import get_zone, now_epoch
+from scheduler.scheduler import upcoming_occurrence
+
+logger = logging.getLogger(__name__)
+
+# (таблиця, колонка, визначення) у порядку появи
+ADDED_COLUMNS = (
+    ("reminders", "fire_at", "BIGINT"),
+    ("reminders", "chat_id", "BIGINT"),
+    ("users", "digest", "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ("reminders", "recurrence", "VARCHAR(255)"),
+    ("reminders", "shared", "BOOLEAN NOT NULL DEFAULT FALSE"),
+)
+# Повні індекси, замість яких тепер часткові (WHERE is_active)
+REPLACED_INDEXES = (
+    "idx_reminders_fire_at_ff1b65",
+    "idx_reminders_user_id_c8d220",
+    "idx_reminders_is_acti_751bb1",
+)
+# Старі рядки без chat_id шлються власнику — копіюємо його telegram_id
+BACKFILL_CHAT_ID = (
+    "UPDATE reminders SET chat_id = (SELECT telegram_id FROM users WHERE users.id = reminders.user_id) "
+    "WHERE chat_id IS NULL"
+)
+REPEAT_LENGTH = 16
+
+
+async def _columns(table: str) -> dict[str, int | None]:
+    """Колонки таблиці з їх довжиною (для VARCHAR у PostgreSQL); порожньо, якщо таблиці ще немає"""
+    connection = Tortoise.get_connection("default")
+    if connection.capabilities.dialect == "sqlite":
+        rows = await connection.execute_query_dict(f'PRAGMA table_info("{table}")')
+        return {row["name"]: None for row in rows}
+    rows = await connection.execute_query_dict(
+        "SELECT column_name, character_maximum_length FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = $1",
+        [table],
+    )
+    return {row["column_name"]: row["character_maximum_length"] for row in rows}
+
+
+async def upgrade_schema():
+    """Додає відсутні колонки в наявні таблиці; на свіжій БД нічого не робить"""
+    connection = Tortoise.get_connection("default")
+    tables = {table: await _columns(table) for table in ("users", "reminders")}
+    if not tables["reminders"]:
+        return
+    for table, column, definition in ADDED_COLUMNS:
+        if column in tables[table]:
+            continue
+        await connection.execute_script(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}')
+        logger.info("Added column %s.%s", table, column)
+        if column == "chat_id":
+            await connection.execute_script(BACKFILL_CHAT_ID)
+    # У PostgreSQL VARCHAR першої версії вміщав лише "weekly"
+    repeat_length = tables["reminders"].get("repeat")
+    if repeat_length and repeat_length < REPEAT_LENGTH:
+        await connection.execute_script(f'ALTER TABLE "reminders" ALTER COLUMN "repeat" TYPE VARCHAR({REPEAT_LENGTH})')
+    for index in REPLACED_INDEXES:
+        await connection.execute_script(f'DROP INDEX IF EXISTS "{index}"')
+
+
+async def backfill_fire_at(now: int | None = None, chunk_size: int = 1000) -> int:
+    """
+    fire_at для активних нагадувань, у яких його немає (рядки зі старих версій), у часовому
+    поясі власника. Береться найближче спрацювання не раніше `now`, тож після оновлення
+    повторювані нагадування не вважаються пропущеними й не приходять усі одразу; разові,
+    час яких минув, деактивуються. Повертає кількість оновлених рядків.
+    """
+    now = now or now_epoch()
+    updated = 0
+    last_id = 0
+    while True:
+        reminders = await (
+            Reminder.filter(is_active=True, fire_at__isnull=True, id__gt=last_id)
+            .select_related("user")
+            .order_by("id")
+            .limit(chunk_size)
+        )
+        if not reminders:
+            break
+        for reminder in reminders:
+            reminder.fire_at = upcoming_occurrence(reminder, now, get_zone(reminder.user.timezone))
+            reminder.is_active = reminder.fire_at is not None
+        await Reminder.bulk_update(reminders, fields=["fire_at", "is_active"])
+        updated += len(reminders)
+        last_id = reminders[-1].id
+    if updated:
+        logger.info("Filled fire_at for %d reminders", updated)
+    return updated
@@ -1,65 +1,141 @@
 import asyncio
 import logging
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.redis import RedisStorage
-from tortoise import Tortoise
-import redis.asyncio as redis
+from bot.middlewares.metrics_middleware import MetricsMiddleware
 from bot.middlewares.scheduler_middleware import SchedulerMiddleware
-from db.config import redis_settings
+from bot.middlewares.throttling_middleware import Quota, ThrottlingMiddleware
+from bot.middlewares.user_middleware import UserMiddleware
+from db.config import WebhookSettings
+from db.database import init_db, close_db
 from bot.handlers.handlers import router
-from bot.utils.get_bot import get_bot, get_scheduler
+from bot.utils.get_bot import get_app
+from bot.utils.metrics import start_metrics_server, track_queue, track_user_cache
+from bot.utils.update_pool import UpdatePool
+from bot.utils.webhook import build_webhook_app
+from scheduler.reconcile import Reconciler
+from scheduler.retention import RetentionJob
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    # Initialize Redis
-    redis_client = redis.Redis(
-        host=redis_settings.REDIS_HOST,
-        port=redis_settings.REDIS_PORT,
-        db=redis_settings.REDIS_DB,
-        decode_responses=True
+async def run_webhook(dp: Dispatcher, bot: Bot, webhook_settings: WebhookSettings):
+    pool = UpdatePool(
+        dp,
+        bot,
+        workers=webhook_settings.UPDATE_WORKERS,
+        queue_size=webhook_settings.UPDATE_QUEUE_SIZE,
     )
-    
-    # Initialize bot and dispatcher with Redis storage
-    
-    storage = RedisStorage(redis=redis_client)
-    dp = Dispatcher(storage=storage)
-    
-    # Initialize scheduler with Redis job store
+    track_queue("updates", pool.qsize)
+    app = build_webhook_app(bot, pool, webhook_settings.WEBHOOK_PATH, webhook_settings.WEBHOOK_SECRET)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, webhook_settings.WEBAPP_HOST, webhook_settings.WEBAPP_PORT).start()
+    await bot.set_webhook(
+        f"{webhook_settings.WEBHOOK_BASE_URL}{webhook_settings.WEBHOOK_PATH}",
+        secret_token=webhook_settings.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
+
+async def main():
+    # Components are built on first use, so each role only creates what it needs
+    app = get_app()
+    settings = app.settings
+    scheduler_settings = settings.scheduler
+
+    # Initialize dispatcher with compact Redis FSM storage
+    dp = Dispatcher(storage=app.fsm_storage)
     
-    # Initialize scheduler
-    scheduler = get_scheduler()
+    # Initialize scheduler with Redis due-index
+    scheduler = app.scheduler
     
     # Initialize database
-    await Tortoise.init(
-        db_url="sqlite:///db.sqlite3",
-        _create_db=True,
-        use_tz=True, 
-        timezone=redis_settings.TIMEZONE, 
-        modules={"models": ["db.models.models"]},
-        
-    )
-    await Tortoise.generate_schemas(safe=True)
+    await init_db()
     
-    # Start scheduler
-    await scheduler.start()
+    # Expose /metrics
+    start_metrics_server(settings.metrics.METRICS_HOST, settings.metrics.METRICS_PORT)
+
+    # Start delivery workers and scheduler (role "bot" only accepts updates)
+    role = scheduler_settings.APP_ROLE
+    if role in ("all", "worker"):
+        delivery = app.delivery
+        track_queue("delivery", lambda: delivery.in_flight)
+        await delivery.start()
+        # Bring the due index in line with the database before polling it
+        if scheduler_settings.SCHEDULER_RECONCILE:
+            await Reconciler(
+                scheduler,
+                chunk_size=scheduler_settings.SCHEDULER_RECONCILE_CHUNK,
+                misfire_policy=scheduler_settings.SCHEDULER_MISFIRE_POLICY,
+                misfire_grace=scheduler_settings.SCHEDULER_MISFIRE_GRACE,
+            ).run()
+        await scheduler.start()
+    # Old inactive reminders are moved to the archive table in small batches
+    retention = None
+    if role in ("all", "worker") and settings.retention.RETENTION_DAYS > 0:
+        retention = RetentionJob(
+            app.redis,
+            settings.retention.RETENTION_DAYS,
+            batch_size=settings.retention.RETENTION_BATCH_SIZE,
+            interval=settings.retention.RETENTION_INTERVAL,
+            pause=settings.retention.RETENTION_PAUSE,
+        )
+        await retention.start()
+    # Per-user update rate is checked before FSM filters and any DB work
+    throttle = settings.throttle
+    updates_throttling = ThrottlingMiddleware(
+        app.limiter, {"updates": Quota(throttle.THROTTLE_UPDATES, throttle.THROTTLE_UPDATES_WINDOW)}
+    )
+    router.message.outer_middleware(updates_throttling)
+    router.callback_query.outer_middleware(updates_throttling)
+    # Times every handler by name
+    metrics_middleware = MetricsMiddleware()
+    router.message.middleware(metrics_middleware)
+    router.callback_query.middleware(metrics_middleware)
+    # Quotas of handlers flagged throttle="create", per user and for everyone together
+    create_throttling = ThrottlingMiddleware(
+        app.limiter,
+        {"create": Quota(throttle.THROTTLE_CREATE, throttle.THROTTLE_CREATE_WINDOW)},
+        {"create": Quota(throttle.THROTTLE_GLOBAL_CREATE, throttle.THROTTLE_GLOBAL_CREATE_WINDOW)},
+    )
+    router.message.middleware(create_throttling)
+    router.callback_query.middleware(create_throttling)
     scheduler_middleware = SchedulerMiddleware(scheduler)
     router.message.middleware(scheduler_middleware)
     router.callback_query.middleware(scheduler_middleware)
+    user_cache = app.user_cache
+    track_user_cache(user_cache)
+    # Drop local copies of users changed by other processes (/timezone, /digest)
+    await user_cache.start()
+    user_middleware = UserMiddleware(user_cache)
+    router.message.middleware(user_middleware)
+    router.callback_query.middleware(user_middleware)
     # Register handlers
     dp.include_router(router)
     
-    bot = get_bot()
     # Start polling
     try:
-        await dp.start_polling(bot)
+        if role == "worker":
+            await asyncio.Event().wait()
+        elif settings.webhook.BOT_MODE == "webhook":
+            await run_webhook(dp, app.bot, settings.webhook)
+        else:
+            await dp.start_polling(app.bot)
     finally:
-        await bot.session.close()
-        await Tortoise.close_connections()
-        await redis_client.close()
+        await user_cache.shutdown()
+        if retention:
+            await retention.shutdown()
+        if role in ("all", "worker"):
+            await scheduler.shutdown()
+            await app.delivery.stop()
+        await app.close()
+        await close_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+Вихідна черга доставки (outbox) на Redis Stream.
+
+Кожне спрацювання потрапляє в стрім рівно один раз — атомарно разом із ZREM з індексу
+(див. CLAIM_DUE_SCRIPT). Воркери доставки читають його через consumer group, тож
+запис, який не підтвердили (падіння процесу посеред відправки), після
+`visibility_timeout` забирає інший воркер: доставка at-least-once.
+
+Невдалі відправки чекають у RETRY_KEY з експоненційною затримкою і повертаються в
+стрім планувальником; ті, що не вдались остаточно, переносяться в DEAD_KEY.
+"""
+import time
+from typing import NamedTuple
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from scheduler.wakeup import ZADD_NOTIFY_SCRIPT, zadd_args
+
+OUTBOX_KEY = "reminders:outbox"
+OUTBOX_GROUP = "delivery"
+RETRY_KEY = "reminders:retry"
+DEAD_KEY = "reminders:dead"
+# Спрацювання спільного нагадування, вже розіслане підписникам (повтор власнику не розсилає вдруге)
+FANOUT_KEY = "reminders:fanout:{}:{}"
+FANOUT_TTL = 2 * 24 * 3600
+DEAD_MAXLEN = 100_000
+RETRY_BACKOFF_MAX = 300
+
+# Повертає в стрім повтори, час яких настав; член RETRY_KEY — "<reminder_id>:<due_at>:<attempt>"
+# або "<reminder_id>:<due_at>:<attempt>:<chat_id>" для доставки підписнику
+MOVE_RETRIES_SCRIPT = """
+local ready = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(ready) do
+    local reminder_id, due_at, attempt, chat_id = string.match(member, '^(%d+):(%d+):(%d+):?(-?%d*)$')
+    redis.call('ZREM', KEYS[1], member)
+    if chat_id ~= '' then
+        redis.call('XADD', KEYS[2], '*', 'r', reminder_id, 'd', due_at, 'a', attempt, 'c', chat_id)
+    else
+        redis.call('XADD', KEYS[2], '*', 'r', reminder_id, 'd', due_at, 'a', attempt)
+    end
+end
+return #ready
+"""
+
+
+class OutboxEntry(NamedTuple):
+    # None — спрацювання, забране з індексу напряму, повз стрім (дайджест)
+    entry_id: str | None
+    reminder_id: int
+    due_at: float
+    attempt: int
+    # Чат підписника спільного нагадування; None — чат самого нагадування
+    chat_id: int | None = None
+
+
+def _entry(entry_id: str, fields: dict) -> OutboxEntry:
+    chat_id = int(fields["c"]) if fields.get("c") else None
+    return OutboxEntry(entry_id, int(fields["r"]), float(fields["d"]), int(fields.get("a", 0)), chat_id)
+
+
+def _retry_member(entry: OutboxEntry, attempt: int) -> str:
+    member = f"{entry.reminder_id}:{int(entry.due_at)}:{attempt}"
+    return f"{member}:{entry.chat_id}" if entry.chat_id else member
+
+
+def retry_delay(attempt: int) -> int:
+    return min(2 ** attempt, RETRY_BACKOFF_MAX)
+
+
+class Outbox:
+    def __init__(self, redis_client: redis.Redis, group: str = OUTBOX_GROUP, wakeup_channel: str | None = None):
+        self.redis = redis_client
+        self.group = group
+        # Повтор, раніший за всі наявні, будить планувальники (scheduler.wakeup)
+        self.wakeup_channel = wakeup_channel
+        self._move_retries = self.redis.register_script(MOVE_RETRIES_SCRIPT)
+        self._zadd = self.redis.register_script(ZADD_NOTIFY_SCRIPT)
+
+    async def ensure_group(self):
+        # id 0: група бачить і записи, додані до її створення
+        try:
+            await self.redis.xgroup_create(OUTBOX_KEY, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def publish(self, occurrences: list[tuple[int, float]]):
+        """Кладе спрацювання в стрім поза індексом (пропущені при старті, ручна відправка)"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for reminder_id, due_at in occurrences:
+                pipe.xadd(OUTBOX_KEY, {"r": reminder_id, "d": int(due_at), "a": 0})
+            await pipe.execute()
+
+    async def publish_fanout(self, reminder_id: int, due_at: float, chat_ids: list[int]):
+        """Одне спрацювання спільного нагадування — по запису на кожного підписника"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for chat_id in chat_ids:
+                pipe.xadd(OUTBOX_KEY, {"r": reminder_id, "d": int(due_at), "a": 0, "c": chat_id})
+            await pipe.execute()
+
+    async def fanned_out(self, reminder_id: int, due_at: float) -> bool:
+        return bool(await self.redis.exists(FANOUT_KEY.format(reminder_id, int(due_at))))
+
+    async def mark_fanned_out(self, reminder_id: int, due_at: float):
+        await self.redis.set(FANOUT_KEY.format(reminder_id, int(due_at)), 1, ex=FANOUT_TTL)
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> list[OutboxEntry]:
+        response = await self.redis.xreadgroup(self.group, consumer, {OUTBOX_KEY: ">"}, count=count, block=block_ms)
+        return [_entry(entry_id, fields) for _, entries in response or [] for entry_id, fields in entries]
+
+    async def reclaim(self, consumer: str, min_idle: float, count: int) -> list[OutboxEntry]:
+        """Забирає записи, які інший (ймовірно, мертвий) воркер тримає довше за min_idle"""
+        _, entries, _ = await self.redis.xautoclaim(
+            OUTBOX_KEY, self.group, consumer, min_idle_time=int(min_idle * 1000), start_id="0-0", count=count
+        )
+        return [_entry(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def ack(self, entries: list[OutboxEntry]):
+        # Підтверджені записи одразу видаляються, тож XLEN — це реальний беклог
+        if not entries:
+            return
+        entry_ids = [entry.entry_id for entry in entries]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(OUTBOX_KEY, self.group, *entry_ids)
+            pipe.xdel(OUTBOX_KEY, *entry_ids)
+            await pipe.execute()
+
+    async def retry_later(self, retries: list[tuple[OutboxEntry, int, int]]):
+        """retries: (запис, наступна спроба, затримка в секундах)"""
+        if not retries:
+            return
+        now = time.time()
+        mapping = {_retry_member(entry, attempt): now + delay for entry, attempt, delay in retries}
+        await self._zadd(keys=[RETRY_KEY], args=zadd_args(self.wakeup_channel, mapping))
+
+    async def move_due_retries(self, now: float | None = None, limit: int = 1000) -> int:
+        return await self._move_retries(keys=[RETRY_KEY, OUTBOX_KEY], args=[now or time.time(), limit])
+
+    async def dead_letter(self, failures: list[tuple[OutboxEntry, int, str]]):
+        """failures: (запис, chat_id, опис помилки)"""
+        if not failures:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry, chat_id, error in failures:
+                pipe.xadd(
+                    DEAD_KEY,
+                    {"r": entry.reminder_id, "d": int(entry.due_at), "a": entry.attempt, "chat": chat_id, "error": error},
+                    maxlen=DEAD_MAXLEN,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    async def backlog(self) -> int:
+        return await self.redis.xlen(OUTBOX_KEY)
+
+    async def forget_consumer(self, consumer: str):
+        # Споживача з непідтвердженими записами не видаляємо — їх забере reclaim
+        pending = await self.redis.xpending_range(OUTBOX_KEY, self.group, min="-", max="+", count=1, consumername=consumer)
+        if not pending:
+            await self.redis.xgroup_delconsumer(OUTBOX_KEY, self.group, consumer)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import socket
+import time
+import uuid
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+WORKERS_KEY = "reminders:workers"
+LEASE_KEY = "reminders:lease:{}"
+
+# Продовжує або звільняє лізу, лише якщо вона досі належить цьому воркеру
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class PartitionLeaseManager:
+    """
+    Розподіляє партиції індексу між живими воркерами через Redis-лізи з heartbeat.
+    Кожен воркер тримає не більше ceil(partitions / live_workers) партицій;
+    лізи впалого воркера спливають за `lease_ttl` і їх підхоплюють інші.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        partitions: int,
+        lease_ttl: float = 15.0,
+        worker_id: str | None = None,
+    ):
+        self.redis = redis_client
+        self.partitions = partitions
+        self.lease_ttl = lease_ttl
+        self.worker_id = worker_id or default_worker_id()
+        self.owned: set[int] = set()
+        self._renew = self.redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_LEASE_SCRIPT)
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        await self.rebalance()
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for partition in list(self.owned):
+            await self._release(keys=[LEASE_KEY.format(partition)], args=[self.worker_id])
+        self.owned.clear()
+        await self.redis.zrem(WORKERS_KEY, self.worker_id)
+
+    def is_owned(self, partition: int) -> bool:
+        return partition in self.owned
+
+    async def _live_workers(self) -> int:
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(WORKERS_KEY, {self.worker_id: now})
+            pipe.zremrangebyscore(WORKERS_KEY, "-inf", now - self.lease_ttl)
+            pipe.zcard(WORKERS_KEY)
+            *_, live = await pipe.execute()
+        return max(live, 1)
+
+    async def rebalance(self):
+        fair_share = math.ceil(self.partitions / await self._live_workers())
+        ttl_ms = int(self.lease_ttl * 1000)
+
+        for partition in list(self.owned):
+            if not await self._renew(keys=[LEASE_KEY.format(partition)], args=[self.worker_id, ttl_ms]):
+                logger.warning("Lost lease on partition %d", partition)
+                self.owned.discard(partition)
+
+        # Віддаємо зайві партиції, щоб нові воркери отримали свою частку
+        while len(self.owned) > fair_share:
+            partition = self.owned.pop()
+            await self._release(keys=[LEASE_KEY.format(partition)], args=[self.worker_id])
+
+        if len(self.owned) < fair_share:
+            offset = random.randrange(self.partitions)
+            for i in range(self.partitions):
+                partition = (offset + i) % self.partitions
+                if partition in self.owned:
+                    continue
+                if await self.redis.set(LEASE_KEY.format(partition), self.worker_id, nx=True, px=ttl_ms):
+                    self.owned.add(partition)
+                    if len(self.owned) >= fair_share:
+                        break
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                await self.rebalance()
+            except Exception:
+                logger.exception("Failed to rebalance partitions")
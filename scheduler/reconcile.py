@@ -0,0 +1,181 @@
+"""
+Звірка таблиці reminders з індексом планувальника при старті.
+
+Обидва проходи потокові, тож пам'ять обмежена розміром чанка навіть на мільйоні
+нагадувань:
+
+1. БД -> індекс: активні нагадування читаються чанками за id (keyset), для кожного
+   чанка одним конвеєром ZMSCORE перевіряються записи в індексі; відсутні та з
+   неправильним часом додаються, пропущені за час простою обробляються за політикою.
+2. Індекс -> БД: партиції обходяться ZSCAN, записи, для яких немає активного
+   нагадування (видалені, деактивовані), прибираються.
+
+Політики пропущених спрацювань (старших за `misfire_grace` секунд):
+    coalesce — спрацювати один раз і перейти до наступного (за замовчуванням)
+    fire_all — відправити кожне пропущене спрацювання повторюваного нагадування
+               (не більше MISFIRE_MAX_OCCURRENCES на нагадування)
+    skip     — не відправляти: one-time деактивуються, повторювані переносяться далі
+"""
+import logging
+import time
+import uuid
+from db.models.models import Reminder, RepeatType, User
+from bot.utils.timezones import get_zone, now_epoch
+from scheduler.partitions import RELEASE_LEASE_SCRIPT
+from scheduler.scheduler import DUE_KEY, ReminderScheduler, next_occurrence
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOCK_KEY = "reminders:reconcile"
+RECONCILE_LOCK_TTL = 600
+MISFIRE_POLICIES = ("coalesce", "fire_all", "skip")
+MISFIRE_MAX_OCCURRENCES = 50
+# Лише те, що потрібно для звірки: розбір дат на мільйоні рядків коштує більше за сам запит
+CHUNK_FIELDS = ("id", "user_id", "fire_at", "repeat")
+
+
+class Reconciler:
+    def __init__(
+        self,
+        scheduler: ReminderScheduler,
+        chunk_size: int = 5000,
+        misfire_policy: str = "coalesce",
+        misfire_grace: float = 60.0,
+    ):
+        if misfire_policy not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy: {misfire_policy}")
+        self.scheduler = scheduler
+        self.redis = scheduler.redis
+        self.chunk_size = chunk_size
+        self.misfire_policy = misfire_policy
+        self.misfire_grace = misfire_grace
+        self._release_lock = self.redis.register_script(RELEASE_LEASE_SCRIPT)
+        self.stats = dict.fromkeys(("checked", "added", "fixed", "orphans", "missed", "late_fired", "skipped"), 0)
+
+    async def run(self) -> dict:
+        """Повертає лічильники і тривалість кожної фази; при зайнятому локу нічого не робить"""
+        token = uuid.uuid4().hex
+        if not await self.redis.set(RECONCILE_LOCK_KEY, token, nx=True, ex=RECONCILE_LOCK_TTL):
+            logger.info("Reconcile is already running on another worker, skipping")
+            return {"skipped": True}
+
+        timings = {}
+        try:
+            started = time.perf_counter()
+            await self._db_to_index()
+            timings["db_to_index_sec"] = round(time.perf_counter() - started, 3)
+
+            phase = time.perf_counter()
+            await self._index_to_db()
+            timings["index_to_db_sec"] = round(time.perf_counter() - phase, 3)
+            timings["total_sec"] = round(time.perf_counter() - started, 3)
+        finally:
+            await self._release_lock(keys=[RECONCILE_LOCK_KEY], args=[token])
+
+        report = {**self.stats, **timings}
+        logger.info("Reconciled scheduler index: %s", report)
+        return report
+
+    async def _db_to_index(self):
+        now = now_epoch()
+        last_id = 0
+        while True:
+            rows = await (
+                Reminder.filter(is_active=True, id__gt=last_id, fire_at__isnull=False)
+                .order_by("id")
+                .limit(self.chunk_size)
+                .values(*CHUNK_FIELDS)
+            )
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            self.stats["checked"] += len(rows)
+
+            missed = [row for row in rows if row["fire_at"] < now - self.misfire_grace]
+            if missed and self.misfire_policy != "coalesce":
+                handled = await self._handle_misfires(missed, now)
+                rows = [row for row in rows if row["id"] not in handled]
+            self.stats["missed"] += len(missed)
+            await self._sync_chunk(rows)
+
+    async def _sync_chunk(self, rows: list[dict]):
+        by_partition: dict[int, list[dict]] = {}
+        for row in rows:
+            by_partition.setdefault(row["user_id"] % self.scheduler.partitions, []).append(row)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for partition, partition_rows in by_partition.items():
+                pipe.zmscore(DUE_KEY.format(partition), [str(row["id"]) for row in partition_rows])
+            scores = await pipe.execute()
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for (partition, partition_rows), partition_scores in zip(by_partition.items(), scores):
+                mapping = {}
+                for row, score in zip(partition_rows, partition_scores):
+                    if score is None:
+                        self.stats["added"] += 1
+                    elif int(score) != row["fire_at"]:
+                        self.stats["fixed"] += 1
+                    else:
+                        continue
+                    mapping[str(row["id"])] = row["fire_at"]
+                if mapping:
+                    await self.scheduler.add_due(partition, mapping, pipe)
+            await pipe.execute()
+
+    async def _handle_misfires(self, rows: list[dict], now: int) -> set[int]:
+        """Застосовує політику до пропущених спрацювань; повертає id, які вже оброблено"""
+        once = [row for row in rows if row["repeat"] == RepeatType.NONE]
+        repeating = [row for row in rows if row["repeat"] != RepeatType.NONE]
+        handled = set()
+
+        if self.misfire_policy == "skip" and once:
+            # Записи в індексі прибере друга фаза як такі, що не мають активного нагадування
+            await Reminder.filter(id__in=[row["id"] for row in once]).update(is_active=False)
+            await self.scheduler.forget_counts(row["user_id"] for row in once)
+            self.stats["skipped"] += len(once)
+            handled.update(row["id"] for row in once)
+
+        if repeating:
+            # Повні моделі й часові пояси потрібні лише пропущеним повторюваним
+            reminders = await Reminder.filter(id__in=[row["id"] for row in repeating])
+            timezones = dict(await User.filter(id__in=list({r.user_id for r in reminders})).values_list("id", "timezone"))
+            if self.misfire_policy == "fire_all":
+                late = []
+                for reminder in reminders:
+                    late.extend(self._missed_occurrences(reminder, get_zone(timezones.get(reminder.user_id)), now))
+                if late:
+                    await self.scheduler.outbox.publish(late)
+                self.stats["late_fired"] += len(late)
+            else:
+                self.stats["skipped"] += len(reminders)
+            # Наступне спрацювання — вже після поточного моменту
+            await self.scheduler.reschedule_repeats(reminders, now, timezones)
+            handled.update(row["id"] for row in repeating)
+        return handled
+
+    @staticmethod
+    def _missed_occurrences(reminder: Reminder, tz, now: int) -> list[tuple[int, float]]:
+        # Найстаріші першими; ліміт тримає обхід коротким навіть після довгого простою
+        occurrences = []
+        fire_at = reminder.fire_at
+        while fire_at and fire_at <= now and len(occurrences) < MISFIRE_MAX_OCCURRENCES:
+            occurrences.append((reminder.id, float(fire_at)))
+            fire_at = next_occurrence(reminder, fire_at, tz)
+        return occurrences
+
+    async def _index_to_db(self):
+        for partition in range(self.scheduler.partitions):
+            key = DUE_KEY.format(partition)
+            cursor = 0
+            while True:
+                cursor, entries = await self.redis.zscan(key, cursor, count=self.chunk_size)
+                ids = [int(member) for member, _ in entries]
+                if ids:
+                    active = set(await Reminder.filter(id__in=ids, is_active=True).values_list("id", flat=True))
+                    orphans = [str(reminder_id) for reminder_id in ids if reminder_id not in active]
+                    if orphans:
+                        await self.redis.zrem(key, *orphans)
+                        self.stats["orphans"] += len(orphans)
+                if not cursor:
+                    break
@@ -0,0 +1,131 @@
+"""
+Повторення у стилі RRULE (RFC 5545), підмножина, потрібна нагадуванням:
+
+    FREQ=DAILY|WEEKLY|MONTHLY|YEARLY; INTERVAL=n; BYDAY=MO,TU,...; COUNT=n; UNTIL=...
+
+Правило не розгортається в розклад: планувальник зберігає лише наступне спрацювання,
+а після кожного спрацювання рахує наступне від якоря (remind_at) в настінному часі.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
+from db.models.models import RepeatType
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Готові варіанти з клавіатури та ключових слів; CUSTOM бере правило з reminder.recurrence
+PRESET_RULES = {
+    RepeatType.DAILY: "FREQ=DAILY",
+    RepeatType.WEEKLY: "FREQ=WEEKLY",
+    RepeatType.MONTHLY: "FREQ=MONTHLY",
+    RepeatType.YEARLY: "FREQ=YEARLY",
+    RepeatType.WEEKDAYS: "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+}
+
+
+class Recurrence(NamedTuple):
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    # aware (UTC) для UNTIL=...Z, інакше наївний настінний час користувача
+    until: Optional[datetime] = None
+
+
+def _parse_until(value: str) -> datetime:
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    if "T" in value:
+        return datetime.strptime(value, "%Y%m%dT%H%M%S")
+    # Дата без часу включає весь день
+    return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.max)
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(rule: str) -> Recurrence:
+    """Розбирає RRULE; ValueError для непідтримуваних або некоректних правил"""
+    parts = {}
+    for part in rule.upper().removeprefix("RRULE:").split(";"):
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid rule part: {part}")
+        parts[name] = value
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported FREQ: {freq}")
+    interval = int(parts.pop("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    byday = ()
+    if "BYDAY" in parts:
+        if freq not in ("DAILY", "WEEKLY"):
+            raise ValueError("BYDAY is supported only with DAILY or WEEKLY")
+        byday = tuple(sorted({WEEKDAY_CODES.index(code) for code in parts.pop("BYDAY").split(",")}))
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be positive")
+    until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    if parts:
+        raise ValueError(f"Unsupported rule parts: {', '.join(parts)}")
+    return Recurrence(freq, interval, byday, count, until)
+
+
+def recurrence_for(repeat: RepeatType, rule: str | None = None) -> Optional[Recurrence]:
+    if repeat == RepeatType.CUSTOM:
+        return parse_rule(rule) if rule else None
+    preset = PRESET_RULES.get(repeat)
+    return parse_rule(preset) if preset else None
+
+
+def _add_months(start: datetime, months: int) -> datetime:
+    # 31-ше в коротшому місяці стає останнім днем місяця, а не пропускається
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _matches_day(day: date, start: datetime, rec: Recurrence) -> bool:
+    if day.weekday() not in rec.byday:
+        return False
+    if rec.freq == "DAILY":
+        return (day - start.date()).days % rec.interval == 0
+    start_week = start.date() - timedelta(days=start.weekday())
+    return ((day - start_week).days // 7) % rec.interval == 0
+
+
+def iter_occurrences(start: datetime, rec: Recurrence, not_before: datetime) -> Iterator[datetime]:
+    """
+    Настінні часи спрацювань за зростанням, починаючи приблизно з `not_before`
+    (але не раніше за `start`). З COUNT перебір іде від самого `start`, щоб
+    рахувати номер спрацювання; кількість кроків тоді обмежена самим COUNT.
+    """
+    if rec.count:
+        not_before = start
+
+    if rec.byday:
+        day = max(start.date(), not_before.date())
+        while True:
+            if _matches_day(day, start, rec):
+                candidate = datetime.combine(day, start.time())
+                if candidate >= start:
+                    yield candidate
+            day += timedelta(days=1)
+
+    if rec.freq in ("DAILY", "WEEKLY"):
+        step = timedelta(days=rec.interval) if rec.freq == "DAILY" else timedelta(weeks=rec.interval)
+        steps = max((not_before - start) // step, 0)
+        while True:
+            yield start + step * steps
+            steps += 1
+
+    months = rec.interval * (12 if rec.freq == "YEARLY" else 1)
+    elapsed = (not_before.year - start.year) * 12 + not_before.month - start.month
+    steps = max(elapsed // months, 0)
+    while True:
+        yield _add_months(start, months * steps)
+        steps += 1
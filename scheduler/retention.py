@@ -0,0 +1,125 @@
+"""
+Перенесення старих неактивних нагадувань з reminders в архівну таблицю.
+
+Видалені, доставлені одноразові й завершені серії лишаються в reminders назавжди і з
+часом становлять більшість рядків. Задача раз на `interval` секунд переносить ті, що
+неактивні довше за `max_age_days` днів, у reminders_archive:
+
+- чанками по `batch_size` рядків, кожен у власній короткій транзакції, з паузою між
+  чанками, тож бот не чекає на довгі блокування навіть під час першого проходу;
+- кандидати шукаються частковим індексом по updated_at неактивних рядків;
+- одночасно працює лише один воркер (лок у Redis, як у звірки).
+
+Вік рахується від останньої зміни рядка і від останнього спрацювання (fire_at), тож
+одноразове нагадування, доставлене вчора, не потрапить в архів, навіть якщо його
+створили давно. Кнопки відкладення під повідомленнями заархівованих нагадувань
+відповідають "Нагадування не знайдено".
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import redis.asyncio as redis
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+from bot.utils.metrics import ARCHIVED_REMINDERS
+from db.models.models import ArchivedReminder, Reminder
+from scheduler.partitions import RELEASE_LEASE_SCRIPT, RENEW_LEASE_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_KEY = "reminders:retention"
+RETENTION_LOCK_TTL = 600
+ARCHIVE_FIELDS = ("id", "user_id", "chat_id", "text", "remind_at", "fire_at", "repeat", "recurrence", "created_at")
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_age_days: float,
+        batch_size: int = 1000,
+        interval: float = 3600.0,
+        pause: float = 0.1,
+    ):
+        self.redis = redis_client
+        self.max_age = timedelta(days=max_age_days)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._renew_lock = self.redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lock = self.redis.register_script(RELEASE_LEASE_SCRIPT)
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self, now: datetime | None = None) -> dict:
+        """Один повний прохід; при зайнятому локу нічого не робить"""
+        token = uuid.uuid4().hex
+        if not await self.redis.set(RETENTION_LOCK_KEY, token, nx=True, ex=RETENTION_LOCK_TTL):
+            logger.info("Retention is already running on another worker, skipping")
+            return {"skipped": True}
+
+        cutoff = (now or datetime.now(timezone.utc)) - self.max_age
+        archived = batches = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                moved, selected = await self.archive_batch(cutoff)
+                archived += moved
+                batches += 1
+                if selected < self.batch_size:
+                    break
+                # Прохід може тривати довше за TTL локу: продовжуємо, поки лок ще наш
+                if not await self._renew_lock(keys=[RETENTION_LOCK_KEY], args=[token, RETENTION_LOCK_TTL * 1000]):
+                    logger.warning("Retention lock was lost, stopping the pass")
+                    break
+                await asyncio.sleep(self.pause)
+        finally:
+            await self._release_lock(keys=[RETENTION_LOCK_KEY], args=[token])
+
+        report = {"archived": archived, "batches": batches, "total_sec": round(time.perf_counter() - started, 3)}
+        logger.info("Archived inactive reminders: %s", report)
+        return report
+
+    async def archive_batch(self, cutoff: datetime) -> tuple[int, int]:
+        """Переносить один чанк; повертає кількість перенесених і відібраних рядків"""
+        async with in_transaction() as connection:
+            rows = await (
+                Reminder.filter(
+                    Q(fire_at__isnull=True) | Q(fire_at__lt=int(cutoff.timestamp())),
+                    is_active=False,
+                    updated_at__lt=cutoff,
+                )
+                .using_db(connection)
+                .order_by("updated_at")
+                .limit(self.batch_size)
+                .values(*ARCHIVE_FIELDS)
+            )
+            if not rows:
+                return 0, 0
+            ids = [row["id"] for row in rows]
+            await ArchivedReminder.bulk_create([ArchivedReminder(**row) for row in rows], using_db=connection)
+            # Умова is_active повторюється: між вибіркою й видаленням рядок могли відновити відкладенням
+            deleted = await Reminder.filter(id__in=ids, is_active=False).using_db(connection).delete()
+            if deleted < len(ids):
+                restored = await Reminder.filter(id__in=ids).using_db(connection).values_list("id", flat=True)
+                await ArchivedReminder.filter(id__in=restored).using_db(connection).delete()
+        ARCHIVED_REMINDERS.inc(deleted)
+        return deleted, len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Failed to archive inactive reminders")
+            await asyncio.sleep(self.interval)
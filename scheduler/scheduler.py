@@ -1,82 +1,318 @@
-from datetime import datetime, timedelta
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.redis import RedisJobStore
-from aiogram import Bot
-from db.models.models import Reminder, RepeatType
-from tortoise import Tortoise
-from bot.utils.get_bot import get_bot   
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Iterable
+import redis.asyncio as redis
+from db.models.models import Reminder
+from bot.utils.metrics import DB_QUERY_LATENCY, OUTBOX_BACKLOG, PENDING_REMINDERS
+from bot.utils.timezones import get_zone, localize, to_epoch
+from scheduler.outbox import OUTBOX_KEY, RETRY_KEY, Outbox
+from scheduler.partitions import LEASE_KEY, PartitionLeaseManager
+from scheduler.recurrence import iter_occurrences, recurrence_for
+from scheduler.wakeup import WAKEUP_CHANNEL, ZADD_NOTIFY_SCRIPT, WakeupListener, zadd_args
 
-def singleton(cls):
-    instances = {}
-    
-    def get_instance(*args, **kwargs):
-        if cls not in instances:
-            instances[cls] = cls(*args, **kwargs)
-        return instances[cls]
-    
-    return get_instance
+logger = logging.getLogger(__name__)
 
+DUE_KEY = "reminders:due:{}"
+FIRED_KEY = "reminders:fired:{}:{}"
+FIRED_TTL = 2 * 24 * 3600
+COUNT_KEY = "reminders:count:{}"
+COUNT_TTL = 3600
+WAKEUP_MODES = ("poll", "pubsub")
+# Як часто оновлювати метрику розміру індексу (ZCARD по всіх партиціях)
+PENDING_REFRESH_INTERVAL = 15.0
 
+# Атомарно переносить з партиції в outbox усе, що настало, лише якщо воркер досі тримає її лізу
+CLAIM_DUE_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[3] then
+    return {}
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+    redis.call('XADD', KEYS[3], '*', 'r', due[i], 'd', due[i + 1], 'a', 0)
+end
+return due
+"""
 
+# Забирає з партиції вказані нагадування, що настануть не пізніше ARGV[1] (дайджест);
+# ZREM поруч із перевіркою, тож спрацювання, яке вже забрав планувальник, не дублюється
+PULL_DUE_SCRIPT = """
+local pulled = {}
+for i = 2, #ARGV do
+    local score = redis.call('ZSCORE', KEYS[1], ARGV[i])
+    if score and tonumber(score) <= tonumber(ARGV[1]) then
+        redis.call('ZREM', KEYS[1], ARGV[i])
+        table.insert(pulled, ARGV[i])
+        table.insert(pulled, score)
+    end
+end
+return pulled
+"""
 
+Occurrence = tuple[int, float]
+
+
+def _fired_key(reminder_id: int, due_at: float, chat_id: int | None = None) -> str:
+    key = FIRED_KEY.format(reminder_id, int(due_at))
+    return f"{key}:{chat_id}" if chat_id else key
+
+
+def next_occurrence(reminder: Reminder, after: int, tz: ZoneInfo) -> int | None:
+    """
+    UTC epoch наступного спрацювання строго після `after`, або None, якщо серія
+    скінчилась (UNTIL/COUNT) чи нагадування не повторюється.
+    Спрацювання рахуються в настінному часі користувача від remind_at, тож після
+    переходу на літній/зимовий час нагадування лишається о тій самій годині.
+    """
+    rec = recurrence_for(reminder.repeat, reminder.recurrence)
+    if rec is None or reminder.remind_at is None:
+        return None
+    start = reminder.remind_at.astimezone(tz).replace(tzinfo=None)
+    after_local = datetime.fromtimestamp(after, tz).replace(tzinfo=None)
+    for number, candidate in enumerate(iter_occurrences(start, rec, after_local), 1):
+        if rec.count and number > rec.count:
+            return None
+        fire_at = to_epoch(localize(candidate, tz))
+        if rec.until and (fire_at > to_epoch(rec.until) if rec.until.tzinfo else candidate > rec.until):
+            return None
+        if fire_at > after:
+            return fire_at
+
+
+def first_occurrence(reminder: Reminder, tz: ZoneInfo) -> int | None:
+    """Перше спрацювання нової серії: сам remind_at, якщо він підходить під правило"""
+    if recurrence_for(reminder.repeat, reminder.recurrence) is None:
+        return to_epoch(reminder.remind_at)
+    return next_occurrence(reminder, to_epoch(reminder.remind_at) - 1, tz)
+
+
+def upcoming_occurrence(reminder: Reminder, now: int, tz: ZoneInfo) -> int | None:
+    """
+    Перше спрацювання не раніше `now` — для рядків без fire_at зі старих версій схеми.
+    None, якщо всі спрацювання вже в минулому: такий рядок не пропущений, а завершений.
+    """
+    if reminder.remind_at is None:
+        return None
+    first = first_occurrence(reminder, tz)
+    if first is None or first >= now:
+        return first
+    return next_occurrence(reminder, now - 1, tz)
 
 
-@singleton
 class ReminderScheduler:
-    def __init__(self, jobstores=None):
-        if not hasattr(self, 'scheduler'):
-            self.scheduler = AsyncIOScheduler(jobstores=jobstores)
+    """
+    Індекс найближчих спрацювань у Redis ZSET (score = epoch) з одним таймером.
+    Для кожного нагадування зберігається лише наступне спрацювання.
+
+    Індекс розбитий на партиції за user_id; кожен воркер опитує лише партиції,
+    на які тримає лізу, тож кілька реплік не забирають одне нагадування двічі.
+
+    wakeup="poll" — індекс опитується раз на `poll_interval`; wakeup="pubsub" — таймер
+    зводиться на найближче спрацювання своїх партицій і перезводиться повідомленням
+    про раніше спрацювання з будь-якого процесу (scheduler.wakeup), а `poll_interval`
+    лише обмежує найдовший сон.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        poll_interval: float = 1.0,
+        batch_size: int = 1000,
+        partitions: int = 16,
+        lease_ttl: float = 15.0,
+        worker_id: str | None = None,
+        wakeup: str = "poll",
+    ):
+        if wakeup not in WAKEUP_MODES:
+            raise ValueError(f"Unknown wakeup mode: {wakeup}")
+        self.redis = redis_client
+        # Канал, куди вставки в індекс повідомляють про раніше спрацювання
+        self.channel = WAKEUP_CHANNEL if wakeup == "pubsub" else None
+        # Спрацювання, що настали, переносяться в outbox, звідки їх читає DeliveryService
+        self.outbox = Outbox(redis_client, wakeup_channel=self.channel)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.partitions = partitions
+        self.leases = PartitionLeaseManager(redis_client, partitions, lease_ttl, worker_id)
+        self._claim_due = self.redis.register_script(CLAIM_DUE_SCRIPT)
+        self._pull_due = self.redis.register_script(PULL_DUE_SCRIPT)
+        self._zadd = self.redis.register_script(ZADD_NOTIFY_SCRIPT)
+        self.wakeups = WakeupListener(redis_client, self._is_watched) if self.channel else None
+        self._task: asyncio.Task | None = None
 
     async def start(self):
-        return self.scheduler.start()
-        # При запуске не нужно вручную планировать задачи,
-        # так как APScheduler автоматически восстановит их из Redis
+        await self.leases.start()
+        if self.wakeups:
+            await self.wakeups.start()
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.wakeups:
+            await self.wakeups.shutdown()
+        await self.leases.shutdown()
+
+    def partition_for(self, reminder: Reminder) -> int:
+        return reminder.user_id % self.partitions
 
     async def schedule_reminder(self, reminder: Reminder):
-        job_id = f"reminder_{reminder.id}"
-        
-        # Schedule the initial notification
-        self.scheduler.add_job(
-            send_reminder,
-            'date',
-            run_date=reminder.remind_at,
-            args=[reminder.id],
-            id=job_id
-        )
+        await self.schedule_many([reminder])
 
-        # If reminder is repeating, schedule the next occurrence
-        if reminder.repeat != RepeatType.NONE:
-            self._schedule_repeat(reminder)
-
-    def _schedule_repeat(self, reminder: Reminder):
-        job_id = f"reminder_{reminder.id}_repeat"
-        
-        if reminder.repeat == RepeatType.DAILY:
-            trigger = CronTrigger(hour=reminder.remind_at.hour, minute=reminder.remind_at.minute)
-        elif reminder.repeat == RepeatType.WEEKLY:
-            trigger = CronTrigger(
-                day_of_week=reminder.remind_at.strftime('%a').lower(),
-                hour=reminder.remind_at.hour,
-                minute=reminder.remind_at.minute
-            )
-        else:
+    async def schedule_many(self, reminders: Iterable[Reminder]):
+        mappings: dict[int, dict[str, float]] = {}
+        for reminder in reminders:
+            if reminder.fire_at:
+                mappings.setdefault(self.partition_for(reminder), {})[str(reminder.id)] = reminder.fire_at
+        if not mappings:
             return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for partition, mapping in mappings.items():
+                await self.add_due(partition, mapping, pipe)
+            await pipe.execute()
 
-        self.scheduler.add_job(
-            send_reminder,
-            trigger=trigger,
-            args=[reminder.id],
-            id=job_id
+    async def schedule_at(self, reminder_id: int, user_id: int, fire_at: int):
+        """Одна мутація індексу без завантаження нагадування (відкладення з кнопки)"""
+        await self.add_due(user_id % self.partitions, {str(reminder_id): fire_at})
+
+    async def add_due(self, partition: int, mapping: dict[str, float], client=None):
+        """ZADD у партицію; у режимі pubsub скрипт будить воркерів, якщо спрацювання раніше за наявні"""
+        await self._zadd(keys=[DUE_KEY.format(partition)], args=zadd_args(self.channel, mapping), client=client)
+
+    async def reschedule_repeats(
+        self, reminders: Iterable[Reminder], after: int | dict[int, int], timezones: dict[int, str | None]
+    ):
+        """
+        Переносить повторювані нагадування на наступне спрацювання строго після `after`
+        (в БД та індексі); нагадування з вичерпаною серією деактивуються.
+        `after` — спільний момент або reminder_id -> момент для кожного нагадування.
+        `timezones` — часові пояси власників: user_id -> назва зони.
+        """
+        moved, finished = [], []
+        for reminder in reminders:
+            since = after[reminder.id] if isinstance(after, dict) else after
+            fire_at = next_occurrence(reminder, since, get_zone(timezones.get(reminder.user_id)))
+            if fire_at:
+                reminder.fire_at = fire_at
+                moved.append(reminder)
+            else:
+                finished.append(reminder)
+        if finished:
+            # Серія вичерпана (UNTIL/COUNT) — нагадування більше не активне
+            await Reminder.filter(id__in=[reminder.id for reminder in finished]).update(is_active=False)
+            await self.forget_counts(reminder.user_id for reminder in finished)
+        if moved:
+            with DB_QUERY_LATENCY.labels("reschedule_repeats").time():
+                await Reminder.bulk_update(moved, fields=["fire_at"])
+            await self.schedule_many(moved)
+
+    async def remove_reminder(self, reminder: Reminder):
+        await self.redis.zrem(DUE_KEY.format(self.partition_for(reminder)), str(reminder.id))
+
+    async def pending_count(self) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for partition in range(self.partitions):
+                pipe.zcard(DUE_KEY.format(partition))
+            return sum(await pipe.execute())
+
+    async def active_count(self, user_id: int) -> int:
+        """Кількість активних нагадувань користувача, кешована в Redis до наступної зміни"""
+        cached = await self.redis.get(COUNT_KEY.format(user_id))
+        if cached is not None:
+            return int(cached)
+        with DB_QUERY_LATENCY.labels("active_count").time():
+            count = await Reminder.filter(user_id=user_id, is_active=True).count()
+        await self.redis.set(COUNT_KEY.format(user_id), count, ex=COUNT_TTL)
+        return count
+
+    async def forget_counts(self, user_ids: Iterable[int]):
+        keys = [COUNT_KEY.format(user_id) for user_id in set(user_ids)]
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def claim_due(self, now: float | None = None) -> list[Occurrence]:
+        now = now or time.time()
+        claimed: list[Occurrence] = []
+        for partition in list(self.leases.owned):
+            due = await self._claim_due(
+                keys=[DUE_KEY.format(partition), LEASE_KEY.format(partition), OUTBOX_KEY],
+                args=[now, self.batch_size, self.leases.worker_id],
+            )
+            claimed.extend((int(due[i]), float(due[i + 1])) for i in range(0, len(due), 2))
+        return claimed
+
+    async def pull_due(self, user_id: int, reminder_ids: list[int], until: float) -> list[Occurrence]:
+        """Достроково забирає з індексу спрацювання нагадувань користувача до `until`"""
+        if not reminder_ids:
+            return []
+        pulled = await self._pull_due(
+            keys=[DUE_KEY.format(user_id % self.partitions)], args=[until, *map(str, reminder_ids)]
         )
+        return [(int(pulled[i]), float(pulled[i + 1])) for i in range(0, len(pulled), 2)]
+
+    async def next_due(self) -> float:
+        """Найближче спрацювання у своїх партиціях і черзі повторів; inf — нічого немає"""
+        keys = [DUE_KEY.format(partition) for partition in self.leases.owned] + [RETRY_KEY]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.zrange(key, 0, 0, withscores=True)
+            heads = await pipe.execute()
+        return min((head[0][1] for head in heads if head), default=math.inf)
 
-    
+    def _is_watched(self, key: str) -> bool:
+        return key == RETRY_KEY or key in {DUE_KEY.format(partition) for partition in self.leases.owned}
+
+    async def _sleep(self):
+        if not self.wakeups:
+            await asyncio.sleep(self.poll_interval)
+            return
+        # Зводимо до читання індексу: вставка між читанням і сном теж розбудить
+        self.wakeups.arm()
+        deadline = time.time() + self.poll_interval
+        try:
+            deadline = min(deadline, await self.next_due())
+        except Exception:
+            logger.exception("Failed to read the next due time")
+        await self.wakeups.wait(deadline)
+
+    async def already_fired(self, occurrences: list[tuple]) -> list[bool]:
+        """
+        Ключ ідемпотентності на (reminder_id, occurrence) ставиться після відправки,
+        тож повторно видане спрацювання (reclaim після падіння) не відправляється вдруге.
+        Третій елемент — чат підписника: у кожного з них свій ключ.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for occurrence in occurrences:
+                pipe.exists(_fired_key(*occurrence))
+            return [bool(result) for result in await pipe.execute()]
+
+    async def mark_fired(self, occurrences: list[tuple]):
+        if not occurrences:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for occurrence in occurrences:
+                pipe.set(_fired_key(*occurrence), self.leases.worker_id, ex=FIRED_TTL)
+            await pipe.execute()
 
-    async def remove_reminder(self, reminder_id: int):
-        job_id = f"reminder_{reminder_id}"
-        repeat_job_id = f"reminder_{reminder_id}_repeat"
-        
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
-        if self.scheduler.get_job(repeat_job_id):
-            self.scheduler.remove_job(repeat_job_id) 
\ No newline at end of file
+    async def _run(self):
+        pending_refreshed = 0.0
+        while True:
+            try:
+                if time.monotonic() - pending_refreshed >= PENDING_REFRESH_INTERVAL:
+                    PENDING_REMINDERS.set(await self.pending_count())
+                    OUTBOX_BACKLOG.set(await self.outbox.backlog())
+                    pending_refreshed = time.monotonic()
+                await self.outbox.move_due_retries()
+                due = await self.claim_due()
+            except Exception:
+                logger.exception("Failed to poll due reminders")
+                due = []
+            # Повний батч означає, що є ще прострочені нагадування — забираємо одразу
+            if len(due) < self.batch_size:
+                await self._sleep()
@@ -0,0 +1,113 @@
+"""
+Пробудження планувальника через Redis pub/sub замість частого опитування.
+
+Кожна вставка в індекс спрацювань (і в чергу повторів outbox) іде Lua-скриптом, який
+публікує в WAKEUP_CHANNEL "<ключ> <score>", якщо вставка зробила найближче
+спрацювання в цьому ключі ранішим. Воркер тримає один таймер на найближче
+спрацювання своїх партицій і перезводить його, щойно приходить повідомлення про раніше
+спрацювання, тож нагадування, створене в іншому процесі за секунду до часу, забирається
+вчасно без опитування раз на кілька мілісекунд.
+
+Повідомлення pub/sub можуть загубитися (перепідключення), тому таймер ніколи не спить
+довше за poll_interval планувальника — це страховка, а не основний механізм.
+Keyspace notifications не використовуються: вони вимагають notify-keyspace-events у
+конфігурації сервера і не кажуть, чи змінилось саме найближче спрацювання.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Callable
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_CHANNEL = "reminders:wakeup"
+RESUBSCRIBE_DELAY = 1.0
+
+# ZADD пар ARGV[2..] (score, member) у KEYS[1], відсортованих за score; ARGV[1] — канал
+# ('' — не публікувати). Публікує, лише якщо вставка раніша за найближче, що було в ключі
+ZADD_NOTIFY_SCRIPT = """
+local before = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')[2]
+for i = 2, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if ARGV[1] ~= '' and #ARGV > 1 and (not before or tonumber(ARGV[2]) < tonumber(before)) then
+    redis.call('PUBLISH', ARGV[1], KEYS[1] .. ' ' .. ARGV[2])
+end
+return 0
+"""
+
+
+def zadd_args(channel: str | None, mapping: dict[str, float]) -> list:
+    """Аргументи ZADD_NOTIFY_SCRIPT; найменший score першим, його й публікує скрипт"""
+    args: list = [channel or ""]
+    for member, score in sorted(mapping.items(), key=lambda item: item[1]):
+        args += [score, member]
+    return args
+
+
+class WakeupListener:
+    """
+    Підписка на WAKEUP_CHANNEL для одного воркера.
+
+    Цикл планувальника викликає `arm()` перед тим, як читати найближче спрацювання, і
+    `wait(deadline)` після: повідомлення, що прийшло між ними, теж будить таймер, тож
+    вставка не губиться в проміжку між читанням індексу і сном.
+    """
+
+    def __init__(self, redis_client: redis.Redis, is_relevant: Callable[[str], bool]):
+        self.redis = redis_client
+        self.is_relevant = is_relevant
+        self.deadline = math.inf
+        self.wakeups = 0
+        self._event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def arm(self):
+        self._event.clear()
+        self.deadline = math.inf
+
+    async def wait(self, deadline: float):
+        """Спить до `deadline` (epoch) або до повідомлення про раніше спрацювання"""
+        self.deadline = deadline
+        timeout = deadline - time.time()
+        if timeout <= 0 or self._event.is_set():
+            return
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _on_message(self, data: str):
+        key, _, score = data.rpartition(" ")
+        if self.is_relevant(key) and float(score) < self.deadline:
+            self.wakeups += 1
+            self._event.set()
+
+    async def _run(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(WAKEUP_CHANNEL)
+                # Поки підписки не було, повідомлення могли загубитися — перечитуємо індекс
+                self._event.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Wakeup subscription failed, resubscribing")
+                await asyncio.sleep(RESUBSCRIBE_DELAY)
+            finally:
+                await pubsub.aclose()
@@ -0,0 +1,92 @@
+from datetime import date, datetime
+import pytest
+from bot.utils.date_parser import TOKEN_RE, parse_date, parse_datetime, parse_reminder_text, parse_time, tokenize_phrase
+from db.models.models import RepeatType
+
+# Середа
+NOW = datetime(2025, 4, 9, 8, 0)
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("2025-05-01", "iso"),
+    ("09.04.2025", "dotted"),
+    ("9:05", "clock"),
+    ("23:59", "clock"),
+    ("date#09.04.2025 ", "sdate"),
+    ("time#23:00", "stime"),
+    ("repeat#daily", "srepeat"),
+    ("repeat#FREQ=WEEKLY;BYDAY=MO,WE", "srepeat"),
+    ("кожні 3 дні", "every"),
+    ("завтра", "word"),
+    ("без  повторення", "word"),
+    ("п’ятницю", "word"),
+])
+def test_token_re_formats(text, kind):
+    match = TOKEN_RE.fullmatch(text)
+    assert match and match.lastgroup == kind
+
+
+@pytest.mark.parametrize("text", ["ПІСЛЯЗАВТРА", "позавчора"])
+def test_token_re_matches_longest_keyword(text):
+    assert [m.group() for m in TOKEN_RE.finditer(text)] == [text]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2025-05-01", date(2025, 5, 1)),
+    ("01.05.2025", date(2025, 5, 1)),
+    ("сьогодні", date(2025, 4, 9)),
+    ("завтра", date(2025, 4, 10)),
+    ("післязавтра", date(2025, 4, 11)),
+    ("вчора", date(2025, 4, 8)),
+    ("позавчора", date(2025, 4, 7)),
+    ("понеділок", date(2025, 4, 14)),
+    ("в середу", date(2025, 4, 16)),
+    ("у п'ятницю", date(2025, 4, 11)),
+    ("неділя", date(2025, 4, 13)),
+    ("до четверга", date(2025, 4, 10)),
+    ("31.02.2025", None),
+    ("колись", None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text, now=NOW) == expected
+
+
+@pytest.mark.parametrize("text", ["серед друзів", "середовище", "о четвертій", "четвертий тиждень", "завтрашній"])
+def test_weekday_stems_inside_other_words_are_not_dates(text):
+    assert parse_date(text, now=NOW) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10:00", (10, 0)),
+    ("о 7:45", (7, 45)),
+    ("полудень", (12, 0)),
+    ("опівночі", (0, 0)),
+    ("о півночі", (0, 0)),
+    ("25:00", None),
+])
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+def test_parse_datetime_defaults_to_current_time():
+    assert parse_datetime("  Завтра  ", now=NOW) == datetime(2025, 4, 10, 8, 0)
+    assert parse_datetime("завтра о 15:30", now=NOW) == datetime(2025, 4, 10, 15, 30)
+
+
+def test_phrase_cache_is_keyed_on_normalized_text():
+    assert tokenize_phrase("Завтра   о 10:00") is tokenize_phrase("завтра о 10:00")
+
+
+@pytest.mark.parametrize("text, remind_at, repeat, rule, cleaned", [
+    ("Купити молоко завтра о 15:00", datetime(2025, 4, 10, 15, 0), None, None, "Купити молоко завтра о 15:00"),
+    ("date#09.04.2025 time#23:00 repeat#daily Полити квіти", datetime(2025, 4, 9, 23, 0), RepeatType.DAILY, None,
+     "Полити квіти"),
+    ("Оплатити 01.07.2025 12:00 щомісяця", datetime(2025, 7, 1, 12, 0), RepeatType.MONTHLY, None,
+     "Оплатити 01.07.2025 12:00 щомісяця"),
+    ("Полив кожні 3 дні 2025-04-10 о 9:00", datetime(2025, 4, 10, 9, 0), RepeatType.CUSTOM, "FREQ=DAILY;INTERVAL=3",
+     "Полив кожні 3 дні 2025-04-10 о 9:00"),
+    ("Без дати", None, None, None, "Без дати"),
+])
+def test_parse_reminder_text(text, remind_at, repeat, rule, cleaned):
+    parsed = parse_reminder_text(text, now=NOW)
+    assert (parsed["remind_at"], parsed["repeat"], parsed["rule"], parsed["text"]) == (remind_at, repeat, rule, cleaned)
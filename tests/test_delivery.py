@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+for name, value in {"REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DB": "0", "BOT_TOKEN": "42:test"}.items():
+    os.environ.setdefault(name, value)
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from fakeredis import aioredis as fakeredis
+from benchmarks.fake_bot_api import FakeBotAPI, serve
+from bot.utils.delivery import DeliveryService
+from db.database import init_db, close_db
+from db.models.models import Reminder, RepeatType, User
+from scheduler.scheduler import DUE_KEY, ReminderScheduler
+
+CHAT_ID = 1001
+DAY = 24 * 3600
+
+
+@asynccontextmanager
+async def delivery_env(digest: bool = False):
+    """SQLite у пам'яті, fakeredis і заглушка Bot API; воркери не запускаються — батчі ведуть тести"""
+    await init_db("sqlite://:memory:")
+    api = FakeBotAPI()
+    runner, port = await serve(api.app())
+    bot = Bot("42:test", session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}")))
+    scheduler = ReminderScheduler(fakeredis.FakeRedis(decode_responses=True), partitions=1)
+    delivery = DeliveryService(bot, scheduler, global_rate=1000, chat_rate=1000)
+    await delivery.outbox.ensure_group()
+    await scheduler.leases.rebalance()
+    await User.create(id=1, telegram_id=CHAT_ID, timezone="UTC", digest=digest)
+    try:
+        yield api, scheduler, delivery
+    finally:
+        await bot.session.close()
+        await runner.cleanup()
+        await close_db()
+
+
+async def create_reminder(scheduler: ReminderScheduler, fire_at: int, repeat=RepeatType.NONE) -> Reminder:
+    reminder = await Reminder.create(
+        user_id=1,
+        chat_id=CHAT_ID,
+        text=f"{repeat.value} {fire_at}",
+        remind_at=datetime.fromtimestamp(fire_at, timezone.utc),
+        fire_at=fire_at,
+        repeat=repeat,
+    )
+    await scheduler.schedule_reminder(reminder)
+    return reminder
+
+
+async def index_score(scheduler: ReminderScheduler, reminder: Reminder) -> float | None:
+    return await scheduler.redis.zscore(DUE_KEY.format(0), str(reminder.id))
+
+
+def test_digest_pulled_repeat_moves_past_pulled_occurrence():
+    async def scenario():
+        async with delivery_env(digest=True) as (api, scheduler, delivery):
+            now = int(time.time())
+            await create_reminder(scheduler, now - 1)
+            daily = await create_reminder(scheduler, now + 20, RepeatType.DAILY)
+
+            await scheduler.claim_due()
+            await delivery._deliver_batch(await delivery.outbox.read("test", 10, block_ms=None))
+
+            assert len(api.sent) == 1 and "(2)" in api.sent[0][1]
+            await daily.refresh_from_db()
+            assert daily.fire_at == now + 20 + DAY
+            assert await index_score(scheduler, daily) == now + 20 + DAY
+
+    asyncio.run(scenario())
+
+
+def test_claim_deliver_ack_reschedule():
+    async def scenario():
+        async with delivery_env() as (api, scheduler, delivery):
+            due = int(time.time()) - 1
+            daily = await create_reminder(scheduler, due, RepeatType.DAILY)
+
+            assert await scheduler.claim_due() == [(daily.id, due)]
+            await delivery._deliver_batch(await delivery.outbox.read("test", 10, block_ms=None))
+
+            assert [(chat_id, text) for chat_id, text, _ in api.sent] == [(CHAT_ID, f"⏰ Reminder: {daily.text}")]
+            assert await delivery.outbox.backlog() == 0
+            await daily.refresh_from_db()
+            assert daily.fire_at == due + DAY
+            assert await index_score(scheduler, daily) == due + DAY
+            assert await scheduler.already_fired([(daily.id, due)]) == [True]
+
+    asyncio.run(scenario())
+
+
+def test_reclaimed_entry_is_delivered_once():
+    async def scenario():
+        async with delivery_env() as (api, scheduler, delivery):
+            due = int(time.time()) - 1
+            daily = await create_reminder(scheduler, due, RepeatType.DAILY)
+            await scheduler.claim_due()
+            # Воркер прочитав запис і впав, не підтвердивши його
+            assert len(await delivery.outbox.read("dead", 10, block_ms=None)) == 1
+
+            await delivery._deliver_batch(await delivery.outbox.reclaim("test", 0, 10))
+            # Те саме спрацювання ще раз (напр. звірка при старті) вже не відправляється і не переноситься вдруге
+            await delivery.outbox.publish([(daily.id, due)])
+            await delivery._deliver_batch(await delivery.outbox.read("test", 10, block_ms=None))
+
+            assert len(api.sent) == 1
+            assert await delivery.outbox.backlog() == 0
+            await daily.refresh_from_db()
+            assert daily.fire_at == due + DAY
+            assert await index_score(scheduler, daily) == due + DAY
+
+    asyncio.run(scenario())
+
+
+def test_fired_but_not_rescheduled_repeat_is_moved():
+    async def scenario():
+        async with delivery_env() as (api, scheduler, delivery):
+            due = int(time.time()) - 1
+            daily = await create_reminder(scheduler, due, RepeatType.DAILY)
+            await scheduler.claim_due()
+            # Падіння після ключа fired, але до перенесення: в індексі нагадування вже немає
+            await delivery.outbox.read("dead", 10, block_ms=None)
+            await scheduler.mark_fired([(daily.id, due)])
+            assert await index_score(scheduler, daily) is None
+
+            await delivery._deliver_batch(await delivery.outbox.reclaim("test", 0, 10))
+
+            assert api.sent == []
+            assert await delivery.outbox.backlog() == 0
+            await daily.refresh_from_db()
+            assert daily.fire_at == due + DAY
+            assert await index_score(scheduler, daily) == due + DAY
+
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from db.models.models import Reminder, RepeatType
+from scheduler.recurrence import parse_rule
+from scheduler.scheduler import first_occurrence, next_occurrence
+
+KYIV = ZoneInfo("Europe/Kyiv")
+
+
+def reminder(start: datetime, repeat: RepeatType, rule: str | None = None) -> Reminder:
+    return Reminder(text="x", remind_at=start.replace(tzinfo=KYIV), repeat=repeat, recurrence=rule)
+
+
+def local(epoch: int | None) -> datetime | None:
+    return datetime.fromtimestamp(epoch, KYIV).replace(tzinfo=None) if epoch is not None else None
+
+
+def series(item: Reminder, count: int) -> list[datetime | None]:
+    """Перші `count` спрацювань у настінному часі Києва"""
+    fire_at = first_occurrence(item, KYIV)
+    result = [local(fire_at)]
+    while len(result) < count and fire_at is not None:
+        fire_at = next_occurrence(item, fire_at, KYIV)
+        result.append(local(fire_at))
+    return result
+
+
+@pytest.mark.parametrize("start", [datetime(2025, 3, 29, 9, 0), datetime(2025, 10, 25, 9, 0)])
+def test_daily_keeps_local_hour_across_dst(start):
+    item = reminder(start, RepeatType.DAILY)
+    fires = series(item, 3)
+    assert [fire.hour for fire in fires] == [9, 9, 9]
+    first, second = first_occurrence(item, KYIV), next_occurrence(item, first_occurrence(item, KYIV), KYIV)
+    # Перехід на літній час вкорочує добу на годину, на зимовий — подовжує
+    assert second - first == (23 if start.month == 3 else 25) * 3600
+
+
+def test_nonexistent_local_time_shifts_forward():
+    item = reminder(datetime(2025, 3, 29, 3, 30), RepeatType.DAILY)
+    assert series(item, 3) == [datetime(2025, 3, 29, 3, 30), datetime(2025, 3, 30, 4, 30), datetime(2025, 3, 31, 3, 30)]
+
+
+def test_ambiguous_local_time_takes_first():
+    item = reminder(datetime(2025, 10, 25, 3, 30), RepeatType.DAILY)
+    fire_at = next_occurrence(item, first_occurrence(item, KYIV), KYIV)
+    assert datetime.fromtimestamp(fire_at, timezone.utc) == datetime(2025, 10, 26, 0, 30, tzinfo=timezone.utc)
+
+
+def test_monthly_from_31st_clamps_to_month_end():
+    item = reminder(datetime(2025, 1, 31, 10, 0), RepeatType.MONTHLY)
+    assert [fire.date().isoformat() for fire in series(item, 5)] == [
+        "2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31",
+    ]
+
+
+def test_yearly_from_leap_day():
+    item = reminder(datetime(2024, 2, 29, 10, 0), RepeatType.YEARLY)
+    assert [fire.date().isoformat() for fire in series(item, 3)] == ["2024-02-29", "2025-02-28", "2026-02-28"]
+
+
+def test_weekdays_skip_weekend():
+    # П'ятниця
+    item = reminder(datetime(2025, 4, 11, 8, 0), RepeatType.WEEKDAYS)
+    assert [fire.strftime("%a %d") for fire in series(item, 3)] == ["Fri 11", "Mon 14", "Tue 15"]
+    saturday = int(datetime(2025, 4, 12, 12, 0, tzinfo=KYIV).timestamp())
+    assert local(next_occurrence(item, saturday, KYIV)) == datetime(2025, 4, 14, 8, 0)
+
+
+def test_count_ends_series():
+    item = reminder(datetime(2025, 4, 1, 9, 0), RepeatType.CUSTOM, "FREQ=DAILY;INTERVAL=2;COUNT=3")
+    assert series(item, 5) == [datetime(2025, 4, 1, 9, 0), datetime(2025, 4, 3, 9, 0), datetime(2025, 4, 5, 9, 0), None]
+
+
+def test_count_with_byday_counts_matching_days_only():
+    # Вівторок; BYDAY=MO,WE: перше спрацювання — середа
+    item = reminder(datetime(2025, 4, 1, 9, 0), RepeatType.CUSTOM, "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3")
+    assert series(item, 5) == [datetime(2025, 4, 2, 9, 0), datetime(2025, 4, 7, 9, 0), datetime(2025, 4, 9, 9, 0), None]
+
+
+@pytest.mark.parametrize("until, last", [
+    # Дата без часу включає весь день
+    ("20250403", datetime(2025, 4, 3, 9, 0)),
+    ("20250403T085959", datetime(2025, 4, 2, 9, 0)),
+    # 06:00 UTC = 09:00 за Києвом
+    ("20250403T060000Z", datetime(2025, 4, 3, 9, 0)),
+])
+def test_until_ends_series(until, last):
+    item = reminder(datetime(2025, 4, 1, 9, 0), RepeatType.CUSTOM, f"FREQ=DAILY;UNTIL={until}")
+    fires = series(item, 10)
+    assert fires[-1] is None and fires[-2] == last
+
+
+def test_first_occurrence_moves_to_matching_byday():
+    # Вівторок: найближча середа того ж тижня
+    item = reminder(datetime(2025, 4, 1, 9, 0), RepeatType.CUSTOM, "FREQ=WEEKLY;BYDAY=WE")
+    assert first_occurrence(item, KYIV) == int(datetime(2025, 4, 2, 9, 0, tzinfo=KYIV).timestamp())
+
+
+def test_first_occurrence_with_byday_and_interval_counts_weeks_from_monday():
+    # Неділя 6.04 належить тижню з 31.03 (WKST=MO), тож тиждень з 7.04 пропускається
+    item = reminder(datetime(2025, 4, 6, 9, 0), RepeatType.CUSTOM, "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH")
+    assert series(item, 4) == [
+        datetime(2025, 4, 15, 9, 0), datetime(2025, 4, 17, 9, 0), datetime(2025, 4, 29, 9, 0), datetime(2025, 5, 1, 9, 0),
+    ]
+
+
+def test_one_time_reminder_has_no_next_occurrence():
+    item = reminder(datetime(2025, 4, 1, 9, 0), RepeatType.NONE)
+    assert series(item, 2) == [datetime(2025, 4, 1, 9, 0), None]
+
+
+@pytest.mark.parametrize("rule", ["FREQ=HOURLY", "FREQ=DAILY;INTERVAL=0", "FREQ=MONTHLY;BYDAY=MO", "FREQ=DAILY;COUNT=0",
+                                  "FREQ=DAILY;BYSETPOS=1", "FREQ"])
+def test_parse_rule_rejects_unsupported(rule):
+    with pytest.raises(ValueError):
+        parse_rule(rule)
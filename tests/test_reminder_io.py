@@ -0,0 +1,49 @@
+import io
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from bot.utils.reminder_io import _ics_event, _vtimezone, is_utf8, iter_ics
+from db.models.models import RepeatType
+
+KYIV = ZoneInfo("Europe/Kyiv")
+
+
+def test_vtimezone_describes_dst_rules():
+    lines = _vtimezone(KYIV, 2026)
+    assert lines[:2] == ["BEGIN:VTIMEZONE", "TZID:Europe/Kyiv"]
+    daylight = lines[lines.index("BEGIN:DAYLIGHT"):lines.index("END:DAYLIGHT")]
+    standard = lines[lines.index("BEGIN:STANDARD"):lines.index("END:STANDARD")]
+    assert daylight[1:5] == [
+        "DTSTART:19700329T030000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU", "TZOFFSETFROM:+0200", "TZOFFSETTO:+0300",
+    ]
+    assert standard[1:5] == [
+        "DTSTART:19701025T040000", "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU", "TZOFFSETFROM:+0300", "TZOFFSETTO:+0200",
+    ]
+
+
+def test_vtimezone_without_dst():
+    lines = _vtimezone(ZoneInfo("Asia/Kolkata"), 2026)
+    assert "BEGIN:DAYLIGHT" not in lines
+    assert "TZOFFSETFROM:+0530" in lines and "TZOFFSETTO:+0530" in lines
+
+
+def test_exported_series_imports_back():
+    remind_at = datetime(2026, 3, 2, 9, 0, tzinfo=KYIV)
+    row = {
+        "id": 1, "text": "Стендап, щодня", "remind_at": remind_at, "fire_at": None,
+        "repeat": RepeatType.WEEKDAYS, "recurrence": None,
+    }
+    calendar = (
+        "BEGIN:VCALENDAR\r\n" + "".join(f"{line}\r\n" for line in _vtimezone(KYIV, 2026))
+        + _ics_event(row, KYIV, "20260101T000000Z") + "END:VCALENDAR\r\n"
+    )
+    assert "DTSTART;TZID=Europe/Kyiv:20260302T090000" in calendar
+    [imported] = iter_ics(io.StringIO(calendar), ZoneInfo("UTC"))
+    assert (imported.text, imported.remind_at, imported.repeat) == ("Стендап, щодня", remind_at, RepeatType.WEEKDAYS)
+
+
+def test_is_utf8_checks_whole_file_and_rewinds():
+    raw = io.BytesIO("текст,дата\n".encode() + b"x" * 100_000 + "ї\n".encode("cp1251"))
+    assert not is_utf8(raw)
+    assert raw.tell() == 0
+    raw = io.BytesIO("текст,дата\n".encode())
+    assert is_utf8(raw) and raw.tell() == 0